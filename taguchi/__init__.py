@@ -4,3 +4,24 @@ from taguchi.campaign import Campaign
 from taguchi.activity import Activity, ActivityRevision
 from taguchi.template import Template, TemplateRevision
 from taguchi.subscriber import Subscriber, SubscriberList
+from taguchi.mirror import SubscriberMirror
+from taguchi.predicate import compile_query, filter_records
+from taguchi.query import Query
+from taguchi.planner import RequestPlanner
+from taguchi.export import Exporter
+from taguchi.importer import Importer
+from taguchi.journal import Journal
+from taguchi.transform import TransformPool
+from taguchi.hashcache import MemoryHashStore, FileHashStore, SqliteHashStore
+from taguchi.transport import HTTPSTransport, PooledHTTPSTransport
+from taguchi.transport import HTTP2Transport, LoopbackTransport
+from taguchi.cassette import RecordingTransport, ReplayTransport
+from taguchi.resultset import ResultSet
+from taguchi.history import RevisionCache
+from taguchi.render import Renderer
+from taguchi.identity import IdentityMap
+from taguchi.session import Session
+from taguchi.prefetch import prefetch_related
+from taguchi.membership import MembershipSet, list_membership
+from taguchi.streaming import iter_json_array, iter_json
+from taguchi.stats import Stats, StatsTable
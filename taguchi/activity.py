@@ -1,6 +1,18 @@
 import json
+import itertools
+import collections
+from multiprocessing.pool import ThreadPool
 
 from taguchi.record import Record
+from taguchi.paging import count_rows
+from taguchi.campaign import Campaign
+from taguchi.template import Template
+from taguchi.subscriber import SubscriberList
+from taguchi.prefetch import load_many
+from taguchi.membership import MembershipSet
+from taguchi.streaming import iter_json
+from taguchi.history import revision_history
+from taguchi.resultset import ResultSet
 
 class ActivityRevision(object):
 
@@ -46,11 +58,54 @@ class ActivityRevision(object):
         """
         return str(self.backing["id"])
 
+def _dispatch(context, command, activities, list_id, tag, message, workers,
+              packed):
+    # Sends a PROOF or APPROVAL command for several activities, returning
+    # an OrderedDict mapping each activity ID onto None or an error message.
+    if not isinstance(list_id, (str, unicode, int, long)):
+        list_id = list_id.record_id
+    entries = []
+    for activity in activities:
+        activity_id = activity if isinstance(activity, (str, unicode, int,
+            long)) else activity.record_id
+        entries.append(dict(id=str(activity_id), list_id=str(list_id),
+            tag=tag, message=message))
+    outcomes = collections.OrderedDict((entry["id"], None)
+        for entry in entries)
+    if not entries:
+        return outcomes
+    if packed:
+        try:
+            context.make_request("activity", command,
+                data=json.dumps(entries))
+        except Exception as e:
+            for entry in entries:
+                outcomes[entry["id"]] = "request failed: %s" % e
+        return outcomes
+    def send(entry):
+        try:
+            context.make_request("activity", command, record_id=entry["id"],
+                data=json.dumps([entry]))
+        except Exception as e:
+            return entry["id"], "request failed: %s" % e
+        return entry["id"], None
+    pool = ThreadPool(min(workers, len(entries)))
+    try:
+        for activity_id, error in pool.imap_unordered(send, entries):
+            outcomes[activity_id] = error
+    finally:
+        pool.close()
+        pool.join()
+    return outcomes
+
 class Activity(Record):
 
     def __init__(self, context):
         super(Activity, self).__init__(context, resource_type="activity")
         self.existing_revisions = []
+        # Related records, keyed by relation name, as (key, records) tuples;
+        # see taguchi.prefetch.
+        self.related = {}
 
     @property
     def record_id(self):
@@ -206,6 +261,63 @@ class Activity(Record):
         """
         return str(self.backing["status"])
 
+    def _get_related(self, relation, key, load):
+        if key is None:
+            return None
+        cached = self.related.get(relation)
+        if cached is None or cached[0] != key:
+            cached = self.related[relation] = (key, load())
+        return cached[1]
+
+    @property
+    def template(self):
+        """
+        The Template this activity uses, or None. Retrieved when first
+        accessed unless prefetched (see taguchi.prefetch.prefetch_related).
+        """
+        template_id = self.backing.get("template_id")
+        return self._get_related("template",
+            str(template_id) if template_id is not None else None,
+            lambda: Template.get(self.context, template_id, None))
+
+    @property
+    def campaign(self):
+        """
+        The Campaign to which this activity belongs, or None. Retrieved when
+        first accessed unless prefetched (see
+        taguchi.prefetch.prefetch_related).
+        """
+        campaign_id = self.backing.get("campaign_id")
+        return self._get_related("campaign",
+            str(campaign_id) if campaign_id is not None else None,
+            lambda: Campaign.get(self.context, campaign_id, None))
+
+    def get_target_list_ids(self):
+        """
+        Retrieves the IDs of the lists to which the activity should be sent,
+        as strings.
+        """
+        target_lists = self.backing.get("target_lists")
+        if not target_lists:
+            return []
+        if isinstance(target_lists, basestring):
+            target_lists = json.loads(target_lists)
+        return [str(list_id) for list_id in target_lists]
+
+    def get_target_lists(self):
+        """
+        Retrieves the SubscriberList(s) to which the activity should be
+        sent, with a single request unless prefetched (see
+        taguchi.prefetch.prefetch_related). Lists which no longer exist are
+        omitted.
+        """
+        list_ids = self.get_target_list_ids()
+        def load():
+            lists = load_many(self.context, SubscriberList, "list", list_ids)
+            return [lists[list_id] for list_id in list_ids
+                if list_id in lists]
+        return self._get_related("target_lists", tuple(list_ids), load)
+
     @property
     def latest_revision(self):
         """
@@ -227,21 +339,12 @@ class Activity(Record):
         else:
             self.backing["revisions"].append(revision)
 
-    def update(self):
+    def saved(self, backing):
         """
-        Saves this activity to the TaguchiMail database.
+        Replaces this activity's data with the data returned by TaguchiMail
+        when it is saved (by update, create or a Session).
         """
-        super(Activity, self).update()
-        # Need to move the existing revisions to avoid re-creating the same
-        # ones if this object is saved again.
-        self.existing_revisions = self.backing["revisions"]
-        self.backing["revisions"] = []
-
-    def create(self):
-        """
-        Creates this activity in the TaguchiMail database.
-        """
-        super(Activity, self).create()
+        super(Activity, self).saved(backing)
         # Need to move the existing revisions to avoid re-creating the same
         # ones if this object is saved again.
         self.existing_revisions = self.backing["revisions"]
@@ -297,7 +400,7 @@ class Activity(Record):
         Triggers the activity, causing it to be delivered to a specified list
         of subscribers.
 
-        subscribers: numeric list
+        subscribers: numeric list/MembershipSet
             Contains subscriber IDs/subscribers to whom the message should be
             delivered.
         request_content: str
@@ -307,7 +410,16 @@ class Activity(Record):
         test: boolean
             Determines whether or not to treat this as a test send.
         """
-        if isinstance(subscribers[0], str):
+        if isinstance(subscribers, MembershipSet):
+            # Membership sets may be very large, so the subscriber IDs are
+            # encoded and sent as they are read from the set.
+            data = itertools.chain(["["], iter_json(dict(id=self.record_id,
+                test=1 if test else 0, request_content=request_content),
+                conditions=(str(record_id) for record_id in subscribers)),
+                ["]"])
+            self.context.make_request(self.resource_type, "TRIGGER",
+                record_id=self.record_id, data=data)
+        elif isinstance(subscribers[0], str):
             data = [dict(id=self.record_id, test=1 if test else 0,
                 request_content=request_content, conditions=subscribers)]
             self.context.make_request(self.resource_type, "TRIGGER",
@@ -318,6 +430,90 @@ class Activity(Record):
                 subscriber_ids.append(s.record_id)
             self.trigger(subscriber_ids, request_content, test)
 
+    def get_revisions(self, cache=None):
+        """
+        Retrieves this activity's revisions, newest first, as ActivityRevision
+        objects. Only revision metadata is retrieved up front; each
+        revision's content is retrieved when first accessed, and cached by
+        revision ID.
+
+        cache: RevisionCache
+            Caches revision content across records; defaults to the shared
+            taguchi.history.CONTENT_CACHE.
+        """
+        return revision_history(self, ActivityRevision, cache)
+
+    @classmethod
+    def _wrap(cls, context, backing):
+        record = cls(context)
+        record.backing = backing
+        record.existing_revisions = backing["revisions"]
+        # Clear out existing revisions so they're not sent back to the server
+        # on update.
+        record.backing["revisions"] = []
+        return record
+
+    @staticmethod
+    def proof_many(context, activities, proof_list, subject_tag,
+                   custom_message, workers=4, packed=False):
+        """
+        Sends proof messages for several activities to the same list (see
+        proof). Returns an OrderedDict mapping each activity ID onto None if
+        its proof was sent, or an error message.
+
+        context: Context
+            Determines the TM instance and organization.
+        activities: list
+            Contains the activities or activity IDs to proof.
+        proof_list: str/SubscriberList
+            Indicates List ID of the proof list/the list to which the messages
+            will be sent.
+        subject_tag: str
+            Displays at the start of the subject line.
+        custom_message: str
+            Contains a custom message which will be included in the proof
+            header.
+        workers: int
+            Indicates the number of concurrent requests.
+        packed: bool
+            If True, all proofs are requested with a single PROOF request
+            whose body contains an entry for each activity, for TaguchiMail
+            instances which accept this; otherwise one request is sent per
+            activity.
+        """
+        return _dispatch(context, "PROOF", activities, proof_list,
+            subject_tag, custom_message, workers, packed)
+
+    @staticmethod
+    def request_approval_many(context, activities, approval_list,
+                              subject_tag, custom_message, workers=4,
+                              packed=False):
+        """
+        Sends approval requests for several activities to the same list (see
+        request_approval). Returns an OrderedDict mapping each activity ID
+        onto None if its approval request was sent, or an error message.
+
+        context: Context
+            Determines the TM instance and organization.
+        activities: list
+            Contains the activities or activity IDs.
+        approval_list: str/SubscriberList
+            Indicates List ID of the approval list/the list to which the
+            approval requests will be sent.
+        subject_tag: str
+            Displays at the start of the subject line.
+        custom_message: str
+            Contains a custom message which will be included in the approval
+            header.
+        workers: int
+            Indicates the number of concurrent requests.
+        packed: bool
+            If True, a single APPROVAL request is sent for all activities;
+            see proof_many.
+        """
+        return _dispatch(context, "APPROVAL", activities, approval_list,
+            subject_tag, custom_message, workers, packed)
+
     @staticmethod
     def get(context, record_id, parameters):
         """
@@ -330,13 +526,7 @@ class Activity(Record):
         """
         results = json.loads(context.make_request("activity", "GET",
             record_id=record_id, parameters=parameters))
-        record = Activity(context)
-        record.backing = results[0]
-        record.existing_revisions = record.backing["revisions"]
-        # Clear out existing revisions so they're not sent back to the server
-        # on update.
-        record.backing["revisions"] = []
-        return record
+        return Activity.from_backing(context, results[0])
 
     @staticmethod
     def get_with_content(context, record_id):
@@ -354,7 +544,7 @@ class Activity(Record):
     @staticmethod
     def find(context, sort, order, offset, limit, query):
         """
-        Retrieves a list of Activity(s) based on a query.
+        Retrieves a ResultSet of Activity(s) based on a query.
 
         context: Context
             Determines the TM instance and organization to query.
@@ -400,13 +590,20 @@ class Activity(Record):
             limit=str(limit))
         results = json.loads(context.make_request("activity", "GET",
             parameters=parameters, query=query))
-        records = []
-        for result in results:
-            record = Activity(context)
-            record.backing = result
-            record.existing_revisions = record.backing["revisions"]
-            # Clear out existing revisions so they're not sent back to the
-            # server on update.
-            record.backing["revisions"] = []
-            records.append(record)
-        return records
+        return ResultSet(context, Activity, results)
+
+    @staticmethod
+    def count(context, query, estimate=False):
+        """
+        Returns the number of activities matching a query, without
+        retrieving them; see taguchi.paging.count_rows.
+
+        context: Context
+            Determines the TM instance and organization to query.
+        query: list
+            Contains query predicates; see find.
+        estimate: bool
+            If True, the count is found with O(log n) single-record
+            requests rather than by paging through the matching IDs.
+        """
+        return count_rows(context, "activity", query=query, estimate=estimate)
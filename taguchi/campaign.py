@@ -1,6 +1,8 @@
 import json
 
 from taguchi.record import Record
+from taguchi.paging import count_rows
+from taguchi.resultset import ResultSet
 
 class Campaign(Record):
 
@@ -85,14 +87,12 @@ class Campaign(Record):
         """
         results = json.loads(context.make_request("campaign", "GET",
             record_id=record_id, parameters=parameters))
-        record = Campaign(context)
-        record.backing = results[0]
-        return record
+        return Campaign.from_backing(context, results[0])
 
     @staticmethod
     def find(context, sort, order, offset, limit, query):
         """
-        Retrieves a list of Campaign(s) based on a query.
+        Retrieves a ResultSet of Campaign(s) based on a query.
 
         context: Context
             Determines the TM instance and organization to query.
@@ -138,9 +138,20 @@ class Campaign(Record):
             limit=str(limit))
         results = json.loads(context.make_request("campaign", "GET",
             parameters=parameters, query=query))
-        records = []
-        for result in results:
-            record = Campaign(context)
-            record.backing = result
-            records.append(record)
-        return records
+        return ResultSet(context, Campaign, results)
+
+    @staticmethod
+    def count(context, query, estimate=False):
+        """
+        Returns the number of campaigns matching a query, without
+        retrieving them; see taguchi.paging.count_rows.
+
+        context: Context
+            Determines the TM instance and organization to query.
+        query: list
+            Contains query predicates; see find.
+        estimate: bool
+            If True, the count is found with O(log n) single-record
+            requests rather than by paging through the matching IDs.
+        """
+        return count_rows(context, "campaign", query=query, estimate=estimate)
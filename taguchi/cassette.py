@@ -0,0 +1,165 @@
+import re
+import gzip
+import json
+import time
+import threading
+import collections
+
+from taguchi.streaming import is_stream
+
+AUTH = re.compile(r"([?&]auth=)[^&]*")
+
+def scrub_uri(uri, replacement="REDACTED"):
+    """
+    Returns a request URI with the credentials in its auth parameter
+    replaced.
+
+    uri: str
+        Contains the request path and query string.
+    replacement: str
+        Contains the text substituted for the credentials.
+    """
+    return AUTH.sub(lambda match: match.group(1) + replacement, uri)
+
+def _open(path, mode):
+    if path.endswith(".gz"):
+        return gzip.open(path, mode + "b")
+    return open(path, mode)
+
+def read_cassette(path):
+    """
+    Iterates over the interactions recorded in a cassette, as dicts with
+    method, uri, body, response and elapsed keys.
+
+    path: str
+        Contains the path of the cassette; gzip-compressed if it ends in
+        '.gz'.
+    """
+    with _open(path, "r") as cassette:
+        for line in cassette:
+            if line.strip():
+                yield json.loads(line)
+
+def scrub_cassette(path, output, replacement="REDACTED"):
+    """
+    Copies a cassette recorded with scrub=False, removing the credentials
+    from every request URI.
+
+    path: str
+        Contains the path of the recorded cassette.
+    output: str
+        Contains the path of the scrubbed cassette.
+    """
+    interactions = list(read_cassette(path))
+    with _open(output, "w") as cassette:
+        for interaction in interactions:
+            interaction["uri"] = scrub_uri(interaction["uri"], replacement)
+            cassette.write(json.dumps(interaction) + "\n")
+
+class RecordingTransport(object):
+    """
+    Passes requests to another transport, recording each request and its
+    response to a cassette for later use by ReplayTransport.
+
+    Cassettes hold one JSON object per line; request headers are not
+    recorded, as they are derived from the request. Credentials are removed
+    from request URIs unless scrub is False.
+    """
+
+    def __init__(self, transport, path, scrub=True):
+        """
+        transport: object
+            Sends the requests being recorded (e.g. an HTTPSTransport).
+        path: str
+            Contains the path of the cassette, which is replaced;
+            gzip-compressed if it ends in '.gz'.
+        scrub: bool
+            If False, request URIs are recorded with their credentials.
+        """
+        self.transport = transport
+        self.path = path
+        self.scrub = scrub
+        self.lock = threading.Lock()
+        self.cassette = _open(path, "w")
+
+    def request(self, hostname, method, uri, body, headers):
+        """
+        Sends and records a request, returning the response body; see
+        HTTPSTransport.request.
+        """
+        if is_stream(body):
+            # The body must be recorded, so it can't be streamed.
+            body = "".join(body)
+            headers = dict(headers)
+            headers.pop("Transfer-Encoding", None)
+            headers["Content-Length"] = len(body)
+        started = time.time()
+        result = self.transport.request(hostname, method, uri, body, headers)
+        elapsed = time.time() - started
+        interaction = dict(method=method, body=body, response=result,
+            elapsed=round(elapsed, 6),
+            uri=scrub_uri(uri) if self.scrub else uri)
+        with self.lock:
+            self.cassette.write(json.dumps(interaction) + "\n")
+        return result
+
+    def close(self):
+        """
+        Closes the cassette.
+        """
+        with self.lock:
+            self.cassette.close()
+
+class ReplayTransport(object):
+    """
+    Answers requests from a cassette recorded by RecordingTransport,
+    without making any network requests, so that client-side overhead can
+    be measured in isolation.
+
+    Requests are matched on their method, URI (ignoring credentials) and
+    body. Identical requests recorded more than once are answered with
+    their recorded responses in turn, the last being repeated once the
+    others are used up. A LookupError is raised for requests which were
+    not recorded.
+    """
+
+    def __init__(self, path, latency=False):
+        """
+        path: str
+            Contains the path of the cassette.
+        latency: bool
+            If True, each response is delayed by the time the original
+            request took; otherwise responses are returned immediately.
+        """
+        self.latency = latency
+        self.lock = threading.Lock()
+        self.interactions = collections.defaultdict(collections.deque)
+        for interaction in read_cassette(path):
+            self.interactions[self._key(interaction["method"],
+                interaction["uri"], interaction["body"])].append(
+                (interaction["response"], interaction["elapsed"]))
+
+    @staticmethod
+    def _key(method, uri, body):
+        return method, scrub_uri(uri), body
+
+    def request(self, hostname, method, uri, body, headers):
+        """
+        Returns the recorded response body for a request; see
+        HTTPSTransport.request.
+        """
+        if is_stream(body):
+            body = "".join(body)
+        key = self._key(method, uri, body)
+        with self.lock:
+            recorded = self.interactions.get(key)
+            if not recorded:
+                raise LookupError("No recorded response for %s %s" %
+                    (method, scrub_uri(uri)))
+            if len(recorded) > 1:
+                response, elapsed = recorded.popleft()
+            else:
+                response, elapsed = recorded[0]
+        if self.latency:
+            time.sleep(elapsed)
+        return response
@@ -1,6 +1,9 @@
 import json
 import urllib
-import httplib
+
+from taguchi.transport import HTTPSTransport
+from taguchi.streaming import is_stream
+from taguchi.singleflight import SingleFlight
 
 class Context(object):
     """
@@ -9,7 +12,8 @@ class Context(object):
     parameter for their constructors.
     """
 
-    def __init__(self, hostname, username, password, organization_id):
+    def __init__(self, hostname, username, password, organization_id,
+                 transport=None, single_flight=True):
         """
         The Context constructor.
 
@@ -24,12 +28,30 @@ class Context(object):
             Indicates the organization ID to be used for creation of
             new objects. The username supplied must be authorized to access
             this organization.
+        transport: object
+            Sends requests to TaguchiMail; one of HTTPSTransport (the
+            default, making a new HTTPS connection for each request),
+            PooledHTTPSTransport, HTTP2Transport or LoopbackTransport, or
+            any object with a compatible request method.
+        single_flight: bool
+            If True, concurrent identical GET requests (e.g. from several
+            threads retrieving the same record) are merged into one request,
+            whose response is shared.
         """
         self.hostname = hostname
         self.username = username
         self.password = password
         self.organization_id = organization_id
         self.base_uri = "/admin/api/" + str(organization_id)
+        self.transport = transport or HTTPSTransport()
+        # Name of the request parameter with which TaguchiMail selects the
+        # fields to return, or None if it doesn't support field selection
+        # (requests with a projection are then pruned client-side only).
+        self.field_parameter = None
+        self.flights = SingleFlight() if single_flight else None
+        # An IdentityMap through which retrieved records are resolved, or
+        # None; see taguchi.identity.
+        self.identity_map = None
 
     def make_request(self, resource, command, record_id=None, data=None,
                      parameters=None, query=None):
@@ -44,9 +66,12 @@ class Context(object):
         record_id: str/int
             Indicates the ID of the record to operate on, for record-specific
             commands.
-        data: str
+        data: str/iterable
             Contains the JSON-formatted record data for the command, if
-            required by the command type.
+            required by the command type. Large bodies may instead be given
+            as an iterable of strings (e.g. from
+            taguchi.streaming.iter_json_array), which are sent as they are
+            produced using chunked transfer encoding.
         parameters: dict
             Contains additional parameters to the request. The supported
             parameters will depend on the resource and command, but commonly
@@ -85,19 +110,27 @@ class Context(object):
             * nt: mapped to SQL 'IS NOT', should be used to test for NOT NULL
               values in the database as [field]-neq-null is always false.
         """
-        qs = self.base_uri + "/" + resource + "/"
-        if record_id is not None:
-            qs += str(record_id)
-        qs += "?_method=" + urllib.quote(command)
-        qs += "&auth=" + urllib.quote(self.username + "|" + self.password)
-        if query is not None:
-            for predicate in query:
-                qs += "&query=" + urllib.quote(predicate)
-        if parameters is not None:
-            for key, value in parameters.items():
-                qs += "&" + urllib.quote(key) + "=" + urllib.quote(value)
+        method, uri, body, headers = self.build_request(resource, command,
+            record_id=record_id, data=data, parameters=parameters,
+            query=query)
+        send = lambda: self.transport.request(self.hostname, method, uri,
+            body, headers)
+        if self.flights is not None and method == "GET":
+            # Each caller decodes the shared response itself, as records
+            # modify their backing dicts.
+            return self.flights.do(uri, send)
+        return send()
+
+    def build_request(self, resource, command, record_id=None, data=None,
+                      parameters=None, query=None):
+        """
+        Builds a TaguchiMail request without sending it, returning a
+        (method, uri, body, headers) tuple suitable for passing to a
+        transport. Arguments are as for make_request.
+        """
+        qs = self.build_uri(resource, command, record_id=record_id,
+            parameters=parameters, query=query)
 
-        conn = httplib.HTTPSConnection(self.hostname, timeout=60)
         method = "GET" if command == "GET" else "POST"
         # Authenticate always required, so don't wait for a 401 beforehand.
         # Work in JSON, it's smaller and faster at the TM end. In addition the
@@ -109,11 +142,31 @@ class Context(object):
             Accept="application/json",
             UserAgent="TMAPIv4 python wrapper")
         # Post data if it was supplied.
-        if (data is not None and len(data) > 0):
+        if is_stream(data):
+            headers.update({
+                "Content-Type": "application/json",
+                "Transfer-Encoding": "chunked"})
+        elif (data is not None and len(data) > 0):
             headers.update({
                 "Content-Type": "application/json",
                 "Content-Length": len(data)})
-        conn.request(method, qs, data, headers)
-        result = conn.getresponse().read()
-        conn.close()
-        return result
+        return method, qs, data, headers
+
+    def build_uri(self, resource, command, record_id=None, parameters=None,
+                  query=None):
+        """
+        Builds the request URI (path and query string) for a TaguchiMail
+        request; see make_request for a description of the arguments.
+        """
+        qs = self.base_uri + "/" + resource + "/"
+        if record_id is not None:
+            qs += str(record_id)
+        qs += "?_method=" + urllib.quote(command)
+        qs += "&auth=" + urllib.quote(self.username + "|" + self.password)
+        if query is not None:
+            for predicate in query:
+                qs += "&query=" + urllib.quote(predicate)
+        if parameters is not None:
+            for key, value in parameters.items():
+                qs += "&" + urllib.quote(key) + "=" + urllib.quote(value)
+        return qs
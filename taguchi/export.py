@@ -0,0 +1,231 @@
+import os
+import csv
+import gzip
+import json
+from multiprocessing.pool import ThreadPool
+
+from taguchi.query import FIELDS, Query
+from taguchi.journal import Journal
+from taguchi.paging import iter_rows
+
+FORMATS = ("ndjson", "csv")
+
+def _csv_value(value):
+    if value is None:
+        return ""
+    if isinstance(value, (list, dict)):
+        return json.dumps(value)
+    if isinstance(value, unicode):
+        return value.encode("utf-8")
+    return str(value)
+
+class Exporter(object):
+    """
+    Exports every record of a resource matching a query to an NDJSON or CSV
+    file. The ID space is split into ranges (shards) which are fetched in
+    parallel; each shard is streamed to its own part file, and the parts
+    are joined in ID order once all shards are complete.
+
+    If a checkpoint path is given, the plan and completed shards are
+    recorded there in a Journal, so an interrupted export can be resumed by
+    running it again with the same arguments; only incomplete shards are
+    fetched again.
+    """
+
+    def __init__(self, context, resource, path, format="ndjson", fields=None,
+                 query=None, workers=4, shards=None, page_size=1000,
+                 compress=False, checkpoint=None, transform=None):
+        """
+        Creates an exporter.
+
+        context: Context
+            Determines the TM instance and organization to export from.
+        resource: str
+            Indicates the resource to export (e.g. 'subscriber').
+        path: str
+            Contains the path of the output file.
+        format: str
+            Either 'ndjson' (one JSON record per line) or 'csv'.
+        fields: list
+            Contains the fields to write as CSV columns; defaults to all of
+            the resource's fields. Ignored for NDJSON.
+        query: list
+            Contains query predicates restricting the exported records.
+        workers: int
+            Indicates the number of shards to fetch concurrently.
+        shards: int
+            Indicates the number of ID ranges to split the export into;
+            defaults to four per worker.
+        page_size: int
+            Indicates the number of records to fetch per request.
+        compress: bool
+            Determines whether the output is gzip-compressed.
+        checkpoint: str
+            Contains the path of the checkpoint file, or None.
+        transform: TransformPool
+            Transforms each page of records before it is written, or None.
+        """
+        if format not in FORMATS:
+            raise ValueError("Unsupported export format: " + format)
+        self.context = context
+        self.resource = resource
+        self.path = path
+        self.format = format
+        self.fields = fields or [field for field in FIELDS[resource]
+            if field != "list_id"]
+        self.query = query or []
+        self.workers = workers
+        self.shards = shards or workers * 4
+        self.page_size = page_size
+        self.compress = compress
+        self.checkpoint = checkpoint
+        self.transform = transform
+
+    def id_range(self):
+        """
+        Retrieves the lowest and highest IDs of the records to export, or
+        None if there are none.
+        """
+        bounds = []
+        for order in ("asc", "desc"):
+            rows = json.loads(self.context.make_request(self.resource, "GET",
+                parameters=dict(sort="id", order=order, offset="0",
+                limit="1"), query=self.query))
+            if not rows:
+                return None
+            bounds.append(int(rows[0]["id"]))
+        return tuple(bounds)
+
+    def plan(self):
+        """
+        Splits the ID space into a list of [low, high) ranges.
+        """
+        bounds = self.id_range()
+        if bounds is None:
+            return []
+        low, high = bounds[0], bounds[1] + 1
+        step = max(1, -(-(high - low) // self.shards))
+        return [[start, min(start + step, high)]
+            for start in range(low, high, step)]
+
+    def _part_path(self, index):
+        return "%s.part-%05d" % (self.path, index)
+
+    def _open(self, path, mode):
+        if self.compress:
+            return gzip.open(path, mode)
+        return open(path, mode)
+
+    @property
+    def job(self):
+        """
+        Describes the export, for the checkpoint journal.
+        """
+        return dict(job="export", resource=self.resource, path=self.path,
+            format=self.format, fields=self.fields, query=self.query,
+            compress=self.compress)
+
+    def _transformed(self, rows):
+        page = []
+        for row in rows:
+            page.append(row)
+            if len(page) >= self.page_size:
+                for result in self.transform.transform(page):
+                    if result is not None:
+                        yield result
+                page = []
+        if page:
+            for result in self.transform.transform(page):
+                if result is not None:
+                    yield result
+
+    def _export_shard(self, shard):
+        index, (low, high) = shard
+        query = Query(self.resource, self.query).gte("id", low).lt("id", high)
+        # CSV exports only need their columns, unless a transform might use
+        # other fields.
+        fields = self.fields if self.format == "csv" and \
+            self.transform is None else None
+        rows = iter_rows(self.context, self.resource,
+            query=query.predicates(), page_size=self.page_size,
+            fields=fields)
+        if self.transform is not None:
+            rows = self._transformed(rows)
+        count = 0
+        with self._open(self._part_path(index), "wb") as output:
+            writer = csv.writer(output) if self.format == "csv" else None
+            for row in rows:
+                if writer is not None:
+                    writer.writerow([_csv_value(row.get(field))
+                        for field in self.fields])
+                else:
+                    output.write(json.dumps(row) + "\n")
+                count += 1
+        return index, count
+
+    def _join(self, shards):
+        # The parts are joined into a temporary file which then replaces
+        # the output, so that they are all still in place if the join is
+        # interrupted.
+        temporary = self.path + ".tmp"
+        with open(temporary, "wb") as output:
+            if self.format == "csv":
+                # Concatenated gzip members form a valid gzip file, so the
+                # header can be compressed as a member of its own.
+                if self.compress:
+                    header = gzip.GzipFile(fileobj=output, mode="wb")
+                    csv.writer(header).writerow(self.fields)
+                    header.close()
+                else:
+                    csv.writer(output).writerow(self.fields)
+            for index in range(len(shards)):
+                with open(self._part_path(index), "rb") as part:
+                    while True:
+                        chunk = part.read(65536)
+                        if not chunk:
+                            break
+                        output.write(chunk)
+        os.rename(temporary, self.path)
+
+    def _remove_parts(self, shards):
+        for index in range(len(shards)):
+            if os.path.exists(self._part_path(index)):
+                os.remove(self._part_path(index))
+
+    def run(self, progress=None):
+        """
+        Runs (or resumes) the export, returning the number of records
+        written by this run.
+
+        progress: function
+            Called after each shard completes with the number of records
+            written so far, the number of completed shards and the total
+            number of shards. Should be None if unused.
+        """
+        journal = Journal(self.checkpoint)
+        journal.begin(self.job)
+        shards = journal.get("shards")
+        if shards is None:
+            shards = self.plan()
+            journal.set("shards", shards)
+        pending = [(index, shard) for index, shard in enumerate(shards)
+            if not journal.is_done(index)]
+        count = 0
+        pool = ThreadPool(self.workers)
+        try:
+            for index, shard_count in pool.imap_unordered(
+                    self._export_shard, pending):
+                count += shard_count
+                journal.mark_done(index)
+                if progress is not None:
+                    progress(count, len(journal.done), len(shards))
+        finally:
+            pool.terminate()
+            pool.join()
+            journal.close()
+        if not journal.get("joined"):
+            self._join(shards)
+            journal.set("joined", True)
+        self._remove_parts(shards)
+        journal.finish()
+        return count
@@ -0,0 +1,206 @@
+import os
+import json
+import sqlite3
+import hashlib
+import threading
+
+def normalize(backing):
+    """
+    Returns a copy of a subscriber's backing dict in a canonical form: the
+    TaguchiMail ID is removed (input records usually lack it), and list
+    subscriptions and custom fields are sorted.
+
+    backing: dict
+        Contains the backing dict.
+    """
+    normalized = dict(backing)
+    normalized.pop("id", None)
+    if normalized.get("lists"):
+        normalized["lists"] = sorted(normalized["lists"],
+            key=lambda item: str(item["list_id"]))
+    if normalized.get("custom_fields"):
+        normalized["custom_fields"] = sorted(normalized["custom_fields"],
+            key=lambda item: item["field"])
+    return normalized
+
+def content_hash(backing):
+    """
+    Returns a stable hash of a subscriber's content.
+
+    backing: dict
+        Contains the backing dict.
+    """
+    return hashlib.sha1(json.dumps(normalize(backing), sort_keys=True,
+        separators=(",", ":"))).hexdigest()
+
+def record_key(backing):
+    """
+    Returns the key identifying a subscriber in a hash store: its ref if
+    set, otherwise its email address (the fields CREATEORUPDATE matches
+    on), or None if it has neither.
+
+    backing: dict
+        Contains the backing dict.
+    """
+    if backing.get("ref"):
+        return "ref:%s" % backing["ref"]
+    if backing.get("email"):
+        return "email:%s" % backing["email"]
+    return None
+
+class MemoryHashStore(object):
+    """
+    Holds subscriber content hashes in memory.
+    """
+
+    def __init__(self):
+        self.hashes = {}
+        self.lock = threading.Lock()
+
+    def get(self, key):
+        """
+        Retrieves the stored hash for a key, or None.
+        """
+        return self.hashes.get(key)
+
+    def set_many(self, items):
+        """
+        Stores hashes.
+
+        items: list
+            Contains (key, hash) tuples.
+        """
+        with self.lock:
+            self.hashes.update(items)
+
+    def close(self):
+        pass
+
+class FileHashStore(MemoryHashStore):
+    """
+    Holds subscriber content hashes in a JSON file, which is loaded into
+    memory on creation. Updates are appended to a log alongside it (the
+    file's path plus '.log') and synced, so that storing a batch costs the
+    same however many hashes are already stored; the log is merged into
+    the JSON file when the store is opened or closed. Since every hash is
+    held in memory, this suits small stores; use SqliteHashStore for bulk
+    imports.
+    """
+
+    def __init__(self, path):
+        """
+        path: str
+            Contains the path of the JSON file.
+        """
+        super(FileHashStore, self).__init__()
+        self.path = path
+        self.log = None
+        if os.path.exists(path):
+            with open(path) as store:
+                self.hashes = json.load(store)
+        if os.path.exists(self.log_path):
+            with open(self.log_path) as log:
+                for line in log:
+                    # The last line may be incomplete after a crash, in
+                    # which case its batch was never stored.
+                    if not line.endswith("\n"):
+                        break
+                    self.hashes.update(json.loads(line))
+            self._compact()
+
+    @property
+    def log_path(self):
+        """
+        Path of the update log.
+        """
+        return self.path + ".log"
+
+    def set_many(self, items):
+        with self.lock:
+            items = dict(items)
+            self.hashes.update(items)
+            if self.log is None:
+                self.log = open(self.log_path, "a")
+            self.log.write(json.dumps(items) + "\n")
+            self.log.flush()
+            os.fsync(self.log.fileno())
+
+    def close(self):
+        """
+        Merges the update log into the JSON file.
+        """
+        with self.lock:
+            if self.log is not None:
+                self.log.close()
+                self.log = None
+                self._compact()
+
+    def _compact(self):
+        temporary = self.path + ".tmp"
+        with open(temporary, "w") as store:
+            json.dump(self.hashes, store)
+            store.flush()
+            os.fsync(store.fileno())
+        os.rename(temporary, self.path)
+        os.remove(self.log_path)
+
+class SqliteHashStore(object):
+    """
+    Holds subscriber content hashes in an SQLite database, suitable for
+    stores too large to load into memory.
+    """
+
+    def __init__(self, path):
+        """
+        path: str
+            Contains the path of the SQLite database file.
+        """
+        self.path = path
+        self.lock = threading.Lock()
+        self.connection = sqlite3.connect(path, check_same_thread=False)
+        self.connection.execute("CREATE TABLE IF NOT EXISTS content_hash "
+            "(key TEXT PRIMARY KEY, hash TEXT NOT NULL)")
+
+    def get(self, key):
+        with self.lock:
+            row = self.connection.execute(
+                "SELECT hash FROM content_hash WHERE key = ?",
+                (key,)).fetchone()
+        return row[0] if row is not None else None
+
+    def set_many(self, items):
+        with self.lock:
+            with self.connection:
+                self.connection.executemany(
+                    "INSERT OR REPLACE INTO content_hash VALUES (?, ?)",
+                    items)
+
+    def close(self):
+        self.connection.close()
+
+def split_unchanged(records, store):
+    """
+    Splits subscribers into those whose content differs from the stored
+    hash (or which have no key or stored hash) and those which are
+    unchanged. Returns (changed, unchanged, hashes), where hashes contains
+    the (key, hash) tuples to store once the changed records are saved.
+
+    records: list
+        Contains Subscriber objects or raw backing dicts.
+    store: MemoryHashStore/FileHashStore/SqliteHashStore
+        Contains the hashes of previously saved content.
+    """
+    changed = []
+    unchanged = []
+    hashes = []
+    for record in records:
+        backing = getattr(record, "backing", record)
+        key = record_key(backing)
+        digest = content_hash(backing)
+        if key is not None and store.get(key) == digest:
+            unchanged.append(record)
+        else:
+            changed.append(record)
+            if key is not None:
+                hashes.append((key, digest))
+    return changed, unchanged, hashes
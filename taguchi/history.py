@@ -0,0 +1,104 @@
+import json
+import threading
+import collections
+
+class RevisionCache(object):
+    """
+    Caches the content of activity and template revisions by revision ID.
+    Revisions are immutable once created, so cached content never needs to
+    be invalidated, and one cache may be shared by any number of records.
+    """
+
+    def __init__(self, max_size=1000):
+        """
+        max_size: int
+            Indicates the maximum number of revisions cached; the least
+            recently used are discarded first.
+        """
+        self.max_size = max_size
+        self.revisions = collections.OrderedDict()
+        self.lock = threading.Lock()
+
+    def get(self, key, load):
+        """
+        Retrieves the content of a revision, loading and caching it if
+        necessary.
+
+        key: tuple
+            Contains the resource and revision ID.
+        load: function
+            Called without arguments to load the revision's content.
+        """
+        with self.lock:
+            if key in self.revisions:
+                content = self.revisions.pop(key)
+                self.revisions[key] = content
+                return content
+        content = load()
+        with self.lock:
+            self.revisions[key] = content
+            while len(self.revisions) > self.max_size:
+                self.revisions.popitem(last=False)
+        return content
+
+# The cache used by revision histories unless another is given.
+CONTENT_CACHE = RevisionCache()
+
+class LazyRevision(dict):
+    """
+    The backing dict of a revision listed in a revision history. It holds
+    the revision's metadata, and loads the rest of the revision (such as
+    its content and format) the first time a missing field is read.
+    """
+
+    def __init__(self, metadata, load):
+        dict.__init__(self, metadata)
+        self._load = load
+        self._loaded = False
+
+    def __missing__(self, key):
+        if self._loaded:
+            raise KeyError(key)
+        self._loaded = True
+        for field, value in self._load().items():
+            self.setdefault(field, value)
+        return dict.__getitem__(self, key)
+
+def _load_revision(context, resource, record_id, revision_id):
+    results = json.loads(context.make_request(resource, "GET",
+        record_id=record_id, parameters=dict(revision=str(revision_id))))
+    for revision in results[0]["revisions"]:
+        if str(revision["id"]) == str(revision_id):
+            return revision
+    raise KeyError("%s %s has no revision %s" % (resource, record_id,
+        revision_id))
+
+def revision_history(record, revision_class, cache=None):
+    """
+    Retrieves the revisions of an activity or template, newest first, with
+    one request for their metadata. Each revision's content is retrieved
+    (and cached) only when one of its content fields is first read.
+
+    record: Activity/Template
+        Contains the record whose revisions are retrieved.
+    revision_class: class
+        The revision class (ActivityRevision/TemplateRevision).
+    cache: RevisionCache
+        Caches revision content; defaults to CONTENT_CACHE.
+    """
+    cache = cache or CONTENT_CACHE
+    context = record.context
+    resource = record.resource_type
+    record_id = record.record_id
+    results = json.loads(context.make_request(resource, "GET",
+        record_id=record_id))
+    history = []
+    for metadata in results[0]["revisions"]:
+        revision_id = metadata["id"]
+        def load(revision_id=revision_id):
+            return cache.get((resource, str(revision_id)),
+                lambda: _load_revision(context, resource, record_id,
+                revision_id))
+        history.append(revision_class(record,
+            revision=LazyRevision(metadata, load)))
+    return history
@@ -0,0 +1,67 @@
+import threading
+
+class IdentityMap(object):
+    """
+    Ensures that each record retrieved through a context resolves to a
+    single shared object, so that changes made through one reference are
+    seen through all others. Assign an IdentityMap to a context's
+    identity_map attribute for the duration of a unit of work, and discard
+    it afterwards.
+
+    Records already in the map are returned as they are when retrieved
+    again: their backing is not replaced by the newly retrieved data, so
+    unsaved changes are never lost.
+    """
+
+    def __init__(self):
+        self.records = {}
+        self.lock = threading.Lock()
+
+    def resolve(self, record_class, backing, create):
+        """
+        Returns the mapped record of a class with the ID in a backing dict,
+        or creates and maps one.
+
+        record_class: class
+            The Record subclass.
+        backing: dict
+            Contains the retrieved data.
+        create: function
+            Called without arguments to create the record.
+        """
+        if backing.get("id") is None:
+            return create()
+        key = (record_class, str(backing["id"]))
+        with self.lock:
+            record = self.records.get(key)
+            if record is None:
+                record = self.records[key] = create()
+        return record
+
+    def get(self, record_class, record_id):
+        """
+        Returns the mapped record of a class with an ID, or None.
+
+        record_class: class
+            The Record subclass.
+        record_id: str/int
+            Contains the record's unique TaguchiMail identifier.
+        """
+        return self.records.get((record_class, str(record_id)))
+
+    def add(self, record):
+        """
+        Maps a record (e.g. one which has just been created), returning the
+        record already mapped with its ID if there is one.
+
+        record: Record
+            Contains the record.
+        """
+        return self.resolve(type(record), record.backing, lambda: record)
+
+    def clear(self):
+        """
+        Removes all records from the map.
+        """
+        with self.lock:
+            self.records = {}
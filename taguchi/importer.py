@@ -0,0 +1,415 @@
+import os
+import csv
+import gzip
+import json
+import time
+import threading
+from multiprocessing.pool import ThreadPool
+
+from taguchi.query import FIELDS
+from taguchi.journal import Journal
+from taguchi.hashcache import split_unchanged
+from taguchi.subscriber import Subscriber
+
+# Subscriber fields which may be written by an import.
+SUBSCRIBER_FIELDS = [field for field in FIELDS["subscriber"]
+    if field not in ("id", "social_rating", "social_profile", "list_id")]
+
+class InvalidRow(object):
+    """
+    Stands in for an input row which could not be decoded, so that the
+    import can reject it and carry on.
+    """
+
+    def __init__(self, data, reason):
+        """
+        data: object
+            Contains the row's data, as far as it could be read.
+        reason: str
+            Describes why the row is invalid.
+        """
+        self.data = data
+        self.reason = reason
+
+def _decode_csv_row(row):
+    if None in row.values():
+        return InvalidRow(dict((key.decode("utf-8", "replace"),
+            value.decode("utf-8", "replace")) for key, value in row.items()
+            if key is not None and value is not None), "missing columns")
+    try:
+        return dict((key.decode("utf-8"), value.decode("utf-8"))
+            for key, value in row.items() if key is not None)
+    except UnicodeDecodeError as e:
+        return InvalidRow(dict((key.decode("utf-8", "replace"),
+            value.decode("utf-8", "replace")) for key, value in row.items()
+            if key is not None), "invalid row: %s" % e)
+
+def _decode_json_row(line):
+    try:
+        row = json.loads(line)
+    except ValueError as e:
+        return InvalidRow(line.decode("utf-8", "replace").rstrip("\r\n"),
+            "invalid row: %s" % e)
+    if not isinstance(row, dict):
+        return InvalidRow(row, "invalid row: not an object")
+    return row
+
+def read_file(path, format=None):
+    """
+    Iterates over the rows of a CSV (with a header line) or NDJSON file as
+    dicts, reading it incrementally. Files ending in '.gz' are decompressed.
+    Rows which cannot be decoded (e.g. CSV rows with missing columns, or
+    malformed JSON) are returned as InvalidRows, which Importer.run
+    rejects.
+
+    path: str
+        Contains the path of the input file.
+    format: str
+        Either 'csv' or 'ndjson'; if None, guessed from the file extension.
+    """
+    name = path[:-3] if path.endswith(".gz") else path
+    if format is None:
+        format = "csv" if name.endswith(".csv") else "ndjson"
+    opener = gzip.open if path.endswith(".gz") else open
+    with opener(path, "rb") as input:
+        if format == "csv":
+            for row in csv.DictReader(input):
+                yield _decode_csv_row(row)
+        else:
+            for line in input:
+                if line.strip():
+                    yield _decode_json_row(line)
+
+def file_identity(path):
+    """
+    Describes an input file by its absolute path, size and modification
+    time, for use as an Importer's source: a checkpoint recorded while
+    importing one version of a file is then not applied to another.
+
+    path: str
+        Contains the path of the input file.
+    """
+    status = os.stat(path)
+    return dict(path=os.path.abspath(path), size=status.st_size,
+        mtime=status.st_mtime)
+
+class ImportStats(object):
+    """
+    Progress counters for a running import.
+    """
+
+    def __init__(self):
+        self.read = 0
+        self.sent = 0
+        self.skipped = 0
+        self.dropped = 0
+        self.unchanged = 0
+        self.rejected = 0
+        self.started = time.time()
+
+    @property
+    def elapsed(self):
+        """
+        Seconds elapsed since the import started.
+        """
+        return time.time() - self.started
+
+    @property
+    def rate(self):
+        """
+        Rows sent per second.
+        """
+        return self.sent / max(self.elapsed, 1e-6)
+
+class BatchResult(object):
+    """
+    The outcome of sending one batch of an import.
+    """
+
+    def __init__(self, first, sent):
+        self.first = first # row number of the batch's first row
+        self.sent = sent # (number, row, backing) tuples sent
+        self.dropped = 0 # subscribers dropped by the transform
+        self.unchanged = 0 # subscribers skipped as unchanged
+        self.error = None # error message, if the batch was not accepted
+
+class Importer(object):
+    """
+    Imports subscribers using batched CREATEORUPDATE requests. Rows are
+    streamed through the following stages:
+    * mapping: each row's columns are mapped onto a Subscriber;
+    * validation: rows without a usable ref or email are rejected;
+    * batching: valid subscribers are grouped into batches;
+    * transformation (optional): a TransformPool modifies or drops the
+      subscribers of each batch in worker processes;
+    * change detection (optional): subscribers whose content hash matches
+      the hash store are not sent;
+    * sending: batches are sent concurrently as array request bodies, with
+      a bounded number in flight so that memory use does not depend on the
+      input size.
+
+    Rejected rows are written, one JSON object per line, to an optional
+    rejects file along with the reason for the rejection.
+
+    If a checkpoint path is given, accepted batches are recorded there in a
+    Journal (identified by the position of their first row), so running an
+    interrupted or partly failed import again with the same input skips
+    the batches already sent. Since batches are identified by position, a
+    checkpoint also requires a source identifying the input; resuming
+    with a different source raises ValueError.
+
+    Column mappings map a column name onto one of:
+    * a subscriber field name, e.g. 'email';
+    * 'custom_fields.NAME', setting the custom field NAME;
+    * 'lists', a comma-separated list of list IDs to subscribe to;
+    * 'lists.ID', subscribing to list ID with the column value as the
+      subscription option (if the value is not empty).
+    Columns named after subscriber fields are mapped to them by default.
+    """
+
+    def __init__(self, context, mapping=None, batch_size=100, workers=4,
+                 rejects=None, checkpoint=None, transform=None,
+                 hash_store=None, source=None):
+        """
+        Creates an importer.
+
+        context: Context
+            Determines the TM instance and organization to import into.
+        mapping: dict
+            Maps column names onto targets, as described above.
+        batch_size: int
+            Indicates the number of subscribers sent per request.
+        workers: int
+            Indicates the number of concurrent requests.
+        rejects: str
+            Contains the path of the rejected rows file, or None.
+        checkpoint: str
+            Contains the path of the checkpoint file, or None.
+        transform: TransformPool
+            Transforms each batch before it is sent, or None.
+        hash_store: MemoryHashStore/FileHashStore/SqliteHashStore
+            Contains the content hashes of previously imported subscribers,
+            updated as batches are accepted; unchanged subscribers are not
+            sent. Should be None if unused.
+        source: object
+            Identifies the input (e.g. as returned by file_identity, or a
+            caller-chosen job ID) for the checkpoint journal. Required if a
+            checkpoint is given.
+        """
+        if checkpoint is not None and source is None:
+            raise ValueError("A checkpoint requires the source of the input")
+        self.context = context
+        self.mapping = mapping or {}
+        self.batch_size = batch_size
+        self.workers = workers
+        self.rejects = rejects
+        self.checkpoint = checkpoint
+        self.transform = transform
+        self.hash_store = hash_store
+        self.source = source
+        self._rejects_file = None
+        self._lock = threading.Lock()
+
+    @property
+    def job(self):
+        """
+        Describes the import, for the checkpoint journal.
+        """
+        return dict(job="import", source=self.source, mapping=self.mapping,
+            batch_size=self.batch_size)
+
+    def map_row(self, row):
+        """
+        Maps an input row onto a new Subscriber.
+
+        row: dict
+            Contains the input row.
+        """
+        subscriber = Subscriber(self.context)
+        for column, value in row.items():
+            if value is None or value == "":
+                # Leave fields missing from the input untouched.
+                continue
+            target = self.mapping.get(column, column)
+            if target in SUBSCRIBER_FIELDS:
+                subscriber.backing[target] = value
+            elif target.startswith("custom_fields."):
+                subscriber.set_custom_field(target[len("custom_fields."):],
+                    value)
+            elif target == "lists":
+                self._map_lists(subscriber, value)
+            elif target.startswith("lists."):
+                subscriber.subscribe_to_list(str(target[len("lists."):]),
+                    value)
+        return subscriber
+
+    def _map_lists(self, subscriber, value):
+        # Lists are given as comma-separated IDs (e.g. in CSV), or as an
+        # array of IDs or of list dicts as exported (e.g. in NDJSON).
+        if isinstance(value, basestring):
+            value = [list_id.strip() for list_id in value.split(",")
+                if list_id.strip()]
+        elif not isinstance(value, list):
+            raise ValueError("lists must be a string or an array")
+        for item in value:
+            if isinstance(item, dict):
+                subscriber.subscribe_to_list(str(item["list_id"]),
+                    item.get("option"))
+                if item.get("unsubscribed"):
+                    # Keep exported unsubscriptions rather than reversing
+                    # them.
+                    for subscription in subscriber.backing["lists"]:
+                        if str(subscription["list_id"]) == \
+                                str(item["list_id"]):
+                            subscription["unsubscribed"] = \
+                                item["unsubscribed"]
+            else:
+                subscriber.subscribe_to_list(str(item), None)
+
+    def validate(self, subscriber):
+        """
+        Returns the reason a subscriber cannot be imported, or None if it
+        is valid.
+
+        subscriber: Subscriber
+            Contains the mapped subscriber.
+        """
+        ref = subscriber.backing.get("ref")
+        email = subscriber.backing.get("email")
+        if not ref and not email:
+            return "no ref or email"
+        if email and "@" not in email:
+            return "invalid email: " + email
+        return None
+
+    def _reject(self, stats, number, row, reason):
+        with self._lock:
+            stats.rejected += 1
+            if self._rejects_file is not None:
+                self._rejects_file.write(json.dumps(dict(row=number,
+                    error=reason, data=row)) + "\n")
+
+    def _batches(self, rows, stats, slots, stopped, journal):
+        batch = []
+        for number, row in enumerate(rows, 1):
+            stats.read += 1
+            if isinstance(row, InvalidRow):
+                self._reject(stats, number, row.data, row.reason)
+                continue
+            try:
+                subscriber = self.map_row(row)
+                reason = self.validate(subscriber)
+            except Exception as e:
+                # Any failure to map a row only rejects that row.
+                reason = "invalid row: %s" % e
+            if reason is not None:
+                self._reject(stats, number, row, reason)
+                continue
+            batch.append((number, row, subscriber.backing))
+            if len(batch) >= self.batch_size:
+                if journal.is_done(batch[0][0]):
+                    stats.skipped += len(batch)
+                    batch = []
+                    continue
+                slots.acquire()
+                if stopped.is_set():
+                    return
+                yield batch
+                batch = []
+        if batch and journal.is_done(batch[0][0]):
+            stats.skipped += len(batch)
+        elif batch:
+            slots.acquire()
+            if not stopped.is_set():
+                yield batch
+
+    def send(self, batch):
+        """
+        Transforms (if required) and sends a batch of (number, row, backing)
+        tuples, returning a BatchResult.
+        """
+        result = BatchResult(batch[0][0], batch)
+        if self.transform is not None:
+            try:
+                backings = self.transform.transform(
+                    [backing for number, row, backing in batch])
+            except Exception as e:
+                result.error = "transform failed: %s" % e
+                return result
+            result.sent = [(number, row, backing) for (number, row, original),
+                backing in zip(batch, backings) if backing is not None]
+            result.dropped = len(batch) - len(result.sent)
+        hashes = []
+        if self.hash_store is not None:
+            backings, unchanged, hashes = split_unchanged(
+                [backing for number, row, backing in result.sent],
+                self.hash_store)
+            changed = set(id(backing) for backing in backings)
+            result.sent = [item for item in result.sent
+                if id(item[2]) in changed]
+            result.unchanged = len(unchanged)
+        if not result.sent:
+            return result
+        data = [backing for number, row, backing in result.sent]
+        try:
+            results = json.loads(self.context.make_request("subscriber",
+                "CREATEORUPDATE", data=json.dumps(data)))
+        except Exception as e:
+            result.error = "request failed: %s" % e
+            return result
+        if not isinstance(results, list) or len(results) != len(data):
+            result.error = "unexpected response"
+            return result
+        if hashes:
+            self.hash_store.set_many(hashes)
+        return result
+
+    def run(self, rows, progress=None):
+        """
+        Imports rows, returning an ImportStats.
+
+        rows: iterable
+            Contains the input rows as dicts or InvalidRows (e.g. from
+            read_file).
+        progress: function
+            Called with the ImportStats after each batch is sent. Should be
+            None if unused.
+        """
+        stats = ImportStats()
+        # Bounds the number of batches queued or in flight.
+        slots = threading.Semaphore(self.workers * 2)
+        stopped = threading.Event()
+        journal = Journal(self.checkpoint)
+        journal.begin(self.job)
+        failed = False
+        if self.rejects:
+            self._rejects_file = open(self.rejects, "w")
+        pool = ThreadPool(self.workers)
+        try:
+            for result in pool.imap_unordered(self.send,
+                    self._batches(rows, stats, slots, stopped, journal)):
+                slots.release()
+                stats.dropped += result.dropped
+                stats.unchanged += result.unchanged
+                if result.error is None:
+                    stats.sent += len(result.sent)
+                    journal.mark_done(result.first)
+                else:
+                    failed = True
+                    for number, row, backing in result.sent:
+                        self._reject(stats, number, row, result.error)
+                if progress is not None:
+                    progress(stats)
+        finally:
+            # Unblock the batching stage if it is waiting for a free slot.
+            stopped.set()
+            slots.release()
+            pool.terminate()
+            pool.join()
+            journal.close()
+            if self._rejects_file is not None:
+                self._rejects_file.close()
+                self._rejects_file = None
+        if not failed:
+            journal.finish()
+        return stats
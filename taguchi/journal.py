@@ -0,0 +1,167 @@
+import os
+import json
+import time
+import threading
+
+class Journal(object):
+    """
+    Records the progress of a long-running batch job (such as an import or
+    export) on disk, so that an interrupted job can be resumed without
+    repeating completed work.
+
+    The journal holds a description of the job and arbitrary named values
+    (e.g. the job's plan) in a JSON file, which is rewritten when they
+    change: each version is written to a temporary file which then
+    replaces the journal, so a crash never leaves a partially written
+    journal behind. Completed chunk IDs are appended to a log alongside it
+    (the journal's path plus '.done'), one per line, so that marking a
+    chunk done costs the same however many are already done. The log is
+    flushed on every mark but only synced to disk every sync_interval
+    seconds; a chunk whose mark is lost in a system crash is simply
+    repeated. If no path is given, progress is only kept in memory.
+    """
+
+    def __init__(self, path=None, sync_interval=1.0):
+        """
+        Opens a journal, loading any progress previously recorded.
+
+        path: str
+            Contains the path of the journal file, or None.
+        sync_interval: float
+            Indicates the maximum number of seconds between syncs of the
+            completed chunk log.
+        """
+        self.path = path
+        self.sync_interval = sync_interval
+        self.lock = threading.Lock()
+        self.state = dict(job=None, values={})
+        self.done = set()
+        self.log = None
+        self.synced = 0
+        if path is not None and os.path.exists(path):
+            with open(path) as journal:
+                self.state = json.load(journal)
+        if path is not None and os.path.exists(self.log_path):
+            with open(self.log_path, "r+b") as log:
+                complete = 0
+                for line in log:
+                    # The last line may be incomplete after a crash; it is
+                    # removed so that later marks start on a new line.
+                    if not line.endswith("\n"):
+                        log.truncate(complete)
+                        break
+                    self.done.add(json.loads(line))
+                    complete += len(line)
+
+    @property
+    def log_path(self):
+        """
+        Path of the completed chunk log.
+        """
+        return self.path + ".done"
+
+    @property
+    def resumed(self):
+        """
+        True if the journal was loaded from a previous run.
+        """
+        return self.state["job"] is not None
+
+    def begin(self, job):
+        """
+        Starts or resumes a job. Raises ValueError if the journal records
+        progress for a different job.
+
+        job: dict
+            Describes the job (e.g. its type and batch size); a journal can
+            only be resumed by a job with an identical description.
+        """
+        job = json.loads(json.dumps(job))
+        with self.lock:
+            if self.state["job"] is None:
+                self.state["job"] = job
+                self._write()
+            elif self.state["job"] != job:
+                raise ValueError("Journal %s records a different job" %
+                    self.path)
+
+    def get(self, key, default=None):
+        """
+        Retrieves a named value recorded in the journal.
+        """
+        return self.state["values"].get(key, default)
+
+    def set(self, key, value):
+        """
+        Records a named (JSON-serializable) value in the journal.
+        """
+        with self.lock:
+            self.state["values"][key] = value
+            self._write()
+
+    def is_done(self, chunk):
+        """
+        Checks whether a chunk of the job has been completed.
+
+        chunk: str/int
+            Identifies the chunk (e.g. a batch offset or shard index).
+        """
+        return chunk in self.done
+
+    def mark_done(self, chunk):
+        """
+        Records the completion of a chunk of the job.
+
+        chunk: str/int
+            Identifies the chunk (e.g. a batch offset or shard index).
+        """
+        with self.lock:
+            self.done.add(chunk)
+            if self.path is None:
+                return
+            if self.log is None:
+                self.log = open(self.log_path, "a")
+            self.log.write(json.dumps(chunk) + "\n")
+            self.log.flush()
+            now = time.time()
+            if now - self.synced >= self.sync_interval:
+                os.fsync(self.log.fileno())
+                self.synced = now
+
+    def finish(self):
+        """
+        Marks the job as complete, removing the journal files.
+        """
+        with self.lock:
+            if self.log is not None:
+                self.log.close()
+                self.log = None
+            if self.path is None:
+                return
+            # The log is removed first: left behind on its own, it could
+            # be loaded by the next job using this path.
+            for path in (self.log_path, self.path):
+                if os.path.exists(path):
+                    os.remove(path)
+
+    def close(self):
+        """
+        Syncs and closes the completed chunk log, leaving the journal in
+        place so that the job can be resumed.
+        """
+        with self.lock:
+            if self.log is not None:
+                self.log.flush()
+                os.fsync(self.log.fileno())
+                self.log.close()
+                self.log = None
+
+    def _write(self):
+        if self.path is None:
+            return
+        temporary = self.path + ".tmp"
+        with open(temporary, "w") as journal:
+            json.dump(self.state, journal)
+            journal.flush()
+            os.fsync(journal.fileno())
+        os.rename(temporary, self.path)
@@ -0,0 +1,154 @@
+import binascii
+
+from taguchi.query import Query
+from taguchi.subscriber import Subscriber
+
+class _Bitmap(object):
+    # Accumulates IDs in a bytearray (cheap to set bits in), for conversion
+    # to a long once complete.
+
+    def __init__(self):
+        self.data = bytearray()
+
+    def add(self, value):
+        index = value >> 3
+        if index >= len(self.data):
+            self.data.extend(bytearray(max(index + 1 - len(self.data),
+                len(self.data))))
+        self.data[index] |= 1 << (value & 7)
+
+    def to_long(self):
+        data = self.data.rstrip(b"\0")
+        if not data:
+            return 0L
+        data.reverse()
+        return long(binascii.hexlify(data), 16)
+
+class MembershipSet(object):
+    """
+    An immutable set of subscriber IDs, held as a bitmap in a single long
+    integer (one bit per ID, so a million IDs below 10,000,000 take about
+    1.2MB), on which union (|), intersection (&), difference (-) and
+    cardinality (len) are computed by the interpreter's bitwise operations
+    rather than element by element.
+
+    Membership sets can be passed directly to Activity.trigger.
+    """
+
+    def __init__(self, ids=None, bits=0L):
+        """
+        Creates a membership set.
+
+        ids: iterable
+            Contains subscriber IDs (ints or strings); should be None if
+            unused.
+        bits: long
+            Contains the bitmap, if ids is None.
+        """
+        if ids is not None:
+            bitmap = _Bitmap()
+            for record_id in ids:
+                bitmap.add(int(record_id))
+            bits = bitmap.to_long()
+        self.bits = bits
+
+    def __len__(self):
+        return bin(self.bits).count("1")
+
+    def __nonzero__(self):
+        return self.bits != 0
+
+    def __contains__(self, record_id):
+        return (self.bits >> int(record_id)) & 1 == 1
+
+    def __iter__(self):
+        if not self.bits:
+            return
+        digits = "%x" % self.bits
+        data = bytearray(binascii.unhexlify("0" * (len(digits) % 2) +
+            digits))
+        data.reverse()
+        for index, byte in enumerate(data):
+            if byte:
+                for bit in range(8):
+                    if byte >> bit & 1:
+                        yield index * 8 + bit
+
+    def __eq__(self, other):
+        return isinstance(other, MembershipSet) and self.bits == other.bits
+
+    def __ne__(self, other):
+        return not self == other
+
+    def __or__(self, other):
+        return MembershipSet(bits=self.bits | other.bits)
+
+    def __and__(self, other):
+        return MembershipSet(bits=self.bits & other.bits)
+
+    def __sub__(self, other):
+        return MembershipSet(bits=self.bits & ~other.bits)
+
+    def __repr__(self):
+        return "<MembershipSet of %d>" % len(self)
+
+    def union(self, *others):
+        """
+        Returns the IDs in this set or any of the others.
+        """
+        bits = self.bits
+        for other in others:
+            bits |= other.bits
+        return MembershipSet(bits=bits)
+
+    def intersection(self, *others):
+        """
+        Returns the IDs in this set and all of the others.
+        """
+        bits = self.bits
+        for other in others:
+            bits &= other.bits
+        return MembershipSet(bits=bits)
+
+    def difference(self, *others):
+        """
+        Returns the IDs in this set and none of the others.
+        """
+        bits = self.bits
+        for other in others:
+            bits &= ~other.bits
+        return MembershipSet(bits=bits)
+
+    def ids(self):
+        """
+        Returns the IDs in ascending order, as strings (as accepted by
+        Activity.trigger).
+        """
+        return [str(record_id) for record_id in self]
+
+def list_membership(context, list_id, page_size=1000):
+    """
+    Retrieves the members of a subscriber list, returning a (subscribed,
+    unsubscribed) tuple of MembershipSets. Members are streamed a page at a
+    time (retrieving only their list subscriptions), so memory use depends
+    on the set sizes rather than on the size of the retrieved records.
+
+    context: Context
+        Determines the TM instance and organization to query.
+    list_id: str/int
+        Contains the list's unique TaguchiMail identifier.
+    page_size: int
+        Indicates the number of subscribers to fetch per request.
+    """
+    subscribed = _Bitmap()
+    unsubscribed = _Bitmap()
+    query = Query("subscriber").eq("list_id", list_id)
+    for subscriber in Subscriber.iter_find(context,
+            query=query.predicates(), page_size=page_size, fields=["lists"]):
+        record_id = int(subscriber.backing["id"])
+        if subscriber.is_unsubscribed_from_list(str(list_id)):
+            unsubscribed.add(record_id)
+        else:
+            subscribed.add(record_id)
+    return MembershipSet(bits=subscribed.to_long()), \
+        MembershipSet(bits=unsubscribed.to_long())
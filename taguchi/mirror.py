@@ -0,0 +1,220 @@
+import re
+import json
+import sqlite3
+
+from taguchi.subscriber import Subscriber
+from taguchi.resultset import ResultSet
+from taguchi.predicate import parse_predicate
+
+# Maps query operators onto the SQL used to evaluate them locally; see
+# Context.make_request for the operator definitions.
+SQL_OPERATORS = {
+    "eq": "%s = ?",
+    "neq": "%s != ?",
+    "lt": "%s < ?",
+    "gt": "%s > ?",
+    "lte": "%s <= ?",
+    "gte": "%s >= ?",
+    "re": "tm_regexp(?, %s)",
+    "rei": "tm_regexpi(?, %s)",
+    "like": "%s LIKE ?",
+    "is": "%s IS ?",
+    "nt": "%s IS NOT ?"}
+
+def _regexp(pattern, value):
+    if value is None:
+        return False
+    return re.search(pattern, unicode(value)) is not None
+
+def _regexpi(pattern, value):
+    if value is None:
+        return False
+    return re.search(pattern, unicode(value), re.IGNORECASE) is not None
+
+class SubscriberMirror(object):
+    """
+    Maintains a local, persistent copy of an organization's subscribers in
+    an SQLite database, so that read-heavy code can evaluate queries without
+    a round trip to TaguchiMail.
+    """
+
+    # Scalar subscriber fields stored as columns (and therefore queryable);
+    # the full record is kept alongside as JSON.
+    COLUMNS = ["ref", "title", "firstname", "lastname", "notifications",
+        "extra", "phone", "dob", "address", "address2", "address3", "suburb",
+        "state", "country", "postcode", "gender", "email", "social_rating",
+        "unsubscribed", "bounced"]
+
+    def __init__(self, context, path, page_size=1000):
+        """
+        Opens (creating if necessary) a subscriber mirror.
+
+        context: Context
+            Determines the TM instance and organization to mirror.
+        path: str
+            Contains the path of the SQLite database file, or ':memory:'.
+        page_size: int
+            Indicates the number of records to fetch per request while
+            syncing.
+        """
+        self.context = context
+        self.path = path
+        self.page_size = page_size
+        self.connection = sqlite3.connect(path)
+        self.connection.create_function("tm_regexp", 2, _regexp)
+        self.connection.create_function("tm_regexpi", 2, _regexpi)
+        # The TM 'like' operator is case-sensitive.
+        self.connection.execute("PRAGMA case_sensitive_like = ON")
+        columns = ", ".join(column + " TEXT" for column in self.COLUMNS
+            if column != "social_rating")
+        self.connection.executescript("""
+            CREATE TABLE IF NOT EXISTS subscriber (
+                id INTEGER PRIMARY KEY, social_rating INTEGER, %s,
+                backing TEXT NOT NULL);
+            CREATE TABLE IF NOT EXISTS subscription (
+                subscriber_id INTEGER NOT NULL, list_id INTEGER NOT NULL,
+                option TEXT, unsubscribed TEXT,
+                PRIMARY KEY (subscriber_id, list_id));
+            CREATE INDEX IF NOT EXISTS subscription_list_id
+                ON subscription (list_id);
+            CREATE INDEX IF NOT EXISTS subscriber_email ON subscriber (email);
+            CREATE INDEX IF NOT EXISTS subscriber_ref ON subscriber (ref);
+            """ % columns)
+
+    def close(self):
+        """
+        Closes the underlying database connection.
+        """
+        self.connection.close()
+
+    def last_id(self):
+        """
+        Retrieves the highest subscriber ID held by the mirror (0 if empty).
+        """
+        row = self.connection.execute(
+            "SELECT MAX(id) FROM subscriber").fetchone()
+        return row[0] or 0
+
+    def store(self, backings):
+        """
+        Inserts or replaces subscriber records in the mirror.
+
+        backings: list
+            Contains the backing dicts of the subscribers to store.
+        """
+        columns = ["id"] + self.COLUMNS + ["backing"]
+        insert = "INSERT OR REPLACE INTO subscriber (%s) VALUES (%s)" % (
+            ", ".join(columns), ", ".join("?" * len(columns)))
+        with self.connection:
+            for backing in backings:
+                values = [backing["id"]]
+                values.extend(backing.get(column) for column in self.COLUMNS)
+                values.append(json.dumps(backing))
+                self.connection.execute(insert, values)
+                self.connection.execute(
+                    "DELETE FROM subscription WHERE subscriber_id = ?",
+                    (backing["id"],))
+                for item in backing.get("lists") or []:
+                    self.connection.execute(
+                        "INSERT OR REPLACE INTO subscription VALUES "
+                        "(?, ?, ?, ?)", (backing["id"], item["list_id"],
+                        item.get("option"), item.get("unsubscribed")))
+
+    def sync(self, changed_query=None):
+        """
+        Brings the mirror up to date. The first call pulls every subscriber;
+        subsequent calls only pull subscribers with IDs above the highest ID
+        already held. Returns the number of records stored.
+
+        changed_query: list
+            Contains query predicates selecting existing subscribers which
+            have changed since the last sync (e.g. a timestamp comparison);
+            matching records are pulled again and replace the local copies.
+            Should be None if unused.
+        """
+        count = self._pull([], self.last_id())
+        if changed_query:
+            count += self._pull(changed_query, 0)
+        return count
+
+    def _pull(self, query, last_id):
+        count = 0
+        while True:
+            records = Subscriber.find(self.context, "id", "asc", 0,
+                self.page_size, query + ["id-gt-" + str(last_id)])
+            self.store(records.rows)
+            count += len(records)
+            if len(records) < self.page_size:
+                return count
+            last_id = records.rows[-1]["id"]
+
+    def _where(self, query):
+        clauses = []
+        values = []
+        for predicate in query or []:
+            field, operator, value = parse_predicate(predicate)
+            if field == "list_id":
+                column = "list_id"
+            elif field == "id" or field in self.COLUMNS:
+                column = "subscriber." + field
+            else:
+                raise ValueError("Unsupported query field: " + field)
+            if operator not in ("re", "rei", "like") and \
+                    value.lower() == "null":
+                # SQL comparisons with NULL are never true, so e.g.
+                # [field]-eq-null matches nothing, as in TaguchiMail.
+                value = None
+            clause = SQL_OPERATORS[operator] % column
+            if field == "list_id":
+                clause = "subscriber.id IN (SELECT subscriber_id FROM " \
+                    "subscription WHERE %s)" % clause
+            clauses.append(clause)
+            values.append(value)
+        if not clauses:
+            return "", values
+        return " WHERE " + " AND ".join(clauses), values
+
+    def count(self, query):
+        """
+        Counts the mirrored subscribers matching a query.
+
+        query: list
+            Contains query predicates, in the form accepted by
+            Subscriber.find.
+        """
+        where, values = self._where(query)
+        return self.connection.execute(
+            "SELECT COUNT(*) FROM subscriber" + where, values).fetchone()[0]
+
+    def find(self, sort, order, offset, limit, query):
+        """
+        Retrieves a ResultSet of Subscriber(s) from the mirror based on a
+        query, with the same arguments and semantics as Subscriber.find.
+
+        sort: str
+            Indicates which of the record's fields should be used to sort
+            the output.
+        order: str
+            Contains either 'asc' or 'desc', indicating whether the result
+            list should be returned in ascending or descending order.
+        offset: str/int
+            Indicates the index of the first record to be returned in the
+            list.
+        limit: str/int
+            Indicates the maximum number of records to return.
+        query: list
+            Contains query predicates, each of the form: [field]-[operator]-
+            [value]; see Context.make_request for the supported operators.
+            Predicates may test any of the mirrored scalar fields, the
+            subscriber ID or list_id (list membership).
+        """
+        if sort != "id" and sort not in self.COLUMNS:
+            raise ValueError("Unsupported sort field: " + sort)
+        if order not in ("asc", "desc"):
+            raise ValueError("Unsupported sort order: " + order)
+        where, values = self._where(query)
+        sql = "SELECT backing FROM subscriber%s ORDER BY %s %s, id %s " \
+            "LIMIT ? OFFSET ?" % (where, sort, order, order)
+        rows = [json.loads(row[0]) for row in self.connection.execute(sql,
+            values + [int(limit), int(offset)])]
+        return ResultSet(self.context, Subscriber, rows)
@@ -0,0 +1,153 @@
+import json
+
+def select_fields(context, parameters, fields):
+    """
+    Returns a copy of a request's parameters which also asks TaguchiMail to
+    return only the given fields and the ID, if the context's
+    field_parameter is set.
+
+    context: Context
+        Determines the TM instance and organization to query.
+    parameters: dict
+        Contains the request parameters, or None.
+    fields: list
+        Contains the fields to return, or None for all fields.
+    """
+    parameters = dict(parameters or {})
+    if fields and context.field_parameter:
+        if "id" not in fields:
+            fields = ["id"] + list(fields)
+        parameters[context.field_parameter] = ",".join(fields)
+    return parameters
+
+def project(row, fields):
+    """
+    Returns a copy of a raw record (backing dict) containing only the given
+    fields, plus its ID. Returns the record itself if fields is None.
+
+    row: dict
+        Contains the raw record.
+    fields: list
+        Contains the fields to keep, or None.
+    """
+    if not fields:
+        return row
+    projected = dict((field, row[field]) for field in fields if field in row)
+    if "id" in row:
+        projected["id"] = row["id"]
+    return projected
+
+def iter_rows(context, resource, query=None, sort="id", order="asc",
+              page_size=1000, parameters=None, fields=None, keyset=None):
+    """
+    Iterates over all raw records (backing dicts) of a resource matching a
+    query, fetching them a page at a time.
+
+    Results sorted by ID are paged by keyset: each page after the first
+    adds an id-gt-N (or id-lt-N) predicate for the last ID seen rather than
+    an offset, so the server does not scan and discard all earlier rows
+    for each page, and rows created or deleted during the iteration do not
+    cause others to be skipped or repeated. Other sort orders are paged by
+    offset.
+
+    context: Context
+        Determines the TM instance and organization to query.
+    resource: str
+        Indicates the resource to be queried.
+    query: list
+        Contains query predicates, each of the form: [field]-[operator]-
+        [value].
+    sort: str
+        Indicates which of the record's fields should be used to sort the
+        output.
+    order: str
+        Contains either 'asc' or 'desc'.
+    page_size: int
+        Indicates the number of records to fetch per request.
+    parameters: dict
+        Contains additional request parameters, if any.
+    fields: list
+        Contains the fields to return (see project), or None for all
+        fields. Each page is pruned as soon as it is decoded.
+    keyset: bool
+        Determines whether keyset paging is used; defaults to True if
+        sorting by ID. Raises ValueError if True and sorting by another
+        field.
+    """
+    if keyset is None:
+        keyset = sort == "id"
+    elif keyset and sort != "id":
+        raise ValueError("Keyset paging requires sorting by id")
+    operator = "gt" if order == "asc" else "lt"
+    offset = 0
+    last_id = None
+    while True:
+        page_parameters = select_fields(context, parameters, fields)
+        page_parameters.update(sort=sort, order=order, offset=str(offset),
+            limit=str(page_size))
+        page_query = query
+        if last_id is not None:
+            page_query = list(query or []) + ["id-%s-%s" % (operator,
+                last_id)]
+        rows = json.loads(context.make_request(resource, "GET",
+            parameters=page_parameters, query=page_query))
+        if fields:
+            rows = [project(row, fields) for row in rows]
+        for row in rows:
+            yield row
+        if len(rows) < page_size:
+            return
+        if keyset:
+            last_id = rows[-1]["id"]
+        else:
+            offset += len(rows)
+
+def _has_row(context, resource, query, offset):
+    parameters = select_fields(context, None, ["id"])
+    parameters.update(sort="id", order="asc", offset=str(offset), limit="1")
+    return len(json.loads(context.make_request(resource, "GET",
+        parameters=parameters, query=query))) > 0
+
+def count_rows(context, resource, query=None, estimate=False,
+               page_size=1000):
+    """
+    Returns the number of records of a resource matching a query, without
+    retrieving their data.
+
+    By default the IDs of the matching records are paged through by keyset
+    (see iter_rows), which takes one request per page_size records. In
+    estimate mode the count is instead found by probing single-record
+    pages: the offset is doubled until a page is empty, then the last
+    offset holding a record is found by binary search, taking about
+    2 * log2(n) requests of one record each. The result is exact unless
+    records are created or deleted while probing.
+
+    context: Context
+        Determines the TM instance and organization to query.
+    resource: str
+        Indicates the resource to be queried.
+    query: list
+        Contains query predicates, each of the form: [field]-[operator]-
+        [value].
+    estimate: bool
+        Determines whether the count is found by probing offsets.
+    page_size: int
+        Indicates the number of IDs to fetch per request, if not
+        estimating.
+    """
+    if not estimate:
+        return sum(1 for row in iter_rows(context, resource, query=query,
+            page_size=page_size, fields=["id"]))
+    if not _has_row(context, resource, query, 0):
+        return 0
+    # The record at offset low exists; none exists at offset high.
+    low, high = 0, 1
+    while _has_row(context, resource, query, high):
+        low, high = high, high * 2
+    while high - low > 1:
+        middle = (low + high) // 2
+        if _has_row(context, resource, query, middle):
+            low = middle
+        else:
+            high = middle
+    return high
@@ -0,0 +1,125 @@
+import json
+
+from taguchi.query import Query
+
+# Conservative default; many proxies and servers reject URLs over 8KB.
+DEFAULT_MAX_URL_LENGTH = 8000
+
+def _sort_key(sort):
+    def key(row):
+        value = row.get(sort)
+        # The database sorts NULLs after all other values.
+        return (value is None, value)
+    return key
+
+class RequestPlanner(object):
+    """
+    Plans read requests so that no request URL exceeds a length threshold.
+    Queries whose encoded predicates would be too long are split into
+    several requests (dividing the largest value set, see Query.split), and
+    the results are merged as if a single request had been made.
+    """
+
+    def __init__(self, context, max_url_length=DEFAULT_MAX_URL_LENGTH):
+        """
+        Creates a request planner.
+
+        context: Context
+            Determines the TM instance and organization to query.
+        max_url_length: int
+            Indicates the maximum length of a request URL, including the
+            hostname.
+        """
+        self.context = context
+        self.max_url_length = max_url_length
+
+    def url_length(self, resource, command, record_id=None, parameters=None,
+                   query=None):
+        """
+        Estimates the length of a request URL; see Context.make_request for
+        a description of the arguments.
+        """
+        return len("https://" + self.context.hostname) + \
+            len(self.context.build_uri(resource, command, record_id=record_id,
+            parameters=parameters, query=query))
+
+    def plan(self, resource, parameters, query):
+        """
+        Splits a query into one or more predicate lists, each of which fits
+        within the URL length threshold. Raises ValueError if the query
+        cannot be split to fit.
+
+        resource: str
+            Indicates the resource to be queried.
+        parameters: dict
+            Contains the request parameters.
+        query: list/Query
+            Contains query predicates, or a Query.
+        """
+        if not isinstance(query, Query):
+            query = Query(resource, query)
+        budget = self.max_url_length - self.url_length(resource, "GET",
+            parameters=parameters)
+        queries = query.split(budget)
+        for predicates in queries:
+            if self.url_length(resource, "GET", parameters=parameters,
+                    query=predicates) > self.max_url_length:
+                raise ValueError("Query cannot be split to fit within %d "
+                    "characters" % self.max_url_length)
+        return queries
+
+    def find(self, resource, sort, order, offset, limit, query):
+        """
+        Retrieves a list of raw records (backing dicts) based on a query,
+        with the same arguments and results as the record classes' find
+        methods. If the query has to be split, each part is fetched from
+        offset 0 and the merged, re-sorted result is sliced, so offset and
+        limit apply to the query as a whole.
+
+        resource: str
+            Indicates the resource to be queried.
+        sort: str
+            Indicates which of the record's fields should be used to sort
+            the output.
+        order: str
+            Contains either 'asc' or 'desc'.
+        offset: str/int
+            Indicates the index of the first record to be returned.
+        limit: str/int
+            Indicates the maximum number of records to return.
+        query: list/Query
+            Contains query predicates, or a Query.
+        """
+        parameters = dict(sort=sort, order=order, offset=str(offset),
+            limit=str(limit))
+        queries = self.plan(resource, parameters, query)
+        if len(queries) == 1:
+            return json.loads(self.context.make_request(resource, "GET",
+                parameters=parameters, query=queries[0]))
+        parameters = dict(sort=sort, order=order, offset="0",
+            limit=str(int(offset) + int(limit)))
+        rows = {}
+        for predicates in queries:
+            for row in json.loads(self.context.make_request(resource, "GET",
+                    parameters=parameters, query=predicates)):
+                rows[row["id"]] = row
+        rows = sorted(rows.values(), key=_sort_key(sort),
+            reverse=(order == "desc"))
+        return rows[int(offset):int(offset) + int(limit)]
+
+    def get_many(self, resource, record_ids):
+        """
+        Retrieves raw records (backing dicts) by TaguchiMail identifier,
+        using as few requests as the URL length threshold allows. Records
+        are returned in ascending ID order.
+
+        resource: str
+            Indicates the resource to be queried.
+        record_ids: list
+            Contains the records' unique TaguchiMail identifiers.
+        """
+        record_ids = set(str(record_id) for record_id in record_ids)
+        if not record_ids:
+            return []
+        query = Query(resource).isin("id", record_ids)
+        return self.find(resource, "id", "asc", 0, len(record_ids), query)
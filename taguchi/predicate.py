@@ -0,0 +1,157 @@
+import re
+import itertools
+
+# Query operators understood by TaguchiMail; see Context.make_request.
+OPERATORS = ("eq", "neq", "lt", "gt", "lte", "gte", "re", "rei", "like",
+    "is", "nt")
+
+def parse_predicate(predicate):
+    """
+    Splits a query predicate of the form [field]-[operator]-[value] into a
+    (field, operator, value) tuple. Raises ValueError if the predicate is
+    malformed or uses an unknown operator.
+
+    predicate: str
+        Contains the query predicate.
+    """
+    parts = predicate.split("-", 2)
+    if len(parts) != 3:
+        raise ValueError("Malformed query predicate: " + predicate)
+    if parts[1] not in OPERATORS:
+        raise ValueError("Unsupported query operator: " + parts[1])
+    return tuple(parts)
+
+def like_to_regex(pattern):
+    """
+    Translates an SQL LIKE pattern ('%' and '_' wildcards) into an anchored
+    Python regular expression string.
+
+    pattern: str
+        Contains the LIKE pattern.
+    """
+    regex = []
+    for char in pattern:
+        if char == "%":
+            regex.append(".*")
+        elif char == "_":
+            regex.append(".")
+        else:
+            regex.append(re.escape(char))
+    return "^" + "".join(regex) + "$"
+
+def _number(value):
+    if isinstance(value, bool):
+        return None
+    if isinstance(value, (int, long, float)):
+        return value
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return None
+
+def _field_values(backing, field):
+    if field in backing:
+        return (backing[field],)
+    if field == "list_id":
+        # Subscriber queries on list_id test list membership.
+        return tuple(item["list_id"] for item in backing.get("lists") or [])
+    return (None,)
+
+def _comparison(operator, value):
+    # Returns a function testing a single (non-None) field value; values are
+    # compared numerically when both sides are numbers, as the database
+    # would for numeric columns, and as strings otherwise.
+    number = _number(value)
+    text = value if isinstance(value, unicode) else value.decode("utf-8")
+    test = dict(
+        eq=lambda a, b: a == b,
+        neq=lambda a, b: a != b,
+        lt=lambda a, b: a < b,
+        gt=lambda a, b: a > b,
+        lte=lambda a, b: a <= b,
+        gte=lambda a, b: a >= b)[operator]
+
+    def compare(field_value):
+        if number is not None and not isinstance(field_value, basestring):
+            field_number = _number(field_value)
+            if field_number is not None:
+                return test(field_number, number)
+        return test(unicode(field_value), text)
+    return compare
+
+def compile_predicate(predicate):
+    """
+    Compiles a single query predicate into a function which takes a record's
+    backing dict and returns True if the record matches. Semantics follow
+    the SQL mapping described in Context.make_request: comparisons against
+    NULL fields are false, and 'is'/'nt' test for NULL.
+
+    predicate: str
+        Contains the query predicate, of the form [field]-[operator]-[value].
+    """
+    field, operator, value = parse_predicate(predicate)
+    if operator in ("is", "nt"):
+        if value.lower() == "null":
+            test = lambda field_value: field_value is None
+        else:
+            equal = _comparison("eq", value)
+            test = lambda field_value: field_value is not None and \
+                equal(field_value)
+        if operator == "nt":
+            test = (lambda positive: lambda field_value:
+                not positive(field_value))(test)
+        return lambda backing: any(test(field_value)
+            for field_value in _field_values(backing, field))
+
+    if operator in ("re", "rei", "like"):
+        if operator == "like":
+            pattern = re.compile(like_to_regex(value), re.DOTALL)
+        else:
+            pattern = re.compile(value,
+                re.IGNORECASE if operator == "rei" else 0)
+        test = lambda field_value: \
+            pattern.search(unicode(field_value)) is not None
+    elif value.lower() == "null":
+        # [field]-eq-null (and friends) is always false in SQL.
+        return lambda backing: False
+    else:
+        test = _comparison(operator, value)
+    return lambda backing: any(field_value is not None and test(field_value)
+        for field_value in _field_values(backing, field))
+
+def compile_query(query):
+    """
+    Compiles a list of query predicates into a single function which takes
+    a record's backing dict and returns True if all predicates match.
+
+    query: list
+        Contains query predicates, each of the form: [field]-[operator]-
+        [value].
+    """
+    tests = [compile_predicate(predicate) for predicate in query or []]
+    return lambda backing: all(test(backing) for test in tests)
+
+def _backing(item):
+    return getattr(item, "backing", item)
+
+def filter_records(query, records):
+    """
+    Filters records using query predicates, without contacting TaguchiMail.
+    Lists (and tuples) are filtered eagerly, one predicate at a time over
+    the whole list, and a new list is returned; any other iterable is
+    filtered lazily and an iterator is returned.
+
+    query: list
+        Contains query predicates, each of the form: [field]-[operator]-
+        [value].
+    records: iterable
+        Contains Record objects or raw backing dicts.
+    """
+    if isinstance(records, (list, tuple)):
+        results = list(records)
+        for predicate in query or []:
+            test = compile_predicate(predicate)
+            results = [item for item in results if test(_backing(item))]
+        return results
+    test = compile_query(query)
+    return itertools.ifilter(lambda item: test(_backing(item)), records)
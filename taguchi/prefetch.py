@@ -0,0 +1,70 @@
+from taguchi.campaign import Campaign
+from taguchi.template import Template
+from taguchi.subscriber import SubscriberList
+from taguchi.planner import RequestPlanner
+
+# The relations which can be prefetched: (record class, resource).
+RELATIONS = dict(
+    template=(Template, "template"),
+    campaign=(Campaign, "campaign"),
+    target_lists=(SubscriberList, "list"))
+
+def load_many(context, record_class, resource, record_ids):
+    """
+    Retrieves records by ID with as few requests as possible (see
+    RequestPlanner.get_many), returning a dict mapping each ID found (as a
+    string) onto its record.
+
+    context: Context
+        Determines the TM instance and organization to query.
+    record_class: class
+        The Record subclass used to wrap each row.
+    resource: str
+        Indicates the resource to be queried.
+    record_ids: list
+        Contains the records' unique TaguchiMail identifiers.
+    """
+    rows = RequestPlanner(context).get_many(resource, record_ids)
+    return dict((str(row["id"]), record_class.from_backing(context, row))
+        for row in rows)
+
+def _keys(activity, relation):
+    if relation == "target_lists":
+        return activity.get_target_list_ids()
+    record_id = activity.backing.get(relation + "_id")
+    return [str(record_id)] if record_id is not None else []
+
+def prefetch_related(context, activities, relations=None):
+    """
+    Retrieves the records related to a collection of activities with a few
+    batched requests (one per relation, unless the number of distinct IDs
+    requires the query to be split), rather than with one or more requests
+    per activity, and attaches them to the activities so that the
+    template and campaign properties and get_target_lists do not make
+    further requests. Returns the activities as a list.
+
+    context: Context
+        Determines the TM instance and organization to query.
+    activities: iterable
+        Contains the Activity objects (e.g. a ResultSet returned by find).
+    relations: list
+        Contains the relations to prefetch, any of 'template', 'campaign'
+        and 'target_lists'; defaults to all of them.
+    """
+    activities = list(activities)
+    for relation in relations or sorted(RELATIONS):
+        if relation not in RELATIONS:
+            raise ValueError("Unknown relation: " + relation)
+        record_class, resource = RELATIONS[relation]
+        record_ids = set()
+        for activity in activities:
+            record_ids.update(_keys(activity, relation))
+        records = load_many(context, record_class, resource, record_ids)
+        for activity in activities:
+            keys = _keys(activity, relation)
+            if relation == "target_lists":
+                activity.related[relation] = (tuple(keys),
+                    [records[key] for key in keys if key in records])
+            elif keys:
+                activity.related[relation] = (keys[0], records.get(keys[0]))
+    return activities
@@ -0,0 +1,322 @@
+import urllib
+import collections
+
+from taguchi.predicate import OPERATORS, parse_predicate
+
+def _fields(spec):
+    # Parses a space-separated list of fields, each optionally suffixed with
+    # ':' and its type (text if omitted).
+    fields = collections.OrderedDict()
+    for field in spec.split():
+        name, _, kind = field.partition(":")
+        fields[name] = kind or "text"
+    return fields
+
+# Queryable fields of each resource, with their types: number, date or
+# text. TaguchiMail compares values according to the field's type, so only
+# bounds on numeric fields can be merged numerically.
+FIELDS = dict(
+    activity=_fields("id:number ref name type subtype target_lists "
+        "target_views approval_status date:date template_id:number "
+        "campaign_id:number throttle:number data status"),
+    campaign=_fields("id:number ref name date:date data status"),
+    list=_fields("id:number ref name type timestamp:date data status"),
+    subscriber=_fields("id:number ref title firstname lastname "
+        "notifications extra phone dob:date address address2 address3 "
+        "suburb state country postcode gender email social_rating:number "
+        "social_profile unsubscribed:date bounced:date data "
+        "list_id:number"),
+    template=_fields("id:number ref name type subtype data status"))
+
+# Characters with special meaning in POSIX extended regular expressions.
+REGEX_SPECIAL = set("\\.^$*+?()[]{}|")
+
+def escape_regex(value):
+    """
+    Escapes a literal value for use in a POSIX regular expression.
+
+    value: str
+        Contains the literal value.
+    """
+    return "".join("\\" + char if char in REGEX_SPECIAL else char
+        for char in value)
+
+def alternation_values(pattern):
+    """
+    Returns the literal values of an anchored alternation of the form
+    ^(a|b|c)$, as produced by Query for value sets, or None if the pattern
+    is not of that form.
+
+    pattern: str
+        Contains the regular expression.
+    """
+    if not (pattern.startswith("^(") and pattern.endswith(")$")):
+        return None
+    values = []
+    value = []
+    escaped = False
+    for char in pattern[2:-2]:
+        if escaped:
+            value.append(char)
+            escaped = False
+        elif char == "\\":
+            escaped = True
+        elif char == "|":
+            values.append("".join(value))
+            value = []
+        elif char in REGEX_SPECIAL:
+            return None
+        else:
+            value.append(char)
+    if escaped:
+        return None
+    values.append("".join(value))
+    return values
+
+def encoded_length(predicate):
+    """
+    Returns the number of characters a predicate adds to a request URL.
+
+    predicate: str
+        Contains the query predicate.
+    """
+    return len("&query=") + len(urllib.quote(predicate))
+
+# Range operators, by the kind of bound they impose.
+BOUNDS = dict(gt="lower", gte="lower", lt="upper", lte="upper")
+
+def _tighter(kind, number, operator, current):
+    # An exclusive bound beats an inclusive one at the same value.
+    if number == current[0]:
+        return operator in ("gt", "lt")
+    if kind == "lower":
+        return number > current[0]
+    return number < current[0]
+
+def _text(value):
+    if isinstance(value, basestring):
+        return value
+    return str(value)
+
+def _number(value):
+    try:
+        return float(value)
+    except ValueError:
+        return None
+
+class Query(object):
+    """
+    Builds lists of query predicates for a resource, validating field names
+    and merging redundant predicates before they are sent.
+
+    Predicates on the same field are combined as follows:
+    * exact duplicates are dropped;
+    * lower (gt/gte) and upper (lt/lte) bounds on numeric fields are
+      reduced to the tightest bound of each kind;
+    * value sets added with isin are intersected, and sent as a single
+      anchored 're' alternation (or an 'eq' predicate for a single value).
+    """
+
+    def __init__(self, resource, query=None):
+        """
+        Creates a query builder.
+
+        resource: str
+            Indicates the resource to be queried (e.g. 'subscriber').
+        query: list
+            Contains existing query predicates to start from, each of the
+            form [field]-[operator]-[value]. Anchored 're' alternations of
+            literal values are treated as value sets.
+        """
+        if resource not in FIELDS:
+            raise ValueError("Unknown resource: " + resource)
+        self.resource = resource
+        self.conditions = []
+        self.value_sets = {}
+        for predicate in query or []:
+            field, operator, value = parse_predicate(predicate)
+            values = alternation_values(value) if operator == "re" else None
+            if values is not None:
+                self.isin(field, values)
+            else:
+                self.where(field, operator, value)
+
+    def _check_field(self, field):
+        if field not in FIELDS[self.resource]:
+            raise ValueError("Unknown %s field: %s" % (self.resource, field))
+
+    def where(self, field, operator, value):
+        """
+        Adds a predicate to the query, returning the query.
+
+        field: str
+            Indicates one of the resource's fields.
+        operator: str
+            Indicates one of the operators listed in Context.make_request.
+        value: str/int
+            Contains the value to which the field should be compared.
+        """
+        self._check_field(field)
+        if operator not in OPERATORS:
+            raise ValueError("Unsupported query operator: " + operator)
+        condition = (field, operator, _text(value))
+        if condition not in self.conditions:
+            self.conditions.append(condition)
+        return self
+
+    def eq(self, field, value):
+        return self.where(field, "eq", value)
+
+    def neq(self, field, value):
+        return self.where(field, "neq", value)
+
+    def lt(self, field, value):
+        return self.where(field, "lt", value)
+
+    def gt(self, field, value):
+        return self.where(field, "gt", value)
+
+    def lte(self, field, value):
+        return self.where(field, "lte", value)
+
+    def gte(self, field, value):
+        return self.where(field, "gte", value)
+
+    def like(self, field, value):
+        return self.where(field, "like", value)
+
+    def is_null(self, field):
+        return self.where(field, "is", "null")
+
+    def not_null(self, field):
+        return self.where(field, "nt", "null")
+
+    def isin(self, field, values):
+        """
+        Restricts a field to one of a set of values, returning the query.
+        Repeated calls for the same field intersect the value sets.
+
+        field: str
+            Indicates one of the resource's fields.
+        values: list
+            Contains the acceptable values.
+        """
+        self._check_field(field)
+        values = set(_text(value) for value in values)
+        if field in self.value_sets:
+            self.value_sets[field] &= values
+        else:
+            self.value_sets[field] = values
+        return self
+
+    def _merged_conditions(self):
+        bounds = {}
+        merged = []
+        for field, operator, value in self.conditions:
+            number = None
+            if FIELDS[self.resource][field] == "number":
+                number = _number(value)
+            if operator not in BOUNDS or number is None:
+                merged.append((field, operator, value))
+                continue
+            key = (field, BOUNDS[operator])
+            current = bounds.get(key)
+            if current is None:
+                merged.append(key)
+            elif not _tighter(BOUNDS[operator], number, operator, current):
+                continue
+            bounds[key] = (number, operator, value)
+        predicates = []
+        for condition in merged:
+            if len(condition) == 2:
+                field = condition[0]
+                condition = (field,) + bounds[condition][1:]
+            predicates.append("%s-%s-%s" % condition)
+        return predicates
+
+    def _sorted_values(self, field):
+        values = self.value_sets[field]
+        if all(_number(value) is not None for value in values):
+            return sorted(values, key=float)
+        return sorted(values)
+
+    def _value_set_predicate(self, field, values):
+        if len(values) == 1:
+            return "%s-eq-%s" % (field, values[0])
+        return "%s-re-^(%s)$" % (field,
+            "|".join(escape_regex(value) for value in values))
+
+    def predicates(self):
+        """
+        Returns the normalized list of query predicates.
+        """
+        predicates = self._merged_conditions()
+        for field in sorted(self.value_sets):
+            values = self._sorted_values(field)
+            if not values:
+                raise ValueError("Empty value set for field: " + field)
+            predicates.append(self._value_set_predicate(field, values))
+        return predicates
+
+    @staticmethod
+    def union(resource, field, queries):
+        """
+        Combines queries which are identical apart from an 'eq' predicate on
+        the given field (as produced by issuing one request per value) into
+        a single query using isin. Raises ValueError if the queries cannot
+        be combined.
+
+        resource: str
+            Indicates the resource to be queried.
+        field: str
+            Indicates the field whose values differ between the queries.
+        queries: list
+            Contains the predicate lists to combine.
+        """
+        common = None
+        values = []
+        for query in queries:
+            conditions = [parse_predicate(p) for p in query]
+            matches = [c for c in conditions if c[:2] == (field, "eq")]
+            if len(matches) != 1:
+                raise ValueError("Expected one %s-eq predicate per query" %
+                    field)
+            remainder = [c for c in conditions if c != matches[0]]
+            if common is not None and sorted(remainder) != sorted(common):
+                raise ValueError("Queries differ in more than one predicate")
+            common = remainder
+            values.append(matches[0][2])
+        query = Query(resource, ["%s-%s-%s" % c for c in common or []])
+        return query.isin(field, values)
+
+    def split(self, max_length):
+        """
+        Returns the normalized query as one or more predicate lists, each of
+        which adds at most max_length characters to a request URL. The
+        largest isin value set is divided across the lists as required; the
+        union of the lists' results is the result of the whole query.
+
+        max_length: int
+            Indicates the maximum encoded length of each predicate list.
+        """
+        predicates = self.predicates()
+        if sum(encoded_length(p) for p in predicates) <= max_length or \
+                not self.value_sets:
+            return [predicates]
+        field = max(self.value_sets,
+            key=lambda field: len(self.value_sets[field]))
+        values = self._sorted_values(field)
+        fixed = [p for p in predicates
+            if p != self._value_set_predicate(field, values)]
+        available = max_length - sum(encoded_length(p) for p in fixed)
+        queries = []
+        chunk = []
+        for value in values:
+            candidate = self._value_set_predicate(field, chunk + [value])
+            if chunk and encoded_length(candidate) > available:
+                queries.append(fixed +
+                    [self._value_set_predicate(field, chunk)])
+                chunk = []
+            chunk.append(value)
+        queries.append(fixed + [self._value_set_predicate(field, chunk)])
+        return queries
@@ -1,5 +1,7 @@
 import json
 
+from taguchi.identity import IdentityMap
+
 class Record(object):
     """
     Base class for TM record types.
@@ -21,6 +23,35 @@ class Record(object):
         self.resource_type = resource_type or None
         self.backing = backing or dict()
 
+    @classmethod
+    def from_backing(cls, context, backing, partial=False):
+        """
+        Creates a record of this type from a row returned by TaguchiMail,
+        or returns the existing record with the same ID if the context has
+        an identity map containing one.
+
+        context: Context
+            Determines the TM instance and organization to which the record
+            belongs.
+        backing: dict
+            The data backing the record.
+        partial: bool
+            If True, the row holds only some of the record's fields (e.g.
+            it was retrieved with a field selection), so a new record is
+            always created and it is not added to the identity map.
+        """
+        identity_map = getattr(context, "identity_map", None)
+        if isinstance(identity_map, IdentityMap) and not partial:
+            return identity_map.resolve(cls, backing,
+                lambda: cls._wrap(context, backing))
+        return cls._wrap(context, backing)
+
+    @classmethod
+    def _wrap(cls, context, backing):
+        record = cls(context)
+        record.backing = backing
+        return record
+
     def update(self):
         """
         Saves this record to the TaguchiMail database.
@@ -28,7 +59,7 @@ class Record(object):
         data = [self.backing]
         results = json.loads(self.context.make_request(self.resource_type,
             "PUT", record_id=self.backing["id"], data=json.dumps(data)))
-        self.backing = results[0]
+        self.saved(results[0])
 
     def create(self):
         """
@@ -37,4 +68,14 @@ class Record(object):
         data = [self.backing]
         results = json.loads(self.context.make_request(self.resource_type,
             "POST", data=json.dumps(data)))
-        self.backing = results[0]
+        self.saved(results[0])
+
+    def saved(self, backing):
+        """
+        Replaces this record's data with the data returned by TaguchiMail
+        when it is saved.
+
+        backing: dict
+            Contains the saved record.
+        """
+        self.backing = backing
@@ -0,0 +1,89 @@
+import threading
+
+try:
+    from lxml import etree
+except ImportError:
+    etree = None
+
+from taguchi.history import RevisionCache
+
+# Namespace of the XSLT extension functions available to stylesheets.
+NAMESPACE = "urn:taguchi:render"
+
+def _xml(content):
+    if isinstance(content, unicode):
+        content = content.encode("utf-8")
+    return etree.fromstring(content)
+
+class Renderer(object):
+    """
+    Renders activity content locally, by applying a template revision's
+    XSLT stylesheet to an activity revision's content, so that previews do
+    not require a proof to be sent. Requires the lxml package.
+
+    Compiled stylesheets are kept in an LRU cache keyed by template revision
+    ID (revisions are immutable), so rendering many previews with the same
+    template compiles its stylesheet only once. Revisions without an ID
+    (i.e. not yet saved) are compiled every time.
+
+    The request content of a trigger, if given, is available to stylesheets
+    through the request-content() extension function in the
+    urn:taguchi:render namespace, which returns its root element, e.g.:
+    <xsl:value-of select="render:request-content()/firstname"
+        xmlns:render="urn:taguchi:render"/>
+    """
+
+    def __init__(self, cache_size=100):
+        """
+        cache_size: int
+            Indicates the maximum number of compiled stylesheets cached.
+        """
+        if etree is None:
+            raise ImportError("Renderer requires the lxml package")
+        self.cache = RevisionCache(max_size=cache_size)
+        self.local = threading.local()
+
+    def _request_content(self, context):
+        request = getattr(self.local, "request", None)
+        return [request] if request is not None else []
+
+    def _compile(self, content):
+        return etree.XSLT(_xml(content), extensions={
+            (NAMESPACE, "request-content"): self._request_content})
+
+    def stylesheet(self, template_revision):
+        """
+        Returns the compiled stylesheet of a template revision.
+
+        template_revision: TemplateRevision
+            Contains the template revision.
+        """
+        if template_revision.backing.get("id") is None:
+            return self._compile(template_revision.backing["content"])
+        return self.cache.get(("stylesheet", template_revision.record_id),
+            lambda: self._compile(template_revision.backing["content"]))
+
+    def render(self, template_revision, activity_revision,
+               request_content=None):
+        """
+        Renders an activity revision's content with a template revision's
+        stylesheet, returning the output as a string. Raises
+        lxml.etree.XMLSyntaxError if any of the documents are not
+        well-formed, or lxml.etree.XSLTError if the transformation fails.
+
+        template_revision: TemplateRevision
+            Contains the template revision.
+        activity_revision: ActivityRevision
+            Contains the activity revision.
+        request_content: str
+            Contains the XML request content of a trigger. Should be None if
+            unused.
+        """
+        transform = self.stylesheet(template_revision)
+        document = _xml(activity_revision.backing["content"])
+        self.local.request = _xml(request_content) \
+            if request_content is not None else None
+        try:
+            return str(transform(document))
+        finally:
+            self.local.request = None
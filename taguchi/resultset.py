@@ -0,0 +1,79 @@
+class ResultSet(object):
+    """
+    A read-only list of records returned by a find, which keeps the decoded
+    rows (backing dicts) and only wraps a row in a record object when it is
+    indexed or iterated over. Each row is wrapped at most once, even when
+    accessed through slices of the result set (which share its records), so
+    changes made to a record are kept for the lifetime of the result set.
+
+    len(), slicing and the column accessors (ids, pluck) do not wrap any
+    rows.
+    """
+
+    def __init__(self, context, record_class, rows, partial=False):
+        """
+        context: Context
+            Determines the TM instance and organization the records belong
+            to.
+        record_class: class
+            The Record subclass used to wrap each row.
+        rows: list
+            Contains the decoded rows.
+        partial: bool
+            If True, the rows hold only some of the records' fields; see
+            Record.from_backing.
+        """
+        self.context = context
+        self.record_class = record_class
+        self.rows = rows
+        self.partial = partial
+        # Records wrapped so far, shared with any slices, which keep the
+        # positions of their rows in it.
+        self._records = [None] * len(rows)
+        self._positions = range(len(rows))
+
+    def __len__(self):
+        return len(self.rows)
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            result = ResultSet(self.context, self.record_class,
+                self.rows[index], partial=self.partial)
+            result._records = self._records
+            result._positions = self._positions[index]
+            return result
+        position = self._positions[index]
+        record = self._records[position]
+        if record is None:
+            record = self.record_class.from_backing(self.context,
+                self.rows[index], partial=self.partial)
+            self._records[position] = record
+        return record
+
+    def __iter__(self):
+        for index in xrange(len(self.rows)):
+            yield self[index]
+
+    def __nonzero__(self):
+        return bool(self.rows)
+
+    def __repr__(self):
+        return "<ResultSet of %d %s>" % (len(self.rows),
+            self.record_class.__name__)
+
+    def ids(self):
+        """
+        Returns the TaguchiMail identifiers of the records, as strings
+        (matching record_id).
+        """
+        return [str(row["id"]) for row in self.rows]
+
+    def pluck(self, field):
+        """
+        Returns the raw value of a field for each record (None where it is
+        missing).
+
+        field: str
+            Contains the field name.
+        """
+        return [row.get(field) for row in self.rows]
@@ -0,0 +1,160 @@
+import json
+import threading
+import collections
+
+from taguchi.identity import IdentityMap
+
+def _snapshot(record):
+    return json.dumps(record.backing, sort_keys=True)
+
+class _TrackingMap(IdentityMap):
+    # Tracks every record retrieved while its session is active.
+
+    def __init__(self, session):
+        super(_TrackingMap, self).__init__()
+        self.session = session
+
+    def resolve(self, record_class, backing, create):
+        record = super(_TrackingMap, self).resolve(record_class, backing,
+            create)
+        self.session.track(record)
+        return record
+
+class Session(object):
+    """
+    A unit of work which tracks new and changed records and saves them in
+    as few requests as possible when flushed, rather than with a request
+    per record.
+
+    Used as a context manager, a session installs an identity map on its
+    context, so that every record retrieved within the block resolves to a
+    single object and is tracked automatically; the session is flushed
+    when the block exits without an exception.
+
+    with Session(context) as session:
+        for subscriber in Subscriber.find(context, ...):
+            subscriber.set_custom_field("score", "1")
+        session.add(new_subscriber)
+
+    On flush, records are grouped by resource and operation and sent as
+    array request bodies of up to batch_size records:
+    * POST: records added with add() which have no ID;
+    * PUT: tracked records whose data has changed since they were
+      retrieved or last saved;
+    * CREATEORUPDATE: subscribers added with create_or_update().
+    The data returned by TaguchiMail is written back into each record.
+    """
+
+    def __init__(self, context, batch_size=100):
+        """
+        context: Context
+            Determines the TM instance and organization to save to.
+        batch_size: int
+            Indicates the maximum number of records per request.
+        """
+        self.context = context
+        self.batch_size = batch_size
+        self.identity_map = _TrackingMap(self)
+        self.new = []
+        self.upserts = []
+        self.snapshots = {} # id(record) -> (record, snapshot)
+        self.lock = threading.Lock()
+        self._previous_map = None
+
+    def track(self, record):
+        """
+        Starts tracking changes to a record, unless it is already tracked.
+
+        record: Record
+            Contains a record which exists in TaguchiMail.
+        """
+        with self.lock:
+            if id(record) not in self.snapshots:
+                self.snapshots[id(record)] = (record, _snapshot(record))
+
+    def add(self, record):
+        """
+        Adds a record to the session, to be created on flush if it has no
+        ID, or updated otherwise.
+
+        record: Record
+            Contains the record.
+        """
+        with self.lock:
+            if record.backing.get("id") is None:
+                self.new.append(record)
+                return
+            # Without a snapshot, the record is saved on the next flush.
+            self.snapshots[id(record)] = (record, None)
+        self.identity_map.add(record)
+
+    def create_or_update(self, subscriber):
+        """
+        Adds a subscriber to be created or updated on flush (see
+        Subscriber.create_or_update).
+
+        subscriber: Subscriber
+            Contains the subscriber.
+        """
+        with self.lock:
+            self.upserts.append(subscriber)
+
+    @property
+    def dirty(self):
+        """
+        The tracked records which have changed since they were retrieved or
+        last saved.
+        """
+        with self.lock:
+            return [record for record, snapshot in self.snapshots.values()
+                if _snapshot(record) != snapshot]
+
+    def _send(self, command, records, sent):
+        groups = collections.OrderedDict()
+        for record in records:
+            groups.setdefault(record.resource_type, []).append(record)
+        for resource, group in groups.items():
+            for start in range(0, len(group), self.batch_size):
+                batch = group[start:start + self.batch_size]
+                data = [record.backing for record in batch]
+                results = json.loads(self.context.make_request(resource,
+                    command, data=json.dumps(data)))
+                for record, result in zip(batch, results):
+                    record.saved(result)
+                    with self.lock:
+                        self.snapshots[id(record)] = (record,
+                            _snapshot(record))
+                    self.identity_map.add(record)
+                    sent.add(id(record))
+
+    def flush(self):
+        """
+        Saves all new and changed records. If a request fails, the exception
+        is raised and the records not yet saved remain pending.
+        """
+        with self.lock:
+            new, self.new = self.new, []
+            upserts, self.upserts = self.upserts, []
+        sent = set()
+        try:
+            self._send("POST", new, sent)
+            self._send("PUT", self.dirty, sent)
+            self._send("CREATEORUPDATE", upserts, sent)
+        finally:
+            with self.lock:
+                self.new = [record for record in new
+                    if id(record) not in sent] + self.new
+                self.upserts = [record for record in upserts
+                    if id(record) not in sent] + self.upserts
+
+    def __enter__(self):
+        self._previous_map = self.context.identity_map
+        self.context.identity_map = self.identity_map
+        return self
+
+    def __exit__(self, type, value, traceback):
+        try:
+            if type is None:
+                self.flush()
+        finally:
+            self.context.identity_map = self._previous_map
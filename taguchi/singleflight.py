@@ -0,0 +1,52 @@
+import sys
+import threading
+
+class _Call(object):
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+class SingleFlight(object):
+    """
+    Merges concurrent identical calls: while a call for a key is in
+    progress, other callers with the same key wait for it and share its
+    result (or exception) instead of making the call again. Calls made
+    after it has finished are made afresh, so no result is cached.
+    """
+
+    def __init__(self):
+        self.calls = {}
+        self.lock = threading.Lock()
+
+    def do(self, key, function):
+        """
+        Calls a function, unless a call with the same key is in progress,
+        in which case its result is awaited and returned.
+
+        key: hashable
+            Identifies the call.
+        function: function
+            Called without arguments to make the call.
+        """
+        with self.lock:
+            call = self.calls.get(key)
+            leader = call is None
+            if leader:
+                call = self.calls[key] = _Call()
+        if not leader:
+            call.done.wait()
+            if call.error is not None:
+                raise call.error[0], call.error[1], call.error[2]
+            return call.result
+        try:
+            call.result = function()
+        except:
+            call.error = sys.exc_info()
+            raise
+        finally:
+            with self.lock:
+                del self.calls[key]
+            call.done.set()
+        return call.result
@@ -0,0 +1,220 @@
+import json
+import array
+import collections
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+NAN = float("nan")
+
+def _is_number(value):
+    return value is None or (isinstance(value, (int, long, float)) and
+        not isinstance(value, bool))
+
+def _decode(result):
+    # The stats resource returns either a list of row dicts, or a list of
+    # row lists headed by the column names.
+    rows = json.loads(result, object_pairs_hook=collections.OrderedDict)
+    if rows and isinstance(rows[0], list):
+        return [dict(zip(rows[0], row)) for row in rows[1:]]
+    return rows
+
+def _divide(numerator, denominator):
+    if numpy is not None and isinstance(numerator, numpy.ndarray):
+        with numpy.errstate(divide="ignore", invalid="ignore"):
+            result = numerator / denominator
+        result[denominator == 0] = NAN
+        return result
+    return array.array("d", [n / d if d else NAN
+        for n, d in zip(numerator, denominator)])
+
+class _ColumnBuilder(object):
+    # Accumulates rows into columns: an array.array of doubles while all of
+    # a column's values are numeric (None being NaN), a list once any isn't.
+
+    def __init__(self):
+        self.columns = collections.OrderedDict()
+        self.length = 0
+
+    def add(self, rows):
+        for row in rows:
+            for name in row:
+                if name not in self.columns:
+                    self.columns[name] = array.array("d", [NAN] * self.length)
+            for name, column in self.columns.items():
+                value = row.get(name)
+                if isinstance(column, array.array):
+                    if _is_number(value):
+                        column.append(NAN if value is None else value)
+                        continue
+                    column = self.columns[name] = list(column)
+                column.append(value)
+            self.length += 1
+
+    def table(self):
+        columns = collections.OrderedDict()
+        for name, column in self.columns.items():
+            if numpy is not None and isinstance(column, array.array):
+                column = numpy.frombuffer(column, dtype=numpy.float64).copy() \
+                    if column else numpy.zeros(0)
+            columns[name] = column
+        return StatsTable(columns)
+
+class StatsTable(object):
+    """
+    Statistics in columnar form. Each numeric column is a NumPy array of
+    floats (or an array.array('d') if NumPy is not installed), with missing
+    values as NaN; other columns (e.g. dates) are lists. Columns are
+    retrieved by name, e.g. table["opens"].
+    """
+
+    def __init__(self, columns):
+        """
+        columns: OrderedDict
+            Contains the columns (all of the same length), by name.
+        """
+        self.columns = columns
+
+    @property
+    def names(self):
+        """
+        Names of the columns, in the order in which they were returned.
+        """
+        return list(self.columns)
+
+    def __len__(self):
+        for column in self.columns.values():
+            return len(column)
+        return 0
+
+    def __getitem__(self, name):
+        return self.columns[name]
+
+    def __contains__(self, name):
+        return name in self.columns
+
+    def rows(self):
+        """
+        Iterates over the rows of the table as dicts.
+        """
+        names = self.names
+        for values in zip(*self.columns.values()):
+            yield dict(zip(names, values))
+
+    def rate(self, numerator, denominator):
+        """
+        Returns the element-wise ratio of two numeric columns as a column,
+        NaN where the denominator is zero. The division is a single
+        vectorized operation if NumPy is installed.
+
+        numerator: str
+            Contains the name of the numerator column.
+        denominator: str
+            Contains the name of the denominator column.
+        """
+        return _divide(self.columns[numerator], self.columns[denominator])
+
+    def open_rate(self, opens="opens", sends="sends"):
+        """
+        Returns the open rate of each row; see rate.
+
+        opens: str
+            Contains the name of the column counting opens.
+        sends: str
+            Contains the name of the column counting messages sent.
+        """
+        return self.rate(opens, sends)
+
+    def click_rate(self, clicks="clicks", sends="sends"):
+        """
+        Returns the click rate of each row; see rate. Pass the name of the
+        opens column as sends for the click-to-open rate.
+
+        clicks: str
+            Contains the name of the column counting clicks.
+        sends: str
+            Contains the name of the column counting messages sent.
+        """
+        return self.rate(clicks, sends)
+
+class Stats(object):
+    """
+    Wraps the TaguchiMail stats resource, which returns tabular statistics
+    (e.g. per-activity sends, opens and clicks over a time range), as
+    StatsTables.
+    """
+
+    @staticmethod
+    def iter_pages(context, query=None, parameters=None, page_size=1000):
+        """
+        Iterates over the statistics matching a query, fetching them a page
+        at a time and yielding each page as a StatsTable, so that large
+        time ranges can be processed without holding every row in memory.
+
+        context: Context
+            Determines the TM instance and organization to query.
+        query: list
+            Contains query predicates, each of the form: [field]-[operator]-
+            [value] (e.g. date-gte-2012-01-01); see Context.make_request.
+        parameters: dict
+            Contains additional request parameters, if any.
+        page_size: int
+            Indicates the number of rows to fetch per request.
+        """
+        for rows in Stats._iter_rows(context, query, parameters, page_size):
+            builder = _ColumnBuilder()
+            builder.add(rows)
+            yield builder.table()
+
+    @staticmethod
+    def find(context, query=None, parameters=None, page_size=1000):
+        """
+        Retrieves all of the statistics matching a query as a single
+        StatsTable. Pages are decoded one at a time and appended to the
+        columns, so only the columnar data is retained. Arguments are as
+        for iter_pages.
+        """
+        builder = _ColumnBuilder()
+        for rows in Stats._iter_rows(context, query, parameters, page_size):
+            builder.add(rows)
+        return builder.table()
+
+    @staticmethod
+    def for_activity(context, activity_id, query=None, parameters=None,
+                     page_size=1000):
+        """
+        Retrieves the statistics of an activity as a StatsTable; see find.
+
+        activity_id: str/int
+            Contains the activity's unique TaguchiMail identifier.
+        """
+        return Stats.find(context, list(query or []) +
+            ["activity_id-eq-%s" % activity_id], parameters, page_size)
+
+    @staticmethod
+    def for_campaign(context, campaign_id, query=None, parameters=None,
+                     page_size=1000):
+        """
+        Retrieves the statistics of a campaign as a StatsTable; see find.
+
+        campaign_id: str/int
+            Contains the campaign's unique TaguchiMail identifier.
+        """
+        return Stats.find(context, list(query or []) +
+            ["campaign_id-eq-%s" % campaign_id], parameters, page_size)
+
+    @staticmethod
+    def _iter_rows(context, query, parameters, page_size):
+        offset = 0
+        while True:
+            page_parameters = dict(parameters or {})
+            page_parameters.update(offset=str(offset), limit=str(page_size))
+            rows = _decode(context.make_request("stats", "GET",
+                parameters=page_parameters, query=query))
+            if rows:
+                yield rows
+            if len(rows) < page_size:
+                return
+            offset += len(rows)
@@ -0,0 +1,104 @@
+import json
+
+# Size at which encoded body fragments are sent as a chunk.
+CHUNK_SIZE = 65536
+
+def is_stream(body):
+    """
+    Checks whether a request body is a stream (an iterable of strings)
+    rather than a string or None.
+    """
+    return body is not None and not isinstance(body, basestring)
+
+def _chunks(fragments, chunk_size):
+    buffer = []
+    length = 0
+    for fragment in fragments:
+        buffer.append(fragment)
+        length += len(fragment)
+        if length >= chunk_size:
+            yield "".join(buffer)
+            buffer = []
+            length = 0
+    if buffer:
+        yield "".join(buffer)
+
+def iter_json_array(items, chunk_size=CHUNK_SIZE):
+    """
+    Encodes a stream of items as a JSON array, yielding the encoded array
+    in chunks of about chunk_size characters, so that only one chunk is
+    held in memory at a time. The result may be passed as the data of
+    Context.make_request, which then sends it with chunked transfer
+    encoding.
+
+    items: iterable
+        Contains the JSON-serializable items (e.g. from a generator).
+    chunk_size: int
+        Indicates the approximate size of each chunk.
+    """
+    def fragments():
+        yield "["
+        separator = ""
+        for item in items:
+            yield separator
+            yield json.dumps(item)
+            separator = ", "
+        yield "]"
+    return _chunks(fragments(), chunk_size)
+
+def iter_json(value, chunk_size=CHUNK_SIZE, **streams):
+    """
+    Encodes a JSON object incrementally, like iter_json_array, where the
+    values of some of its keys are streams of items encoded as arrays.
+
+    value: dict
+        Contains the object's other (JSON-serializable) values.
+    chunk_size: int
+        Indicates the approximate size of each chunk.
+    streams: iterables
+        Contain the items of each streamed array, by key.
+    """
+    def fragments():
+        head = json.dumps(value)
+        if not streams:
+            yield head
+            return
+        yield head[:-1]
+        separator = ", " if value else ""
+        for key, items in sorted(streams.items()):
+            yield separator + json.dumps(key) + ": "
+            for chunk in iter_json_array(items, chunk_size):
+                yield chunk
+            separator = ", "
+        yield "}"
+    return _chunks(fragments(), chunk_size)
+
+class StreamReader(object):
+    """
+    Presents a stream of strings as a file-like object, for HTTP clients
+    which read request bodies from files. Iterating over it yields the
+    rest of the stream.
+    """
+
+    def __init__(self, stream):
+        self.stream = iter(stream)
+        self.buffer = ""
+
+    def read(self, size=-1):
+        while size < 0 or len(self.buffer) < size:
+            try:
+                self.buffer += next(self.stream)
+            except StopIteration:
+                break
+        if size < 0:
+            result, self.buffer = self.buffer, ""
+        else:
+            result, self.buffer = self.buffer[:size], self.buffer[size:]
+        return result
+
+    def __iter__(self):
+        if self.buffer:
+            buffer, self.buffer = self.buffer, ""
+            yield buffer
+        for chunk in self.stream:
+            yield chunk
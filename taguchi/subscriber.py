@@ -1,7 +1,12 @@
 import json
 import datetime
 
+from taguchi.query import Query
+from taguchi.paging import iter_rows, select_fields, project
+from taguchi.paging import count_rows
+from taguchi.hashcache import split_unchanged
 from taguchi.record import Record
+from taguchi.resultset import ResultSet
 
 class Subscriber(Record):
 
@@ -438,10 +443,41 @@ class Subscriber(Record):
         data = [self.backing]
         results = json.loads(self.context.make_request(self.resource_type,
             "CREATEORUPDATE", data=json.dumps(data)))
-        self.backing = results[0]
+        self.saved(results[0])
 
     @staticmethod
-    def get(context, record_id, parameters):
+    def create_or_update_many(context, subscribers, hash_store=None):
+        """
+        Creates or updates several subscribers with a single request (see
+        create_or_update), writing the results back to each subscriber.
+        Returns the subscribers which were sent.
+
+        context: Context
+            Determines the TM instance and organization to update.
+        subscribers: list
+            Contains the subscribers to create or update.
+        hash_store: MemoryHashStore/FileHashStore/SqliteHashStore
+            If not None, subscribers whose content is unchanged since it was
+            last saved are not sent, and the store is updated with the new
+            content of those which are.
+        """
+        hashes = []
+        if hash_store is not None:
+            subscribers, unchanged, hashes = split_unchanged(subscribers,
+                hash_store)
+        if not subscribers:
+            return []
+        data = [subscriber.backing for subscriber in subscribers]
+        results = json.loads(context.make_request("subscriber",
+            "CREATEORUPDATE", data=json.dumps(data)))
+        for subscriber, result in zip(subscribers, results):
+            subscriber.saved(result)
+        if hashes:
+            hash_store.set_many(hashes)
+        return subscribers
+
+    @staticmethod
+    def get(context, record_id, parameters, fields=None):
         """
         Retreives a single Subscriber based on its TaguchiMail identifier.
 
@@ -449,17 +485,23 @@ class Subscriber(Record):
             Determines the TM instance and organization to query.
         record_id: str/int
             Contains the record's unique TaguchiMail identifier.
-        """
+        fields: list
+            Contains the fields to retrieve (the ID is always included), or
+            None for all fields. Subscribers retrieved with a subset of
+            their fields are not added to the context's identity map, and
+            should not be saved.
+        """
+        if fields:
+            parameters = select_fields(context, parameters, fields)
         results = json.loads(context.make_request("subscriber", "GET",
             record_id=record_id, parameters=parameters))
-        record = Subscriber(context)
-        record.backing = results[0]
-        return record
+        return Subscriber.from_backing(context, project(results[0], fields),
+            partial=bool(fields))
 
     @staticmethod
-    def find(context, sort, order, offset, limit, query):
+    def find(context, sort, order, offset, limit, query, fields=None):
         """
-        Retrieves a list of Subscriber(s) based on a query.
+        Retrieves a ResultSet of Subscriber(s) based on a query.
 
         context: Context
             Determines the TM instance and organization to query.
@@ -500,17 +542,62 @@ class Subscriber(Record):
               in the database as [field]-eq-null is always false;
             * nt: mapped to SQL 'IS NOT', should be used to test for NOT NULL
               values in the database as [field]-neq-null is always false.
+        fields: list
+            Contains the fields to retrieve (see get), or None for all
+            fields.
         """
-        parameters = dict(sort=sort, order=order, offset=str(offset),
+        parameters = select_fields(context, None, fields)
+        parameters.update(sort=sort, order=order, offset=str(offset),
             limit=str(limit))
         results = json.loads(context.make_request("subscriber", "GET",
             parameters=parameters, query=query))
-        records = []
-        for result in results:
-            record = Subscriber(context)
-            record.backing = result
-            records.append(record)
-        return records
+        if fields:
+            results = [project(result, fields) for result in results]
+        return ResultSet(context, Subscriber, results, partial=bool(fields))
+
+    @staticmethod
+    def count(context, query, estimate=False):
+        """
+        Returns the number of subscribers matching a query, without
+        retrieving them; see taguchi.paging.count_rows.
+
+        context: Context
+            Determines the TM instance and organization to query.
+        query: list
+            Contains query predicates; see find.
+        estimate: bool
+            If True, the count is found with O(log n) single-record
+            requests rather than by paging through the matching IDs.
+        """
+        return count_rows(context, "subscriber", query=query,
+            estimate=estimate)
+
+    @staticmethod
+    def iter_find(context, sort="id", order="asc", query=None,
+                  page_size=1000, fields=None):
+        """
+        Iterates over all Subscriber(s) matching a query, fetching them a
+        page at a time so that only one page is held in memory. Results
+        sorted by ID are paged by keyset (see taguchi.paging.iter_rows).
+
+        context: Context
+            Determines the TM instance and organization to query.
+        sort: str
+            Indicates which of the record's fields should be used to sort
+            the output.
+        order: str
+            Contains either 'asc' or 'desc'.
+        query: list
+            Contains query predicates; see find.
+        page_size: int
+            Indicates the number of records to fetch per request.
+        fields: list
+            Contains the fields to retrieve (see get), or None for all
+            fields.
+        """
+        for row in iter_rows(context, "subscriber", query=query, sort=sort,
+                order=order, page_size=page_size, fields=fields):
+            yield Subscriber.from_backing(context, row, partial=bool(fields))
 
 class SubscriberList(Record):
 
@@ -614,8 +701,26 @@ class SubscriberList(Record):
         Retrieves (limit) subscribers to this list (regardless of
         opt-in/opt-out status), starting with the (offset)th subscriber.
         """
+        query = Query("subscriber").eq("list_id", self.record_id)
         return Subscriber.find(self.context, "id", "asc", offset, limit,
-            ["list_id-eq-" + self.record_id])
+            query.predicates())
+
+    def iter_subscribers(self, page_size=1000, fields=None):
+        """
+        Iterates over all subscribers to this list (regardless of
+        opt-in/opt-out status) in ID order. Unlike get_subscribers with an
+        increasing offset, each page costs the same to retrieve however far
+        into the list it is.
+
+        page_size: int
+            Indicates the number of subscribers to fetch per request.
+        fields: list
+            Contains the fields to retrieve (see Subscriber.get), or None
+            for all fields.
+        """
+        query = Query("subscriber").eq("list_id", self.record_id)
+        return Subscriber.iter_find(self.context, query=query.predicates(),
+            page_size=page_size, fields=fields)
 
     @staticmethod
     def get(context, record_id, parameters):
@@ -629,14 +734,12 @@ class SubscriberList(Record):
         """
         results = json.loads(context.make_request("list", "GET",
             record_id=record_id, parameters=parameters))
-        record = SubscriberList(context)
-        record.backing = results[0]
-        return record
+        return SubscriberList.from_backing(context, results[0])
 
     @staticmethod
     def find(context, sort, order, offset, limit, query):
         """
-        Retrieves a list of SubscriberList(s) based on a query.
+        Retrieves a ResultSet of SubscriberList(s) based on a query.
 
         context: Context
             Determines the TM instance and organization to query.
@@ -682,9 +785,20 @@ class SubscriberList(Record):
             limit=str(limit))
         results = json.loads(context.make_request("list", "GET",
             parameters=parameters, query=query))
-        records = []
-        for result in results:
-            record = SubscriberList(context)
-            record.backing = result
-            records.append(record)
-        return records
+        return ResultSet(context, SubscriberList, results)
+
+    @staticmethod
+    def count(context, query, estimate=False):
+        """
+        Returns the number of subscriber lists matching a query,
+        without retrieving them; see taguchi.paging.count_rows.
+
+        context: Context
+            Determines the TM instance and organization to query.
+        query: list
+            Contains query predicates; see find.
+        estimate: bool
+            If True, the count is found with O(log n) single-record
+            requests rather than by paging through the matching IDs.
+        """
+        return count_rows(context, "list", query=query, estimate=estimate)
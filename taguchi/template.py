@@ -1,6 +1,9 @@
 import json
 
 from taguchi.record import Record
+from taguchi.paging import count_rows
+from taguchi.history import revision_history
+from taguchi.resultset import ResultSet
 
 class TemplateRevision(object):
 
@@ -145,25 +148,39 @@ class Template(Record):
         else:
             self.backing["revisions"].append(revision)
 
-    def update(self):
+    def saved(self, backing):
         """
-        Saves this template to the TaguchiMail database.
+        Replaces this template's data with the data returned by TaguchiMail
+        when it is saved (by update, create or a Session).
         """
-        super(Template, self).update()
+        super(Template, self).saved(backing)
         # Need to move the existing revisions to avoid re-creating the same
         # ones if this object is saved again.
         self.existing_revisions = self.backing["revisions"]
         self.backing["revisions"] = []
 
-    def create(self):
+    def get_revisions(self, cache=None):
         """
-        Creates this template in the TaguchiMail database.
+        Retrieves this template's revisions, newest first, as TemplateRevision
+        objects. Only revision metadata is retrieved up front; each
+        revision's content is retrieved when first accessed, and cached by
+        revision ID.
+
+        cache: RevisionCache
+            Caches revision content across records; defaults to the shared
+            taguchi.history.CONTENT_CACHE.
         """
-        super(Template, self).create()
-        # Need to move the existing revisions to avoid re-creating the same
-        # ones if this object is saved again.
-        self.existing_revisions = self.backing["revisions"]
-        self.backing["revisions"] = []
+        return revision_history(self, TemplateRevision, cache)
+
+    @classmethod
+    def _wrap(cls, context, backing):
+        record = cls(context)
+        record.backing = backing
+        record.existing_revisions = backing["revisions"]
+        # Clear out existing revisions so they're not sent back to the server
+        # on update.
+        record.backing["revisions"] = []
+        return record
 
     @staticmethod
     def get(context, record_id, parameters):
@@ -177,13 +194,7 @@ class Template(Record):
         """
         results = json.loads(context.make_request("template", "GET",
             record_id=record_id, parameters=parameters))
-        record = Template(context)
-        record.backing = results[0]
-        record.existing_revisions = record.backing["revisions"]
-        # Clear out existing revisions so they're not sent back to the server
-        # on update.
-        record.backing["revisions"] = []
-        return record
+        return Template.from_backing(context, results[0])
 
     @staticmethod
     def get_with_content(context, record_id):
@@ -201,7 +212,7 @@ class Template(Record):
     @staticmethod
     def find(context, sort, order, offset, limit, query):
         """
-        Retrieves a list of Template(s) based on a query.
+        Retrieves a ResultSet of Template(s) based on a query.
 
         context: Context
             Determines the TM instance and organization to query.
@@ -247,13 +258,20 @@ class Template(Record):
             limit=str(limit))
         results = json.loads(context.make_request("template", "GET",
             parameters=parameters, query=query))
-        records = []
-        for result in results:
-            record = Template(context)
-            record.backing = result
-            record.existing_revisions = record.backing["revisions"]
-            # Clear out existing revisions so they're not sent back to the
-            # server on update.
-            record.backing["revisions"] = []
-            records.append(record)
-        return records
+        return ResultSet(context, Template, results)
+
+    @staticmethod
+    def count(context, query, estimate=False):
+        """
+        Returns the number of templates matching a query, without
+        retrieving them; see taguchi.paging.count_rows.
+
+        context: Context
+            Determines the TM instance and organization to query.
+        query: list
+            Contains query predicates; see find.
+        estimate: bool
+            If True, the count is found with O(log n) single-record
+            requests rather than by paging through the matching IDs.
+        """
+        return count_rows(context, "template", query=query, estimate=estimate)
@@ -0,0 +1,113 @@
+import collections
+import multiprocessing
+
+from taguchi.subscriber import Subscriber
+
+def _transform(args):
+    # Runs in a worker process. Records are created without a context, so
+    # transform functions cannot make requests.
+    function, record_class, backings = args
+    results = []
+    for backing in backings:
+        record = record_class(None)
+        record.backing = backing
+        record = function(record)
+        results.append(record.backing if record is not None else None)
+    return results
+
+class TransformPool(object):
+    """
+    Runs a transform function over records in a pool of worker processes,
+    so that CPU-heavy per-record work (mapping fields, set_custom_field,
+    subscribe_to_list and so on) is not limited to a single core while
+    requests are made from threads in the calling process.
+
+    The function is called with a record object (e.g. a Subscriber) whose
+    backing is a copy of the original, and should return the record
+    (modified or replaced) or None to drop it. Records are passed to the
+    workers in batches of raw backing dicts to keep pickling cheap, so the
+    function must be defined at module level, and the records it receives
+    have no context.
+    """
+
+    def __init__(self, function, record_class=Subscriber, processes=None,
+                 batch_size=500):
+        """
+        Starts a transform pool.
+
+        function: function
+            The transform function, as described above.
+        record_class: class
+            The Record subclass used to wrap each backing dict.
+        processes: int
+            Indicates the number of worker processes; defaults to the
+            number of CPUs.
+        batch_size: int
+            Indicates the number of records sent to a worker at a time by
+            imap.
+        """
+        self.function = function
+        self.record_class = record_class
+        self.processes = processes or multiprocessing.cpu_count()
+        self.batch_size = batch_size
+        self.pool = multiprocessing.Pool(self.processes)
+
+    def transform(self, backings):
+        """
+        Transforms a batch of backing dicts in a worker process, returning a
+        list of the same length containing the transformed backing dicts
+        (None for dropped records). May be called from several threads at
+        once.
+
+        backings: list
+            Contains the backing dicts to transform.
+        """
+        return self.pool.apply(_transform,
+            ((self.function, self.record_class, list(backings)),))
+
+    def imap(self, backings):
+        """
+        Transforms a stream of backing dicts, yielding the transformed
+        backing dicts (in order, without dropped records). At most two
+        batches per worker are in progress at once, so memory use does not
+        depend on the length of the stream.
+
+        backings: iterable
+            Contains the backing dicts to transform.
+        """
+        pending = collections.deque()
+        batch = []
+        for backing in backings:
+            batch.append(backing)
+            if len(batch) >= self.batch_size:
+                pending.append(self.pool.apply_async(_transform,
+                    ((self.function, self.record_class, batch),)))
+                batch = []
+                if len(pending) >= self.processes * 2:
+                    for result in pending.popleft().get():
+                        if result is not None:
+                            yield result
+        if batch:
+            pending.append(self.pool.apply_async(_transform,
+                ((self.function, self.record_class, batch),)))
+        while pending:
+            for result in pending.popleft().get():
+                if result is not None:
+                    yield result
+
+    def close(self):
+        """
+        Stops the worker processes.
+        """
+        self.pool.close()
+        self.pool.join()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, type, value, traceback):
+        if type is None:
+            self.close()
+        else:
+            self.pool.terminate()
+            self.pool.join()
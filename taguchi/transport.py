@@ -0,0 +1,334 @@
+import errno
+import socket
+import httplib
+import threading
+
+from taguchi.streaming import is_stream, StreamReader
+
+try:
+    import hyper
+except ImportError:
+    hyper = None
+
+def _send(conn, method, uri, body, headers):
+    # Sends a request on an httplib connection; streamed bodies are sent
+    # a chunk at a time with chunked transfer encoding.
+    if not is_stream(body):
+        conn.request(method, uri, body, headers)
+        return
+    conn.putrequest(method, uri, skip_accept_encoding=True)
+    for key, value in headers.items():
+        conn.putheader(key, value)
+    conn.endheaders()
+    for chunk in body:
+        if chunk:
+            if isinstance(chunk, unicode):
+                chunk = chunk.encode("utf-8")
+            conn.send("%x\r\n%s\r\n" % (len(chunk), chunk))
+    conn.send("0\r\n\r\n")
+
+class HTTPSTransport(object):
+    """
+    Sends each request over a new HTTPS (HTTP/1.1) connection. This is the
+    default transport.
+
+    Transports execute requests built by Context.make_request; any object
+    with a request method of the same signature may be used.
+    """
+
+    def __init__(self, timeout=60, port=None, ssl_context=None):
+        """
+        timeout: int
+            Indicates the connection timeout, in seconds.
+        port: int
+            Indicates the server port, or None for the HTTPS default.
+        ssl_context: SSLContext
+            Contains custom TLS settings, or None.
+        """
+        self.timeout = timeout
+        self.port = port
+        self.ssl_context = ssl_context
+        self.options = dict(timeout=timeout)
+        if port is not None:
+            self.options["port"] = port
+        if ssl_context is not None:
+            self.options["context"] = ssl_context
+
+    def request(self, hostname, method, uri, body, headers):
+        """
+        Sends a request and returns the response body.
+
+        hostname: str
+            Contains the hostname (or IP address) of the TaguchiMail
+            instance.
+        method: str
+            Contains the HTTP method.
+        uri: str
+            Contains the request path and query string.
+        body: str/iterable
+            Contains the request body, or None. Bodies given as iterables
+            of strings are sent with chunked transfer encoding.
+        headers: dict
+            Contains the request headers.
+        """
+        conn = httplib.HTTPSConnection(hostname, **self.options)
+        _send(conn, method, uri, body, headers)
+        result = conn.getresponse().read()
+        conn.close()
+        return result
+
+class PooledHTTPSTransport(object):
+    """
+    Sends requests over persistent (keep-alive) HTTPS connections, reusing
+    idle connections to each host rather than making a new connection (and
+    TLS handshake) for every request. Safe for use from several threads; a
+    connection is only ever used by one request at a time.
+    """
+
+    def __init__(self, timeout=60, size=8):
+        """
+        timeout: int
+            Indicates the connection timeout, in seconds.
+        size: int
+            Indicates the maximum number of idle connections kept per host.
+        """
+        self.timeout = timeout
+        self.size = size
+        self.idle = {}
+        self.lock = threading.Lock()
+
+    def _acquire(self, hostname):
+        with self.lock:
+            idle = self.idle.get(hostname)
+            if idle:
+                return idle.pop(), True
+        return httplib.HTTPSConnection(hostname, timeout=self.timeout), False
+
+    def _release(self, hostname, conn):
+        with self.lock:
+            idle = self.idle.setdefault(hostname, [])
+            if len(idle) < self.size:
+                idle.append(conn)
+                return
+        conn.close()
+
+    @staticmethod
+    def _can_retry(method, error, responded):
+        # A request which timed out may still be being processed, so is
+        # never repeated. Otherwise GETs are safe to repeat; other requests
+        # (e.g. TRIGGER) are only repeated if the connection turns out to
+        # have been closed by the server while idle, i.e. it fails before
+        # any of the response is received.
+        if isinstance(error, socket.timeout):
+            return False
+        if method == "GET":
+            return True
+        if responded:
+            return False
+        if isinstance(error, httplib.BadStatusLine):
+            return True
+        return isinstance(error, socket.error) and error.errno in (
+            errno.ECONNRESET, errno.EPIPE, errno.ECONNABORTED)
+
+    def _attempt(self, conn, method, uri, body, headers):
+        # Returns (response, result, error, responded).
+        response = None
+        try:
+            _send(conn, method, uri, body, headers)
+            response = conn.getresponse()
+            return response, response.read(), None, True
+        except (httplib.HTTPException, socket.error) as e:
+            conn.close()
+            return None, None, e, response is not None
+
+    def request(self, hostname, method, uri, body, headers):
+        """
+        Sends a request and returns the response body; see
+        HTTPSTransport.request.
+
+        A request which fails on a reused connection is sent again on a new
+        connection if it is a GET, or if the server had closed the
+        connection before the request was received; requests which time
+        out are not sent again.
+        """
+        if is_stream(body):
+            # A streamed body can't be sent again, so don't risk a stale
+            # connection.
+            conn, reused = httplib.HTTPSConnection(hostname,
+                timeout=self.timeout), False
+        else:
+            conn, reused = self._acquire(hostname)
+        response, result, error, responded = self._attempt(conn, method,
+            uri, body, headers)
+        if error is not None:
+            if not reused or not self._can_retry(method, error, responded):
+                raise error
+            conn = httplib.HTTPSConnection(hostname, timeout=self.timeout)
+            response, result, error, responded = self._attempt(conn, method,
+                uri, body, headers)
+            if error is not None:
+                raise error
+        if response.getheader("connection", "").lower() == "close":
+            conn.close()
+        else:
+            self._release(hostname, conn)
+        return result
+
+    def close(self):
+        """
+        Closes all idle connections.
+        """
+        with self.lock:
+            for idle in self.idle.values():
+                for conn in idle:
+                    conn.close()
+            self.idle = {}
+
+class LoopbackTransport(object):
+    """
+    Passes requests to a function in the same process instead of sending
+    them over the network, e.g. to test code against a fake TaguchiMail
+    instance or to inject faults. Requests made are kept in the requests
+    attribute as (hostname, method, uri, body, headers) tuples.
+    """
+
+    def __init__(self, handler):
+        """
+        handler: function
+            Called with (method, uri, body, headers) for each request; its
+            return value is used as the response body, and any exception it
+            raises is propagated to the caller.
+        """
+        self.handler = handler
+        self.requests = []
+        self.lock = threading.Lock()
+
+    def request(self, hostname, method, uri, body, headers):
+        """
+        Passes a request to the handler and returns its response body; see
+        HTTPSTransport.request.
+        """
+        with self.lock:
+            self.requests.append((hostname, method, uri, body, headers))
+        return self.handler(method, uri, body, headers)
+
+class HTTP2Transport(object):
+    """
+    Sends requests over a single HTTP/2 connection per host, multiplexing
+    concurrent requests (from any number of threads) over it. Requires the
+    hyper package.
+
+    The protocol is negotiated (via ALPN/NPN) by the first request to each
+    host; if the server does not select HTTP/2, that and all later requests
+    to the host use the fallback HTTP/1.1 transport instead. Requests to
+    a host whose protocol is being negotiated wait for the negotiation to
+    finish; requests to other hosts are not held up.
+    """
+
+    def __init__(self, port=443, secure=True, ssl_context=None,
+                 fallback=None):
+        """
+        port: int
+            Indicates the server port.
+        secure: bool
+            If False, HTTP/2 is spoken over plain TCP (h2c with prior
+            knowledge), with no negotiation or fallback; intended for
+            testing against local servers.
+        ssl_context: SSLContext
+            Contains custom TLS settings, or None.
+        fallback: transport
+            Sends requests to servers which do not support HTTP/2; defaults
+            to an HTTPSTransport using the same port and TLS settings.
+        """
+        if hyper is None:
+            raise ImportError("HTTP2Transport requires the hyper package")
+        self.port = port
+        self.secure = secure
+        self.ssl_context = ssl_context
+        self.fallback = fallback or HTTPSTransport(port=port,
+            ssl_context=ssl_context)
+        self.connections = {}
+        self.http11_hosts = set()
+        # Events set once the negotiation with each host under way is over.
+        self.pending = {}
+        self.lock = threading.Lock()
+
+    @staticmethod
+    def _prepare_stream(body, headers):
+        # HTTP/2 has its own framing, and hyper reads streamed bodies from
+        # file-like objects (or iterates over them when using HTTP/1.1,
+        # adding its own Transfer-Encoding header).
+        if not is_stream(body):
+            return body, headers
+        headers = dict(headers)
+        headers.pop("Transfer-Encoding", None)
+        return StreamReader(body), headers
+
+    def _negotiate(self, hostname, method, uri, body, headers):
+        # hyper.HTTPConnection starts with HTTP/1.1 and switches to HTTP/2
+        # if the server selects it during the TLS handshake, after which it
+        # multiplexes requests like an HTTP20Connection.
+        conn = hyper.HTTPConnection(hostname, self.port, secure=True,
+            ssl_context=self.ssl_context)
+        body, headers = self._prepare_stream(body, headers)
+        conn.request(method, uri, body, headers)
+        response = conn.get_response()
+        result = response.read()
+        with self.lock:
+            if isinstance(response, hyper.HTTP20Response):
+                self.connections[hostname] = conn
+                conn = None
+            else:
+                self.http11_hosts.add(hostname)
+        if conn is not None:
+            conn.close()
+        return result
+
+    def request(self, hostname, method, uri, body, headers):
+        """
+        Sends a request and returns the response body; see
+        HTTPSTransport.request.
+        """
+        headers = dict((key, str(value)) for key, value in headers.items())
+        while True:
+            with self.lock:
+                if hostname in self.http11_hosts:
+                    conn = None
+                    break
+                elif hostname in self.connections:
+                    conn = self.connections[hostname]
+                    break
+                elif not self.secure:
+                    conn = hyper.HTTP20Connection(hostname, self.port,
+                        secure=False)
+                    self.connections[hostname] = conn
+                    break
+                pending = self.pending.get(hostname)
+                negotiate = pending is None
+                if negotiate:
+                    pending = self.pending[hostname] = threading.Event()
+            if negotiate:
+                try:
+                    return self._negotiate(hostname, method, uri, body,
+                        headers)
+                finally:
+                    with self.lock:
+                        del self.pending[hostname]
+                    pending.set()
+            # If the negotiation failed, the next attempt negotiates again.
+            pending.wait()
+        if conn is None:
+            return self.fallback.request(hostname, method, uri, body,
+                headers)
+        body, headers = self._prepare_stream(body, headers)
+        stream_id = conn.request(method, uri, body, headers)
+        return conn.get_response(stream_id).read()
+
+    def close(self):
+        """
+        Closes all HTTP/2 connections.
+        """
+        with self.lock:
+            for conn in self.connections.values():
+                conn.close()
+            self.connections = {}
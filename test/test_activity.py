@@ -141,6 +141,39 @@ class TestActivity(mox.MoxTestBase):
         record.proof("1", "subject", "hello")
         self.mox.VerifyAll()
 
+    def test_proof_many(self):
+        context = self.mox.CreateMockAnything()
+        for record_id in ("1", "2"):
+            context.make_request("activity", "PROOF", record_id=record_id,
+                data=json.dumps([{"id": record_id, "list_id": "5",
+                "tag": "subject", "message": "hello"}])).InAnyOrder()
+        context.make_request("activity", "PROOF", record_id="3",
+            data=mox.IgnoreArg()).InAnyOrder().AndRaise(IOError("timeout"))
+        self.mox.ReplayAll()
+
+        record = Activity(context)
+        record.backing = {"id": 1}
+        outcomes = Activity.proof_many(context, [record, 2, "3"], "5",
+            "subject", "hello")
+        self.assertEqual(["1", "2", "3"], outcomes.keys())
+        self.assertEqual([None, None, "request failed: timeout"],
+            outcomes.values())
+        self.mox.VerifyAll()
+
+    def test_request_approval_many_packed(self):
+        context = self.mox.CreateMockAnything()
+        subscriber_list = self.mox.CreateMockAnything()
+        subscriber_list.record_id = "5"
+        context.make_request("activity", "APPROVAL", data=json.dumps([
+            {"id": record_id, "list_id": "5", "tag": "subject",
+            "message": "hello"} for record_id in ("1", "2")]))
+        self.mox.ReplayAll()
+
+        outcomes = Activity.request_approval_many(context, [1, 2],
+            subscriber_list, "subject", "hello", packed=True)
+        self.assertEqual({"1": None, "2": None}, dict(outcomes))
+        self.mox.VerifyAll()
+
     def test_request_approval(self):
         context = self.mox.CreateMockAnything()
         context.make_request("activity", "APPROVAL", record_id="1",
@@ -0,0 +1,86 @@
+import os
+import sys
+import mox
+import time
+import shutil
+import tempfile
+import unittest
+
+sys.path.append("..")
+from taguchi.context import Context
+from taguchi.transport import LoopbackTransport
+from taguchi.cassette import scrub_uri, read_cassette, scrub_cassette
+from taguchi.cassette import RecordingTransport, ReplayTransport
+
+class TestCassette(mox.MoxTestBase):
+
+    def setUp(self):
+        mox.MoxTestBase.setUp(self)
+        self.directory = tempfile.mkdtemp()
+        self.responses = ["first", "second"]
+        def handler(method, uri, body, headers):
+            return self.responses.pop(0)
+        self.backend = LoopbackTransport(handler)
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+        mox.MoxTestBase.tearDown(self)
+
+    def record(self, path, scrub=True):
+        transport = RecordingTransport(self.backend, path, scrub=scrub)
+        context = Context("127.0.0.1", "test@taguchimail.com", "X", 1,
+            transport=transport)
+        context.make_request("subscriber", "GET", record_id=1)
+        context.make_request("subscriber", "GET", record_id=1)
+        transport.close()
+
+    def test_scrub_uri(self):
+        self.assertEqual("/admin/api/1/subscriber/?_method=GET&"
+            "auth=REDACTED&limit=1", scrub_uri("/admin/api/1/subscriber/?"
+            "_method=GET&auth=test%40taguchimail.com%7CX&limit=1"))
+        self.assertEqual("/x?auth=", scrub_uri("/x?auth=a", ""))
+
+    def test_record_and_replay(self):
+        for name in ("cassette", "cassette.gz"):
+            self.responses = ["first", "second"]
+            path = os.path.join(self.directory, name)
+            self.record(path)
+            interactions = list(read_cassette(path))
+            self.assertEqual(2, len(interactions))
+            self.assertTrue("auth=REDACTED" in interactions[0]["uri"])
+            self.assertEqual("first", interactions[0]["response"])
+
+            context = Context("127.0.0.1", "other@taguchimail.com", "Y", 1,
+                transport=ReplayTransport(path))
+            self.assertEqual("first", context.make_request("subscriber",
+                "GET", record_id=1))
+            self.assertEqual("second", context.make_request("subscriber",
+                "GET", record_id=1))
+            # The last response is repeated.
+            self.assertEqual("second", context.make_request("subscriber",
+                "GET", record_id=1))
+            self.assertRaises(LookupError, context.make_request,
+                "subscriber", "GET", record_id=2)
+
+    def test_replay_latency(self):
+        path = os.path.join(self.directory, "cassette")
+        self.record(path)
+        transport = ReplayTransport(path, latency=True)
+        self.mox.StubOutWithMock(time, "sleep")
+        time.sleep(mox.IsA(float))
+        self.mox.ReplayAll()
+        transport.request("127.0.0.1", "GET",
+            list(read_cassette(path))[0]["uri"], None, {})
+        self.mox.VerifyAll()
+
+    def test_scrub_cassette(self):
+        path = os.path.join(self.directory, "cassette")
+        output = os.path.join(self.directory, "scrubbed.gz")
+        self.record(path, scrub=False)
+        self.assertTrue("auth=test" in list(read_cassette(path))[0]["uri"])
+        scrub_cassette(path, output)
+        for interaction in read_cassette(output):
+            self.assertTrue("auth=REDACTED" in interaction["uri"])
+
+if __name__ == "__main__":
+    unittest.main()
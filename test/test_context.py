@@ -59,5 +59,16 @@ class TestContext(mox.MoxTestBase):
         self.assertEqual("200", result)
         self.mox.VerifyAll()
 
+    def test_build_request(self):
+        self.mox.ReplayAll()
+        method, uri, body, headers = self.context.build_request("subscriber",
+            "CREATEORUPDATE", data="[]")
+        self.assertEqual("POST", method)
+        self.assertEqual("/admin/api/1/subscriber/?_method=CREATEORUPDATE&"
+            "auth=test%40taguchimail.com%7CX", uri)
+        self.assertEqual("[]", body)
+        self.assertEqual(2, headers["Content-Length"])
+        self.mox.VerifyAll()
+
 if __name__ == "__main__":
     unittest.main()
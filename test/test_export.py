@@ -0,0 +1,144 @@
+import os
+import sys
+import mox
+import gzip
+import json
+import shutil
+import tempfile
+import unittest
+
+sys.path.append("..")
+from taguchi.export import Exporter
+from taguchi.journal import Journal
+
+class TestExporter(mox.MoxTestBase):
+
+    def setUp(self):
+        mox.MoxTestBase.setUp(self)
+        self.directory = tempfile.mkdtemp()
+        self.path = os.path.join(self.directory, "out")
+        self.context = self.mox.CreateMockAnything()
+        self.context.field_parameter = None
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+        mox.MoxTestBase.tearDown(self)
+
+    def expect_id_range(self, low, high):
+        for order, record_id in (("asc", low), ("desc", high)):
+            self.context.make_request("campaign", "GET", parameters={
+                "sort": "id", "order": order, "offset": "0", "limit": "1"},
+                query=["status-eq-x"]).AndReturn(
+                json.dumps([{"id": record_id}]))
+
+    def expect_shard(self, low, high, rows):
+        self.context.make_request("campaign", "GET", parameters={
+            "sort": "id", "order": "asc", "offset": "0", "limit": "10"},
+            query=["status-eq-x", "id-gte-%d" % low, "id-lt-%d" % high]
+            ).AndReturn(json.dumps(rows))
+
+    def test_plan(self):
+        self.expect_id_range(1, 10)
+        self.mox.ReplayAll()
+
+        exporter = Exporter(self.context, "campaign", self.path,
+            query=["status-eq-x"], shards=3)
+        self.assertEqual([[1, 5], [5, 9], [9, 11]], exporter.plan())
+        self.mox.VerifyAll()
+
+    def test_run_ndjson(self):
+        self.expect_id_range(1, 4)
+        self.expect_shard(1, 3, [{"id": 1}, {"id": 2}])
+        self.expect_shard(3, 5, [{"id": 4}])
+        self.mox.ReplayAll()
+
+        progress = []
+        exporter = Exporter(self.context, "campaign", self.path,
+            query=["status-eq-x"], workers=1, shards=2, page_size=10,
+            checkpoint=self.path + ".checkpoint")
+        self.assertEqual(3, exporter.run(lambda *args: progress.append(args)))
+        self.assertEqual([(2, 1, 2), (3, 2, 2)], progress)
+        with open(self.path) as output:
+            self.assertEqual([1, 2, 4],
+                [json.loads(line)["id"] for line in output])
+        self.assertEqual([], [name for name in os.listdir(self.directory)
+            if name != "out"])
+        self.mox.VerifyAll()
+
+    def test_run_csv_compressed(self):
+        self.expect_id_range(1, 1)
+        self.expect_shard(1, 2, [{"id": 1, "name": u"caf\xe9",
+            "data": None}])
+        self.mox.ReplayAll()
+
+        exporter = Exporter(self.context, "campaign", self.path,
+            format="csv", fields=["id", "name", "data"],
+            query=["status-eq-x"], workers=1, shards=1, page_size=10,
+            compress=True)
+        self.assertEqual(1, exporter.run())
+        output = gzip.open(self.path)
+        self.assertEqual("id,name,data\r\n1,caf\xc3\xa9,\r\n", output.read())
+        output.close()
+        self.mox.VerifyAll()
+
+    def test_resume(self):
+        checkpoint = self.path + ".checkpoint"
+        exporter = Exporter(self.context, "campaign", self.path,
+            query=["status-eq-x"], workers=1, page_size=10,
+            checkpoint=checkpoint)
+        journal = Journal(checkpoint)
+        journal.begin(exporter.job)
+        journal.set("shards", [[1, 3], [3, 5]])
+        journal.mark_done(0)
+        with open(self.path + ".part-00000", "w") as f:
+            f.write(json.dumps({"id": 1}) + "\n")
+        self.expect_shard(3, 5, [{"id": 3}])
+        self.mox.ReplayAll()
+
+        self.assertEqual(1, exporter.run())
+        with open(self.path) as output:
+            self.assertEqual([1, 3],
+                [json.loads(line)["id"] for line in output])
+        self.assertFalse(os.path.exists(checkpoint))
+        self.mox.VerifyAll()
+
+    def test_resume_join(self):
+        checkpoint = self.path + ".checkpoint"
+        exporter = Exporter(self.context, "campaign", self.path,
+            query=["status-eq-x"], workers=1, checkpoint=checkpoint)
+        journal = Journal(checkpoint)
+        journal.begin(exporter.job)
+        journal.set("shards", [[1, 3], [3, 5]])
+        journal.mark_done(0)
+        journal.mark_done(1)
+        journal.close()
+        for index in range(2):
+            with open(self.path + ".part-%05d" % index, "w") as f:
+                f.write(json.dumps({"id": index}) + "\n")
+        # A join interrupted part way through is done again.
+        with open(self.path + ".tmp", "w") as f:
+            f.write("partial")
+        self.mox.ReplayAll()
+
+        self.assertEqual(0, exporter.run())
+        with open(self.path) as output:
+            self.assertEqual([0, 1],
+                [json.loads(line)["id"] for line in output])
+        self.assertEqual(["out"], os.listdir(self.directory))
+
+        # After a crash while removing the parts, only the rest are removed.
+        journal = Journal(checkpoint)
+        journal.begin(exporter.job)
+        journal.set("shards", [[1, 3], [3, 5]])
+        journal.mark_done(0)
+        journal.mark_done(1)
+        journal.set("joined", True)
+        journal.close()
+        with open(self.path + ".part-00001", "w") as f:
+            f.write("x")
+        self.assertEqual(0, exporter.run())
+        self.assertEqual(["out"], os.listdir(self.directory))
+        self.mox.VerifyAll()
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,123 @@
+import os
+import sys
+import mox
+import json
+import shutil
+import tempfile
+import unittest
+
+sys.path.append("..")
+from taguchi.hashcache import content_hash, record_key, split_unchanged
+from taguchi.hashcache import MemoryHashStore, FileHashStore, SqliteHashStore
+from taguchi.importer import Importer
+from taguchi.subscriber import Subscriber
+
+class TestHashCache(mox.MoxTestBase):
+
+    def setUp(self):
+        mox.MoxTestBase.setUp(self)
+        self.directory = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+        mox.MoxTestBase.tearDown(self)
+
+    def test_content_hash(self):
+        a = {"id": 1, "email": "a@x", "lists": [{"list_id": 2}, {"list_id": 1}],
+            "custom_fields": [{"field": "b", "data": 1},
+            {"field": "a", "data": 2}]}
+        b = {"email": "a@x", "lists": [{"list_id": 1}, {"list_id": 2}],
+            "custom_fields": [{"field": "a", "data": 2},
+            {"field": "b", "data": 1}]}
+        self.assertEqual(content_hash(a), content_hash(b))
+        b["firstname"] = "x"
+        self.assertNotEqual(content_hash(a), content_hash(b))
+
+    def test_record_key(self):
+        self.assertEqual("ref:r", record_key({"ref": "r", "email": "a@x"}))
+        self.assertEqual("email:a@x", record_key({"ref": None, "email": "a@x"}))
+        self.assertEqual("ref:42", record_key({"ref": 42}))
+        self.assertEqual(None, record_key({}))
+
+    def check_store(self, store):
+        self.assertEqual(None, store.get("email:a@x"))
+        store.set_many([("email:a@x", "1"), ("ref:r", "2")])
+        self.assertEqual("1", store.get("email:a@x"))
+        store.set_many([("email:a@x", "3")])
+        self.assertEqual("3", store.get("email:a@x"))
+
+    def test_stores(self):
+        self.check_store(MemoryHashStore())
+        path = os.path.join(self.directory, "hashes.json")
+        store = FileHashStore(path)
+        self.check_store(store)
+        # Reopening without closing (e.g. after a crash) replays the log,
+        # ignoring an incomplete last line.
+        with open(path + ".log", "a") as log:
+            log.write('{"ref:r": "4"')
+        self.assertEqual("2", FileHashStore(path).get("ref:r"))
+        self.assertFalse(os.path.exists(path + ".log"))
+        store = FileHashStore(path)
+        store.set_many([("ref:r", "5")])
+        store.close()
+        self.assertFalse(os.path.exists(path + ".log"))
+        with open(path) as f:
+            self.assertEqual({"email:a@x": "3", "ref:r": "5"}, json.load(f))
+        path = os.path.join(self.directory, "hashes.db")
+        store = SqliteHashStore(path)
+        self.check_store(store)
+        store.close()
+        store = SqliteHashStore(path)
+        self.assertEqual("2", store.get("ref:r"))
+        store.close()
+
+    def test_split_unchanged(self):
+        store = MemoryHashStore()
+        store.set_many([("email:a@x", content_hash({"email": "a@x"}))])
+        changed, unchanged, hashes = split_unchanged(
+            [{"email": "a@x"}, {"email": "b@x"}, {"phone": "1"}], store)
+        self.assertEqual([{"email": "b@x"}, {"phone": "1"}], changed)
+        self.assertEqual([{"email": "a@x"}], unchanged)
+        self.assertEqual([("email:b@x", content_hash({"email": "b@x"}))],
+            hashes)
+
+    def test_create_or_update_many(self):
+        context = self.mox.CreateMockAnything()
+        context.make_request("subscriber", "CREATEORUPDATE",
+            data=json.dumps([{"email": "b@x"}])).AndReturn(
+            json.dumps([{"id": 2, "email": "b@x"}]))
+        self.mox.ReplayAll()
+
+        store = MemoryHashStore()
+        store.set_many([("email:a@x", content_hash({"email": "a@x"}))])
+        subscribers = []
+        for email in ("a@x", "b@x"):
+            subscriber = Subscriber(context)
+            subscriber.email = email
+            subscribers.append(subscriber)
+        sent = Subscriber.create_or_update_many(context, subscribers, store)
+        self.assertEqual([subscribers[1]], sent)
+        self.assertEqual("2", subscribers[1].record_id)
+        self.assertEqual(content_hash({"email": "b@x"}), store.get("email:b@x"))
+        self.assertEqual([], Subscriber.create_or_update_many(context,
+            subscribers[:1], store))
+        self.mox.VerifyAll()
+
+    def test_importer(self):
+        context = self.mox.CreateMockAnything()
+        context.make_request("subscriber", "CREATEORUPDATE",
+            data=json.dumps([{"email": "b@x"}])).AndReturn(
+            json.dumps([{"id": 2}]))
+        self.mox.ReplayAll()
+
+        store = MemoryHashStore()
+        store.set_many([("email:a@x", content_hash({"email": "a@x"}))])
+        importer = Importer(context, workers=1, hash_store=store)
+        stats = importer.run([{"email": "a@x"}, {"email": "b@x"}])
+        self.assertEqual(1, stats.sent)
+        self.assertEqual(1, stats.unchanged)
+        self.assertEqual(content_hash({"email": "b@x"}), store.get("email:b@x"))
+        self.mox.VerifyAll()
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,100 @@
+import sys
+import json
+import unittest
+import urlparse
+
+sys.path.append("..")
+from taguchi.context import Context
+from taguchi.activity import Activity, ActivityRevision
+from taguchi.transport import LoopbackTransport
+from taguchi.template import Template
+from taguchi.history import RevisionCache, LazyRevision
+
+class TestRevisionCache(unittest.TestCase):
+
+    def test_get(self):
+        cache = RevisionCache(max_size=2)
+        loads = []
+        def loader(value):
+            def load():
+                loads.append(value)
+                return value
+            return load
+        self.assertEqual("a", cache.get(("activity", "1"), loader("a")))
+        self.assertEqual("a", cache.get(("activity", "1"), loader("x")))
+        cache.get(("template", "1"), loader("b"))
+        cache.get(("activity", "1"), loader("x"))
+        # The least recently used revision is discarded.
+        cache.get(("activity", "2"), loader("c"))
+        self.assertEqual("d", cache.get(("template", "1"), loader("d")))
+        self.assertEqual(["a", "b", "c", "d"], loads)
+
+class TestLazyRevision(unittest.TestCase):
+
+    def test_loads_once(self):
+        loads = []
+        def load():
+            loads.append(1)
+            return {"id": 2, "content": "x", "approval_status": "stale"}
+        revision = ActivityRevision(None, LazyRevision(
+            {"id": 2, "approval_status": "deployed"}, load))
+        self.assertEqual("deployed", revision.approval_status)
+        self.assertEqual([], loads)
+        self.assertEqual("x", revision.content)
+        self.assertEqual("x", revision.content)
+        self.assertEqual("deployed", revision.approval_status)
+        self.assertRaises(KeyError, lambda: revision.backing["missing"])
+        self.assertEqual([1], loads)
+
+class TestRevisionHistory(unittest.TestCase):
+
+    def setUp(self):
+        self.requests = []
+        self.context = Context("127.0.0.1", "test@taguchimail.com", "X", 1,
+            transport=LoopbackTransport(self.handle))
+        self.revisions = {
+            "activity": [{"id": 3, "content": "new"},
+                {"id": 2, "content": "old"}],
+            "template": [{"id": 3, "content": "xsl", "format": "dd"}]}
+
+    def handle(self, method, uri, body, headers):
+        path, query = uri.split("?")
+        resource = path.split("/")[4]
+        parameters = urlparse.parse_qs(query)
+        revision = parameters.get("revision", [None])[0]
+        self.requests.append((resource, revision))
+        if revision is None:
+            revisions = [dict(id=r["id"]) for r in self.revisions[resource]]
+        else:
+            revisions = [r for r in self.revisions[resource]
+                if str(r["id"]) == revision]
+        return json.dumps([{"id": 1, "revisions": revisions}])
+
+    def test_get_revisions(self):
+        cache = RevisionCache()
+        activity = Activity(self.context)
+        activity.backing = {"id": 1, "revisions": []}
+        revisions = activity.get_revisions(cache)
+        self.assertEqual(["3", "2"],
+            [revision.record_id for revision in revisions])
+        self.assertEqual([("activity", None)], self.requests)
+        self.assertEqual("old", revisions[1].content)
+        self.assertEqual(("activity", "2"), self.requests[-1])
+        # Content is shared with other instances through the cache.
+        other = Activity(self.context)
+        other.backing = {"id": 1, "revisions": []}
+        revisions = other.get_revisions(cache)
+        self.assertEqual("old", revisions[1].content)
+        self.assertEqual("new", revisions[0].content)
+        self.assertEqual([("activity", None), ("activity", "2"),
+            ("activity", None), ("activity", "3")], self.requests)
+
+        template = Template(self.context)
+        template.backing = {"id": 1, "revisions": []}
+        revision = template.get_revisions(cache)[0]
+        self.assertEqual("dd", revision.format)
+        self.assertEqual("xsl", revision.content)
+        self.assertEqual(("template", "3"), self.requests[-1])
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,75 @@
+import sys
+import mox
+import json
+import unittest
+
+sys.path.append("..")
+from taguchi.context import Context
+from taguchi.activity import Activity
+from taguchi.subscriber import Subscriber, SubscriberList
+from taguchi.transport import LoopbackTransport
+from taguchi.identity import IdentityMap
+
+class TestIdentityMap(mox.MoxTestBase):
+
+    def setUp(self):
+        mox.MoxTestBase.setUp(self)
+        def handler(method, uri, body, headers):
+            if "/list/" in uri:
+                return json.dumps([{"id": 1, "name": "server"}])
+            return json.dumps([{"id": 1, "revisions": []},
+                {"id": 2, "revisions": []}])
+        self.context = Context("127.0.0.1", "test@taguchimail.com", "X", 1,
+            transport=LoopbackTransport(handler))
+
+    def test_without_map(self):
+        first = SubscriberList.get(self.context, 1, None)
+        self.assertFalse(first is SubscriberList.get(self.context, 1, None))
+
+    def test_resolves_to_one_object(self):
+        self.context.identity_map = IdentityMap()
+        first = SubscriberList.get(self.context, 1, None)
+        first.name = "local"
+        second = SubscriberList.get(self.context, 1, None)
+        self.assertTrue(first is second)
+        self.assertEqual("local", second.name)
+        self.assertTrue(first is self.context.identity_map.get(
+            SubscriberList, "1"))
+
+        activities = Activity.find(self.context, "id", "asc", 0, 2, None)
+        self.assertTrue(activities[0] is Activity.get(self.context, 1, None))
+        # Records of other types with the same ID are distinct.
+        self.assertEqual(None, self.context.identity_map.get(Subscriber, 1))
+
+    def test_partial_records_bypass_map(self):
+        self.context.identity_map = IdentityMap()
+        partial = Subscriber.get(self.context, 1, None, fields=["email"])
+        self.assertEqual({"id": 1}, partial.backing)
+        full = Subscriber.get(self.context, 1, None)
+        self.assertFalse(full is partial)
+        self.assertEqual([], full.backing["revisions"])
+        self.assertTrue(full is self.context.identity_map.get(Subscriber, 1))
+        found = Subscriber.find(self.context, "id", "asc", 0, 2, None,
+            fields=["email"])
+        self.assertFalse(found[0] is full)
+        self.assertFalse(found[:1][0] is full)
+        self.assertFalse(list(Subscriber.iter_find(self.context,
+            fields=["email"]))[0] is full)
+        self.assertTrue(Subscriber.find(self.context, "id", "asc", 0, 2,
+            None)[0] is full)
+
+    def test_add(self):
+        identity_map = IdentityMap()
+        record = Subscriber(None)
+        record.backing = {"id": 3}
+        self.assertTrue(identity_map.add(record) is record)
+        other = Subscriber(None)
+        other.backing = {"id": 3}
+        self.assertTrue(identity_map.add(other) is record)
+        unsaved = Subscriber(None)
+        self.assertTrue(identity_map.add(unsaved) is unsaved)
+        identity_map.clear()
+        self.assertEqual(None, identity_map.get(Subscriber, 3))
+
+if __name__ == "__main__":
+    unittest.main()
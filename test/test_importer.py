@@ -0,0 +1,212 @@
+import os
+import sys
+import mox
+import json
+import shutil
+import tempfile
+import unittest
+
+sys.path.append("..")
+from taguchi.importer import Importer, InvalidRow, file_identity, read_file
+from taguchi.journal import Journal
+
+class TestImporter(mox.MoxTestBase):
+
+    def setUp(self):
+        mox.MoxTestBase.setUp(self)
+        self.directory = tempfile.mkdtemp()
+        self.context = self.mox.CreateMockAnything()
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+        mox.MoxTestBase.tearDown(self)
+
+    def test_read_file(self):
+        path = os.path.join(self.directory, "in.csv")
+        with open(path, "w") as f:
+            f.write("email,Colour\r\na@example.com,red\r\n")
+        self.assertEqual([{"email": "a@example.com", "Colour": "red"}],
+            list(read_file(path)))
+        path = os.path.join(self.directory, "in.json")
+        with open(path, "w") as f:
+            f.write('{"email": "a@example.com"}\n\n{"ref": "x"}\n')
+        self.assertEqual([{"email": "a@example.com"}, {"ref": "x"}],
+            list(read_file(path)))
+
+    def test_read_invalid_rows(self):
+        path = os.path.join(self.directory, "in.csv")
+        with open(path, "w") as f:
+            f.write("email,ref\r\na@example.com\r\n\xff@x,r\r\nb@x,s\r\n")
+        rows = list(read_file(path))
+        self.assertEqual(3, len(rows))
+        self.assertEqual("missing columns", rows[0].reason)
+        self.assertEqual({"email": "a@example.com"}, rows[0].data)
+        self.assertTrue(rows[1].reason.startswith("invalid row: "))
+        self.assertEqual({"email": "b@x", "ref": "s"}, rows[2])
+
+        path = os.path.join(self.directory, "in.json")
+        with open(path, "w") as f:
+            f.write('{"email": "a@x"\n[1]\n{"ref": 2}\n')
+        rows = list(read_file(path))
+        self.assertTrue(isinstance(rows[0], InvalidRow))
+        self.assertEqual('{"email": "a@x"', rows[0].data)
+        self.assertEqual("invalid row: not an object", rows[1].reason)
+        self.assertEqual({"ref": 2}, rows[2])
+
+    def test_run_rejects_invalid_rows(self):
+        self.context.make_request("subscriber", "CREATEORUPDATE",
+            data=json.dumps([{"ref": 2}])).AndReturn(json.dumps([{"id": 1}]))
+        self.mox.ReplayAll()
+
+        path = os.path.join(self.directory, "in.json")
+        with open(path, "w") as f:
+            f.write('{"email": "a@x"\n{"ref": 2}\n')
+        rejects = os.path.join(self.directory, "rejects")
+        importer = Importer(self.context, batch_size=10, workers=1,
+            rejects=rejects)
+        stats = importer.run(read_file(path))
+        self.assertEqual(2, stats.read)
+        self.assertEqual(1, stats.sent)
+        self.assertEqual(1, stats.rejected)
+        with open(rejects) as f:
+            reject = json.loads(f.readline())
+        self.assertEqual(1, reject["row"])
+        self.assertEqual('{"email": "a@x"', reject["data"])
+        self.mox.VerifyAll()
+
+    def test_map_row(self):
+        importer = Importer(None, mapping={"Colour": "custom_fields.colour",
+            "Member": "lists.5", "Lists": "lists", "Mail": "email"})
+        subscriber = importer.map_row({"Mail": "a@example.com",
+            "firstname": "Ann", "Colour": "red", "Member": "gold",
+            "Lists": "6, 7", "ignored": "x", "lastname": ""})
+        self.assertEqual("a@example.com", subscriber.email)
+        self.assertEqual("Ann", subscriber.firstname)
+        self.assertFalse("lastname" in subscriber.backing)
+        self.assertEqual("red", subscriber.get_custom_field("colour"))
+        self.assertEqual("gold", subscriber.get_subscription_option("5"))
+        self.assertEqual(["5", "6", "7"],
+            sorted(subscriber.get_subscribed_list_ids()))
+
+    def test_run_list_arrays(self):
+        self.context.make_request("subscriber", "CREATEORUPDATE",
+            data=json.dumps([{"email": "a@x", "lists": [
+                {"list_id": 5, "option": None, "unsubscribed": None},
+                {"list_id": 6, "option": "gold",
+                 "unsubscribed": "2011-01-01T00:00:00"}]},
+                {"email": "c@x"}])).AndReturn(
+            json.dumps([{"id": 1}, {"id": 2}]))
+        self.mox.ReplayAll()
+
+        path = os.path.join(self.directory, "in.json")
+        with open(path, "w") as f:
+            f.write('{"email": "a@x", "lists": [5, {"list_id": 6, '
+                '"option": "gold", "unsubscribed": "2011-01-01T00:00:00"}]}\n'
+                '{"email": "b@x", "lists": [{"option": "x"}]}\n'
+                '{"email": "c@x"}\n')
+        rejects = os.path.join(self.directory, "rejects")
+        importer = Importer(self.context, batch_size=10, workers=1,
+            rejects=rejects)
+        stats = importer.run(read_file(path))
+        self.assertEqual(2, stats.sent)
+        self.assertEqual(1, stats.rejected)
+        with open(rejects) as f:
+            reject = json.loads(f.readline())
+        self.assertEqual(2, reject["row"])
+        self.assertEqual("invalid row: 'list_id'", reject["error"])
+        self.mox.VerifyAll()
+
+    def test_validate(self):
+        importer = Importer(None)
+        self.assertEqual(None, importer.validate(
+            importer.map_row({"ref": "x"})))
+        self.assertEqual("no ref or email", importer.validate(
+            importer.map_row({"firstname": "x"})))
+        self.assertEqual("invalid email: x", importer.validate(
+            importer.map_row({"email": "x"})))
+
+    def test_run(self):
+        self.context.make_request("subscriber", "CREATEORUPDATE",
+            data=json.dumps([{"email": "a@x"}, {"email": "b@x"}])).AndReturn(
+            json.dumps([{"id": 1}, {"id": 2}]))
+        self.context.make_request("subscriber", "CREATEORUPDATE",
+            data=json.dumps([{"email": "d@x"}])).AndReturn("<error/>")
+        self.mox.ReplayAll()
+
+        rejects = os.path.join(self.directory, "rejects")
+        importer = Importer(self.context, batch_size=2, workers=1,
+            rejects=rejects)
+        progress = []
+        stats = importer.run([{"email": "a@x"}, {"email": "b@x"},
+            {"email": "c"}, {"email": "d@x"}],
+            lambda stats: progress.append(stats.sent))
+        self.assertEqual(4, stats.read)
+        self.assertEqual(2, stats.sent)
+        self.assertEqual(2, stats.rejected)
+        self.assertEqual([2, 2], progress)
+        with open(rejects) as f:
+            self.assertEqual([(3, "invalid email: c"),
+                (4, "request failed: No JSON object could be decoded")],
+                [(r["row"], r["error"]) for r in map(json.loads, f)])
+        self.mox.VerifyAll()
+
+    def test_run_transform_error(self):
+        transform = self.mox.CreateMockAnything()
+        transform.transform([{"email": "a@x"}]).AndRaise(
+            ValueError("bad row"))
+        transform.transform([{"email": "b@x"}]).AndReturn([{"ref": "b"}])
+        self.context.make_request("subscriber", "CREATEORUPDATE",
+            data=json.dumps([{"ref": "b"}])).AndReturn(json.dumps([{"id": 1}]))
+        self.mox.ReplayAll()
+
+        rejects = os.path.join(self.directory, "rejects")
+        importer = Importer(self.context, batch_size=1, workers=1,
+            rejects=rejects, transform=transform)
+        stats = importer.run([{"email": "a@x"}, {"email": "b@x"}])
+        self.assertEqual(1, stats.sent)
+        self.assertEqual(1, stats.rejected)
+        with open(rejects) as f:
+            self.assertEqual([(1, "transform failed: bad row")],
+                [(r["row"], r["error"]) for r in map(json.loads, f)])
+        self.mox.VerifyAll()
+
+    def test_resume(self):
+        checkpoint = os.path.join(self.directory, "checkpoint")
+        importer = Importer(self.context, batch_size=1, workers=1,
+            checkpoint=checkpoint, source="job-1")
+        journal = Journal(checkpoint)
+        journal.begin(importer.job)
+        journal.mark_done(1)
+        self.context.make_request("subscriber", "CREATEORUPDATE",
+            data=json.dumps([{"email": "b@x"}])).AndReturn(
+            json.dumps([{"id": 2}]))
+        self.mox.ReplayAll()
+
+        stats = importer.run([{"email": "a@x"}, {"email": "b@x"}])
+        self.assertEqual(1, stats.skipped)
+        self.assertEqual(1, stats.sent)
+        self.assertFalse(os.path.exists(checkpoint))
+        self.mox.VerifyAll()
+
+    def test_resume_other_source(self):
+        checkpoint = os.path.join(self.directory, "checkpoint")
+        self.assertRaises(ValueError, Importer, self.context,
+            checkpoint=checkpoint)
+        path = os.path.join(self.directory, "in.json")
+        with open(path, "w") as f:
+            f.write('{"email": "a@x"}\n')
+        journal = Journal(checkpoint)
+        journal.begin(Importer(self.context, checkpoint=checkpoint,
+            source=file_identity(path)).job)
+        journal.mark_done(1)
+        journal.close()
+
+        # The next day's file must not skip the rows sent from this one.
+        with open(path, "w") as f:
+            f.write('{"email": "b@x"}\n{"email": "c@x"}\n')
+        importer = Importer(self.context, checkpoint=checkpoint,
+            source=file_identity(path))
+        self.assertRaises(ValueError, importer.run, read_file(path))
+
+if __name__ == "__main__":
+    unittest.main()
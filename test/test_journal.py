@@ -0,0 +1,73 @@
+import os
+import sys
+import mox
+import shutil
+import tempfile
+import unittest
+
+sys.path.append("..")
+from taguchi.journal import Journal
+
+class TestJournal(mox.MoxTestBase):
+
+    def setUp(self):
+        mox.MoxTestBase.setUp(self)
+        self.directory = tempfile.mkdtemp()
+        self.path = os.path.join(self.directory, "journal")
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+        mox.MoxTestBase.tearDown(self)
+
+    def test_in_memory(self):
+        journal = Journal()
+        journal.begin({"job": "x"})
+        journal.mark_done(1)
+        self.assertTrue(journal.is_done(1))
+        journal.finish()
+        self.assertEqual([], os.listdir(self.directory))
+
+    def test_resume(self):
+        journal = Journal(self.path)
+        self.assertFalse(journal.resumed)
+        journal.begin({"job": "x", "size": 2})
+        journal.set("plan", [[1, 2]])
+        journal.mark_done(0)
+        journal.mark_done("a")
+        self.assertEqual(["journal", "journal.done"],
+            sorted(os.listdir(self.directory)))
+        journal.close()
+
+        journal = Journal(self.path)
+        self.assertTrue(journal.resumed)
+        journal.begin({"size": 2, "job": "x"})
+        self.assertEqual([[1, 2]], journal.get("plan"))
+        self.assertEqual(None, journal.get("missing"))
+        self.assertTrue(journal.is_done(0))
+        self.assertTrue(journal.is_done("a"))
+        self.assertFalse(journal.is_done(1))
+        self.assertRaises(ValueError, journal.begin, {"job": "y"})
+        journal.finish()
+        self.assertEqual([], os.listdir(self.directory))
+
+    def test_append_only(self):
+        journal = Journal(self.path)
+        journal.begin({"job": "x"})
+        size = os.path.getsize(self.path)
+        for chunk in range(1, 1001, 10):
+            journal.mark_done(chunk)
+        self.assertEqual(size, os.path.getsize(self.path))
+        with open(self.path + ".done") as log:
+            self.assertEqual(100, len(log.readlines()))
+        # A mark cut short by a crash is ignored.
+        with open(self.path + ".done", "a") as log:
+            log.write("100")
+        journal = Journal(self.path)
+        self.assertEqual(set(range(1, 1001, 10)), journal.done)
+        journal.mark_done(5)
+        journal.close()
+        self.assertTrue(Journal(self.path).is_done(5))
+        journal.finish()
+
+if __name__ == "__main__":
+    unittest.main()
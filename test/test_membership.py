@@ -0,0 +1,97 @@
+import sys
+import mox
+import json
+import unittest
+import urlparse
+
+sys.path.append("..")
+from taguchi.context import Context
+from taguchi.activity import Activity
+from taguchi.transport import LoopbackTransport
+from taguchi.membership import MembershipSet, list_membership
+
+class TestMembershipSet(unittest.TestCase):
+
+    def test_set_algebra(self):
+        a = MembershipSet([1, "5", 9, 1000000])
+        b = MembershipSet([5, 9, 12])
+        c = MembershipSet(["9"])
+        self.assertEqual(4, len(a))
+        self.assertEqual([1, 5, 9, 1000000], list(a))
+        self.assertTrue("5" in a)
+        self.assertFalse(12 in a)
+        self.assertEqual([1, 5, 9, 12, 1000000], list(a | b))
+        self.assertEqual([5, 9], list(a & b))
+        self.assertEqual([1, 1000000], list(a - b))
+        self.assertEqual(["5"], (a & b - c).ids())
+        self.assertEqual(MembershipSet([1, 5, 9, 12, 1000000]),
+            a.union(b, c))
+        self.assertEqual(c, a.intersection(b, c))
+        self.assertEqual(MembershipSet([1, 1000000]), a.difference(b, c))
+        self.assertFalse(MembershipSet())
+        self.assertEqual(0, len(MembershipSet([])))
+        self.assertEqual([], list(a - a))
+        self.assertEqual([0, 7, 8], list(MembershipSet([8, 0, 7])))
+
+class TestListMembership(mox.MoxTestBase):
+
+    def test_list_membership(self):
+        context = self.mox.CreateMockAnything()
+        context.field_parameter = None
+        context.make_request("subscriber", "GET", parameters={"sort": "id",
+            "order": "asc", "offset": "0", "limit": "2"},
+            query=["list_id-eq-7"]).AndReturn(json.dumps([
+            {"id": 1, "email": "a@example.com",
+             "lists": [{"list_id": 7, "unsubscribed": None}]},
+            {"id": 4, "lists": [{"list_id": 3, "unsubscribed": "x"},
+             {"list_id": 7, "unsubscribed": "2012-01-01"}]}]))
+        context.make_request("subscriber", "GET", parameters={"sort": "id",
+            "order": "asc", "offset": "0", "limit": "2"},
+            query=["list_id-eq-7", "id-gt-4"]).AndReturn(json.dumps([
+            {"id": 6, "lists": [{"list_id": 7, "unsubscribed": None}]}]))
+        self.mox.ReplayAll()
+
+        subscribed, unsubscribed = list_membership(context, 7, page_size=2)
+        self.assertEqual(["1", "6"], subscribed.ids())
+        self.assertEqual(["4"], unsubscribed.ids())
+        self.mox.VerifyAll()
+
+    def test_list_membership_selected_fields(self):
+        rows = [{"id": i, "email": "x", "lists": [{"list_id": 7,
+            "unsubscribed": "x" if i % 3 == 0 else None}]}
+            for i in range(1, 6)]
+        def handle(method, uri, body, headers):
+            # Returns only the requested fields, starting after the last ID
+            # seen.
+            parameters = urlparse.parse_qs(uri.split("?")[1])
+            fields = parameters["fields"][0].split(",")
+            start = 0
+            for predicate in parameters["query"]:
+                if predicate.startswith("id-gt-"):
+                    start = int(predicate[len("id-gt-"):])
+            page = [row for row in rows if row["id"] > start]
+            return json.dumps([dict((field, row[field]) for field in fields)
+                for row in page[:int(parameters["limit"][0])]])
+        context = Context("127.0.0.1", "test@taguchimail.com", "X", 1,
+            transport=LoopbackTransport(handle))
+        context.field_parameter = "fields"
+
+        subscribed, unsubscribed = list_membership(context, 7, page_size=2)
+        self.assertEqual(["1", "2", "4", "5"], subscribed.ids())
+        self.assertEqual(["3"], unsubscribed.ids())
+
+    def test_trigger(self):
+        context = self.mox.CreateMockAnything()
+        expected = [{"id": "1", "test": 0, "request_content": None,
+            "conditions": ["2", "3"]}]
+        context.make_request("activity", "TRIGGER", record_id="1",
+            data=mox.Func(lambda data: json.loads("".join(data)) == expected))
+        self.mox.ReplayAll()
+
+        record = Activity(context)
+        record.backing = {"id": 1}
+        record.trigger(MembershipSet([3, 2]), None, False)
+        self.mox.VerifyAll()
+
+if __name__ == "__main__":
+    unittest.main()
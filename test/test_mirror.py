@@ -0,0 +1,95 @@
+import sys
+import mox
+import json
+import unittest
+
+sys.path.append("..")
+from taguchi.mirror import SubscriberMirror
+from taguchi.predicate import filter_records
+from taguchi.subscriber import Subscriber
+
+class TestSubscriberMirror(mox.MoxTestBase):
+
+    def setUp(self):
+        mox.MoxTestBase.setUp(self)
+        self.context = self.mox.CreateMockAnything()
+        self.mirror = SubscriberMirror(self.context, ":memory:", page_size=2)
+        self.mirror.store([
+            {"id": 1, "email": "a@example.com", "firstname": "Ann",
+             "social_rating": 5, "unsubscribed": None,
+             "lists": [{"list_id": 7, "option": None, "unsubscribed": None}]},
+            {"id": 2, "email": "b@example.org", "firstname": "bob",
+             "social_rating": 12, "unsubscribed": "2011-01-01T00:00:00"},
+            {"id": 3, "email": "c@example.com", "firstname": None,
+             "social_rating": 40, "unsubscribed": None}])
+
+    def tearDown(self):
+        self.mirror.close()
+        self.mirror = None
+        mox.MoxTestBase.tearDown(self)
+
+    def find_ids(self, query, sort="id", order="asc"):
+        records = self.mirror.find(sort, order, 0, 100, query)
+        return [record.backing["id"] for record in records]
+
+    def test_last_id(self):
+        self.assertEqual(3, self.mirror.last_id())
+
+    def test_find_operators(self):
+        self.assertEqual([1], self.find_ids(["email-eq-a@example.com"]))
+        self.assertEqual([2, 3], self.find_ids(["id-neq-1"]))
+        self.assertEqual([1], self.find_ids(["social_rating-lt-12"]))
+        self.assertEqual([2, 3], self.find_ids(["social_rating-gte-12"]))
+        self.assertEqual([1, 3], self.find_ids(["email-re-\\.com$"]))
+        self.assertEqual([1], self.find_ids(["firstname-rei-^ann$"]))
+        self.assertEqual([1, 3], self.find_ids(["email-like-%.com"]))
+        self.assertEqual([], self.find_ids(["firstname-like-ANN"]))
+        self.assertEqual([1, 3], self.find_ids(["unsubscribed-is-null"]))
+        self.assertEqual([2], self.find_ids(["unsubscribed-nt-null"]))
+        self.assertEqual([1], self.find_ids(["list_id-eq-7"]))
+
+    def test_find_null_comparisons(self):
+        self.mirror.store([{"id": 4, "firstname": "null"}])
+        for query in (["firstname-eq-null"], ["firstname-neq-null"],
+                ["firstname-gte-null"]):
+            self.assertEqual([], self.find_ids(query))
+            self.assertEqual([], [record["id"] for record in filter_records(
+                query, [{"id": 4, "firstname": "null"}])])
+        self.assertEqual([3], self.find_ids(["firstname-is-null"]))
+        self.assertEqual([4], self.find_ids(["firstname-like-null"]))
+
+    def test_find_sort_offset_limit(self):
+        records = self.mirror.find("social_rating", "desc", 1, 1, [])
+        self.assertEqual(1, len(records))
+        self.assertTrue(isinstance(records[0], Subscriber))
+        self.assertEqual("2", records[0].record_id)
+
+    def test_find_unsupported_field(self):
+        self.assertRaises(ValueError, self.mirror.find, "id", "asc", 0, 1,
+            ["custom-eq-x"])
+
+    def test_count(self):
+        self.assertEqual(2, self.mirror.count(["email-like-%.com"]))
+
+    def test_sync(self):
+        self.context.make_request("subscriber", "GET",
+            parameters={"sort": "id", "order": "asc", "offset": "0",
+            "limit": "2"}, query=["id-gt-3"]).AndReturn(
+            json.dumps([{"id": 4}, {"id": 5}]))
+        self.context.make_request("subscriber", "GET",
+            parameters={"sort": "id", "order": "asc", "offset": "0",
+            "limit": "2"}, query=["id-gt-5"]).AndReturn(
+            json.dumps([{"id": 6}]))
+        self.context.make_request("subscriber", "GET",
+            parameters={"sort": "id", "order": "asc", "offset": "0",
+            "limit": "2"}, query=["x-gt-y", "id-gt-0"]).AndReturn(
+            json.dumps([{"id": 1, "email": "z@example.com"}]))
+        self.mox.ReplayAll()
+
+        self.assertEqual(4, self.mirror.sync(changed_query=["x-gt-y"]))
+        self.assertEqual(6, self.mirror.last_id())
+        self.assertEqual([1], self.find_ids(["email-eq-z@example.com"]))
+        self.mox.VerifyAll()
+
+if __name__ == "__main__":
+    unittest.main()
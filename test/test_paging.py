@@ -0,0 +1,60 @@
+import sys
+import json
+import unittest
+import urlparse
+
+sys.path.append("..")
+from taguchi.context import Context
+from taguchi.campaign import Campaign
+from taguchi.subscriber import Subscriber
+from taguchi.transport import LoopbackTransport
+from taguchi.paging import count_rows
+
+class TestCountRows(unittest.TestCase):
+
+    def setUp(self):
+        self.rows = []
+        self.requests = []
+        self.context = Context("127.0.0.1", "test@taguchimail.com", "X", 1,
+            transport=LoopbackTransport(self.handle))
+
+    def handle(self, method, uri, body, headers):
+        parameters = urlparse.parse_qs(uri.split("?")[1])
+        self.requests.append(parameters)
+        rows = self.rows
+        for predicate in parameters.get("query", []):
+            field, operator, value = predicate.split("-")
+            if field == "id" and operator == "gt":
+                rows = [row for row in rows if row["id"] > int(value)]
+        offset = int(parameters["offset"][0])
+        limit = int(parameters["limit"][0])
+        return json.dumps(rows[offset:offset + limit])
+
+    def test_count(self):
+        self.rows = [dict(id=i, email="x") for i in range(1, 2501)]
+        self.assertEqual(2500, count_rows(self.context, "subscriber",
+            query=["email-eq-x"]))
+        self.assertEqual(3, len(self.requests))
+        self.assertEqual(["email-eq-x", "id-gt-2000"],
+            self.requests[-1]["query"])
+
+    def test_estimate(self):
+        for size in (0, 1, 2, 3, 5, 8, 1000, 1023, 1024, 1025, 100000):
+            self.rows = [dict(id=i) for i in range(1, size + 1)]
+            self.requests = []
+            self.assertEqual(size, count_rows(self.context, "subscriber",
+                estimate=True))
+            self.assertTrue(len(self.requests) <=
+                2 * max(size, 1).bit_length() + 1)
+            self.assertTrue(all(request["limit"] == ["1"]
+                for request in self.requests))
+
+    def test_record_count(self):
+        self.rows = [dict(id=i) for i in range(1, 11)]
+        self.assertEqual(10, Subscriber.count(self.context, None))
+        self.assertEqual(10, Campaign.count(self.context, ["name-eq-x"],
+            estimate=True))
+        self.assertEqual(["name-eq-x"], self.requests[-1]["query"])
+
+if __name__ == "__main__":
+    unittest.main()
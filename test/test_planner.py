@@ -0,0 +1,78 @@
+import sys
+import mox
+import json
+import unittest
+
+sys.path.append("..")
+from taguchi.context import Context
+from taguchi.planner import RequestPlanner
+
+class TestRequestPlanner(mox.MoxTestBase):
+
+    def setUp(self):
+        mox.MoxTestBase.setUp(self)
+        self.context = Context("127.0.0.1", "test@taguchimail.com", "X", 1)
+        self.mox.StubOutWithMock(self.context, "make_request")
+
+    def tearDown(self):
+        self.context = None
+        mox.MoxTestBase.tearDown(self)
+
+    def test_url_length(self):
+        planner = RequestPlanner(self.context)
+        self.assertEqual(len("https://127.0.0.1/admin/api/1/subscriber/"
+            "?_method=GET&auth=test%40taguchimail.com%7CX&query=id-eq-1"),
+            planner.url_length("subscriber", "GET", query=["id-eq-1"]))
+
+    def test_find_single_request(self):
+        parameters = {"sort": "id", "order": "asc", "offset": "0",
+            "limit": "10"}
+        self.context.make_request("subscriber", "GET", parameters=parameters,
+            query=["id-re-^(1|2)$"]).AndReturn(json.dumps([{"id": 1}]))
+        self.mox.ReplayAll()
+
+        planner = RequestPlanner(self.context)
+        self.assertEqual([{"id": 1}], planner.find("subscriber", "id", "asc",
+            0, 10, ["id-re-^(1|2)$"]))
+        self.mox.VerifyAll()
+
+    def test_find_split(self):
+        parameters = {"sort": "email", "order": "asc", "offset": "0",
+            "limit": "3"}
+        self.context.make_request("subscriber", "GET", parameters=parameters,
+            query=["list_id-eq-3", "id-re-^(1|2)$"]).AndReturn(
+            json.dumps([{"id": 2, "email": "a"}, {"id": 1, "email": "c"}]))
+        self.context.make_request("subscriber", "GET", parameters=parameters,
+            query=["list_id-eq-3", "id-re-^(3|4)$"]).AndReturn(
+            json.dumps([{"id": 4, "email": "b"}, {"id": 3, "email": None}]))
+        self.mox.ReplayAll()
+
+        planner = RequestPlanner(self.context)
+        planner.max_url_length = planner.url_length("subscriber", "GET",
+            parameters=parameters,
+            query=["list_id-eq-3", "id-re-^(1|2)$"])
+        rows = planner.find("subscriber", "email", "asc", 1, 2,
+            ["list_id-eq-3", "id-re-^(1|2|3|4)$"])
+        self.assertEqual([4, 1], [row["id"] for row in rows])
+        self.mox.VerifyAll()
+
+    def test_plan_too_long(self):
+        planner = RequestPlanner(self.context, max_url_length=50)
+        self.assertRaises(ValueError, planner.plan, "subscriber", None,
+            ["email-like-%example%"])
+
+    def test_get_many(self):
+        self.context.make_request("campaign", "GET", parameters={"sort": "id",
+            "order": "asc", "offset": "0", "limit": "2"},
+            query=["id-re-^(5|7)$"]).AndReturn(
+            json.dumps([{"id": 5}, {"id": 7}]))
+        self.mox.ReplayAll()
+
+        planner = RequestPlanner(self.context)
+        self.assertEqual([{"id": 5}, {"id": 7}],
+            planner.get_many("campaign", [7, "5", 7]))
+        self.assertEqual([], planner.get_many("campaign", []))
+        self.mox.VerifyAll()
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,81 @@
+import sys
+import mox
+import unittest
+
+sys.path.append("..")
+from taguchi.predicate import parse_predicate, like_to_regex
+from taguchi.predicate import compile_predicate, compile_query, filter_records
+from taguchi.subscriber import Subscriber
+
+class TestPredicate(mox.MoxTestBase):
+
+    def setUp(self):
+        mox.MoxTestBase.setUp(self)
+        self.rows = [
+            {"id": 1, "email": "a@example.com", "firstname": "Ann",
+             "social_rating": 5, "unsubscribed": None,
+             "lists": [{"list_id": 7, "unsubscribed": None}]},
+            {"id": 2, "email": "b@example.org", "firstname": "bob",
+             "social_rating": 12, "unsubscribed": "2011-01-01T00:00:00"},
+            {"id": 10, "email": "c@example.com", "firstname": None,
+             "social_rating": 40, "unsubscribed": None}]
+
+    def tearDown(self):
+        self.rows = None
+        mox.MoxTestBase.tearDown(self)
+
+    def matching_ids(self, predicate):
+        test = compile_predicate(predicate)
+        return [row["id"] for row in self.rows if test(row)]
+
+    def test_parse_predicate(self):
+        self.assertEqual(("dob", "lt", "2000-01-01"),
+            parse_predicate("dob-lt-2000-01-01"))
+        self.assertRaises(ValueError, parse_predicate, "id")
+        self.assertRaises(ValueError, parse_predicate, "id-xx-1")
+
+    def test_like_to_regex(self):
+        self.assertEqual("^a.*b\\..$", like_to_regex("a%b._"))
+
+    def test_comparison_operators(self):
+        self.assertEqual([1], self.matching_ids("email-eq-a@example.com"))
+        self.assertEqual([2, 10], self.matching_ids("id-neq-1"))
+        self.assertEqual([1, 2], self.matching_ids("id-lt-10"))
+        self.assertEqual([10], self.matching_ids("id-gt-2"))
+        self.assertEqual([1, 2], self.matching_ids("social_rating-lte-12"))
+        self.assertEqual([2, 10], self.matching_ids("social_rating-gte-12"))
+        self.assertEqual([2, 10], self.matching_ids("email-gt-b"))
+
+    def test_pattern_operators(self):
+        self.assertEqual([1, 10], self.matching_ids("email-re-\\.com$"))
+        self.assertEqual([1], self.matching_ids("firstname-rei-^ANN$"))
+        self.assertEqual([1, 10], self.matching_ids("email-like-%.com"))
+        self.assertEqual([], self.matching_ids("firstname-like-ann"))
+
+    def test_null_operators(self):
+        self.assertEqual([1, 10], self.matching_ids("unsubscribed-is-null"))
+        self.assertEqual([2], self.matching_ids("unsubscribed-nt-null"))
+        self.assertEqual([], self.matching_ids("unsubscribed-eq-null"))
+        self.assertEqual([1, 2], self.matching_ids("firstname-neq-x"))
+
+    def test_list_id(self):
+        self.assertEqual([1], self.matching_ids("list_id-eq-7"))
+
+    def test_compile_query(self):
+        test = compile_query(["id-gt-1", "email-like-%.com"])
+        self.assertEqual([10], [row["id"] for row in self.rows if test(row)])
+
+    def test_filter_records(self):
+        records = []
+        for row in self.rows:
+            record = Subscriber(None)
+            record.backing = row
+            records.append(record)
+        results = filter_records(["unsubscribed-is-null", "id-lt-5"],
+            records)
+        self.assertEqual([records[0]], results)
+        results = filter_records(["unsubscribed-is-null"], iter(self.rows))
+        self.assertEqual([1, 10], [row["id"] for row in results])
+
+if __name__ == "__main__":
+    unittest.main()
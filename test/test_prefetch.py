@@ -0,0 +1,82 @@
+import re
+import sys
+import json
+import unittest
+import urlparse
+
+sys.path.append("..")
+from taguchi.context import Context
+from taguchi.activity import Activity
+from taguchi.campaign import Campaign
+from taguchi.template import Template
+from taguchi.subscriber import SubscriberList
+from taguchi.transport import LoopbackTransport
+from taguchi.prefetch import prefetch_related
+
+class TestPrefetch(unittest.TestCase):
+
+    def setUp(self):
+        self.requests = []
+        self.context = Context("127.0.0.1", "test@taguchimail.com", "X", 1,
+            transport=LoopbackTransport(self.handle))
+        self.activities = []
+        for record_id, template_id, campaign_id, target_lists in (
+                (1, 10, 20, "[30, 31]"), (2, 10, 21, [31]),
+                (3, None, 20, None), (4, 11, 99, [32])):
+            activity = Activity(self.context)
+            activity.backing = dict(id=record_id, template_id=template_id,
+                campaign_id=campaign_id, target_lists=target_lists,
+                revisions=[])
+            self.activities.append(activity)
+
+    def handle(self, method, uri, body, headers):
+        path, query = uri.split("?")
+        resource = path.split("/")[4]
+        parameters = urlparse.parse_qs(query)
+        self.requests.append(resource)
+        if path.endswith("/"):
+            predicates = " ".join(parameters.get("query", []))
+            record_ids = sorted(int(record_id)
+                for record_id in re.findall(r"\d+", predicates))
+        else:
+            record_ids = [int(path.split("/")[-1])]
+        # Record 99 has been deleted.
+        return json.dumps([dict(id=record_id, revisions=[])
+            for record_id in record_ids if record_id != 99])
+
+    def test_prefetch_related(self):
+        activities = prefetch_related(self.context, self.activities)
+        self.assertEqual(["campaign", "list", "template"], self.requests)
+        self.assertTrue(isinstance(activities[0].template, Template))
+        self.assertEqual("10", activities[0].template.record_id)
+        self.assertTrue(activities[0].template is activities[1].template)
+        self.assertEqual(None, activities[2].template)
+        self.assertTrue(isinstance(activities[1].campaign, Campaign))
+        self.assertEqual("21", activities[1].campaign.record_id)
+        self.assertEqual(None, activities[3].campaign)
+        self.assertEqual(["30", "31"], [record.record_id
+            for record in activities[0].get_target_lists()])
+        self.assertTrue(isinstance(activities[0].get_target_lists()[0],
+            SubscriberList))
+        self.assertEqual([], activities[2].get_target_lists())
+        self.assertEqual(3, len(self.requests))
+
+    def test_lazy_accessors(self):
+        activity = self.activities[0]
+        self.assertEqual("10", activity.template.record_id)
+        self.assertEqual("10", activity.template.record_id)
+        self.assertEqual(["template"], self.requests)
+        activity.template_id = 11
+        self.assertEqual("11", activity.template.record_id)
+        self.assertEqual("20", activity.campaign.record_id)
+        self.assertEqual(["30", "31"], [record.record_id
+            for record in activity.get_target_lists()])
+        self.assertEqual(["template", "template", "campaign", "list"],
+            self.requests)
+
+    def test_unknown_relation(self):
+        self.assertRaises(ValueError, prefetch_related, self.context,
+            self.activities, ["owner"])
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,88 @@
+import sys
+import mox
+import unittest
+
+sys.path.append("..")
+from taguchi.query import FIELDS, Query, escape_regex, encoded_length
+from taguchi.query import alternation_values
+
+class TestQuery(mox.MoxTestBase):
+
+    def test_escape_regex(self):
+        self.assertEqual("a\\.b\\|c\\$", escape_regex("a.b|c$"))
+
+    def test_alternation_values(self):
+        self.assertEqual(["1", "a.b", "c|d"],
+            alternation_values("^(1|a\\.b|c\\|d)$"))
+        self.assertEqual(None, alternation_values("^(a.b|c)$"))
+        self.assertEqual(None, alternation_values("a|b"))
+
+    def test_alternation_predicate(self):
+        query = Query("subscriber", ["id-re-^(2|1)$", "email-re-^x.*"])
+        query.isin("id", ["2", "3"])
+        self.assertEqual(["email-re-^x.*", "id-eq-2"], query.predicates())
+
+    def test_encoded_length(self):
+        self.assertEqual(len("&query=id-eq-1"), encoded_length("id-eq-1"))
+
+    def test_unknown_resource_and_field(self):
+        self.assertRaises(ValueError, Query, "nothing")
+        self.assertRaises(ValueError, Query("campaign").eq, "email", "x")
+        self.assertRaises(ValueError, Query("campaign").where, "id", "xx", 1)
+
+    def test_deduplicates(self):
+        query = Query("subscriber", ["email-eq-x", "email-eq-x"])
+        self.assertEqual(["email-eq-x"], query.predicates())
+
+    def test_merges_bounds(self):
+        query = Query("subscriber").gt("id", 5).gte("id", 10).lt("id", 100) \
+            .lte("id", 50).gt("dob", "2000-01-01").gt("id", 10)
+        self.assertEqual(["id-gt-10", "id-lte-50", "dob-gt-2000-01-01"],
+            query.predicates())
+
+    def test_keeps_text_bounds(self):
+        query = Query("subscriber", ["postcode-gte-900", "postcode-gte-1000",
+            "social_rating-gte-1", "social_rating-gte-2.5"])
+        self.assertEqual(["postcode-gte-900", "postcode-gte-1000",
+            "social_rating-gte-2.5"], query.predicates())
+        self.assertEqual("text", FIELDS["subscriber"]["phone"])
+
+    def test_isin(self):
+        query = Query("subscriber").eq("list_id", 3).isin("id", [10, 2, 1, 2])
+        self.assertEqual(["list_id-eq-3", "id-re-^(1|2|10)$"],
+            query.predicates())
+        query.isin("id", ["2", "10", "11"])
+        self.assertEqual(["list_id-eq-3", "id-re-^(2|10)$"],
+            query.predicates())
+        query.isin("id", ["2"])
+        self.assertEqual(["list_id-eq-3", "id-eq-2"], query.predicates())
+        query.isin("id", ["3"])
+        self.assertRaises(ValueError, query.predicates)
+
+    def test_isin_escapes(self):
+        query = Query("subscriber").isin("email", ["a.b@x.com", "c@x.com"])
+        self.assertEqual(["email-re-^(a\\.b@x\\.com|c@x\\.com)$"],
+            query.predicates())
+
+    def test_union(self):
+        query = Query.union("subscriber", "id",
+            [["list_id-eq-3", "id-eq-1"], ["id-eq-2", "list_id-eq-3"]])
+        self.assertEqual(["list_id-eq-3", "id-re-^(1|2)$"],
+            query.predicates())
+        self.assertRaises(ValueError, Query.union, "subscriber", "id",
+            [["list_id-eq-3", "id-eq-1"], ["list_id-eq-4", "id-eq-2"]])
+
+    def test_split(self):
+        query = Query("subscriber").eq("list_id", 3).isin("id", range(1, 101))
+        self.assertEqual([query.predicates()], query.split(10000))
+        queries = query.split(100)
+        self.assertTrue(len(queries) > 1)
+        values = []
+        for predicates in queries:
+            self.assertEqual("list_id-eq-3", predicates[0])
+            self.assertTrue(sum(encoded_length(p) for p in predicates) <= 100)
+            values.extend(predicates[1][len("id-re-^("):-2].split("|"))
+        self.assertEqual([str(i) for i in range(1, 101)], values)
+
+if __name__ == "__main__":
+    unittest.main()
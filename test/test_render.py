@@ -0,0 +1,71 @@
+import sys
+import mox
+import unittest
+
+sys.path.append("..")
+from taguchi.activity import ActivityRevision
+from taguchi.template import TemplateRevision
+
+try:
+    from lxml import etree
+    from taguchi.render import Renderer
+except ImportError:
+    etree = None
+
+STYLESHEET = """<xsl:stylesheet version="1.0"
+    xmlns:xsl="http://www.w3.org/1999/XSL/Transform"
+    xmlns:render="urn:taguchi:render">
+  <xsl:output method="text"/>
+  <xsl:template match="/">
+    <xsl:text>Hi </xsl:text>
+    <xsl:value-of select="render:request-content()/firstname"/>
+    <xsl:text>: </xsl:text>
+    <xsl:value-of select="/content/headline"/>
+  </xsl:template>
+</xsl:stylesheet>"""
+
+class TestRenderer(mox.MoxTestBase):
+
+    def setUp(self):
+        mox.MoxTestBase.setUp(self)
+        if etree is None:
+            self.skipTest("lxml is not installed")
+        self.template = TemplateRevision(None, {"id": 7, "content": STYLESHEET})
+        self.activity = ActivityRevision(None,
+            {"content": u"<content><headline>Caf\u00e9</headline></content>"})
+
+    def test_render(self):
+        renderer = Renderer()
+        self.assertEqual("Hi : Caf\xc3\xa9",
+            renderer.render(self.template, self.activity))
+        self.assertEqual("Hi Ann: Caf\xc3\xa9", renderer.render(self.template,
+            self.activity, "<request><firstname>Ann</firstname></request>"))
+        # The request content is not kept between renders.
+        self.assertEqual("Hi : Caf\xc3\xa9",
+            renderer.render(self.template, self.activity))
+
+    def test_stylesheet_cache(self):
+        renderer = Renderer(cache_size=1)
+        self.mox.StubOutWithMock(renderer, "_compile")
+        renderer._compile(STYLESHEET).AndReturn("first")
+        renderer._compile(STYLESHEET).AndReturn("unsaved")
+        renderer._compile("other").AndReturn("other")
+        renderer._compile(STYLESHEET).AndReturn("second")
+        self.mox.ReplayAll()
+
+        self.assertEqual("first", renderer.stylesheet(self.template))
+        self.assertEqual("first", renderer.stylesheet(self.template))
+        self.assertEqual("unsaved", renderer.stylesheet(
+            TemplateRevision(None, {"content": STYLESHEET})))
+        renderer.stylesheet(TemplateRevision(None,
+            {"id": 8, "content": "other"}))
+        self.assertEqual("second", renderer.stylesheet(self.template))
+        self.mox.VerifyAll()
+
+    def test_invalid_content(self):
+        renderer = Renderer()
+        self.assertRaises(etree.XMLSyntaxError, renderer.render,
+            self.template, ActivityRevision(None, {"content": "<content>"}))
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,72 @@
+import sys
+import mox
+import unittest
+
+sys.path.append("..")
+from taguchi.activity import Activity
+from taguchi.subscriber import Subscriber
+from taguchi.resultset import ResultSet
+
+class TestResultSet(mox.MoxTestBase):
+
+    def setUp(self):
+        mox.MoxTestBase.setUp(self)
+        self.context = self.mox.CreateMockAnything()
+        self.rows = [{"id": 1, "email": "a@example.com"}, {"id": 2},
+            {"id": 3, "email": "c@example.com"}]
+        self.mox.StubOutWithMock(Subscriber, "from_backing")
+
+    def test_column_accessors_do_not_wrap(self):
+        self.mox.ReplayAll()
+        results = ResultSet(self.context, Subscriber, self.rows)
+        self.assertEqual(3, len(results))
+        self.assertEqual(["1", "2", "3"], results.ids())
+        self.assertEqual(["a@example.com", None, "c@example.com"],
+            results.pluck("email"))
+        self.assertEqual(["2", "3"], results[1:].ids())
+        self.assertTrue(results)
+        self.assertFalse(ResultSet(self.context, Subscriber, []))
+        self.mox.VerifyAll()
+
+    def test_wraps_on_access_once(self):
+        first = Subscriber(self.context)
+        last = Subscriber(self.context)
+        Subscriber.from_backing(self.context, self.rows[0],
+            partial=False).AndReturn(first)
+        Subscriber.from_backing(self.context, self.rows[2],
+            partial=False).AndReturn(last)
+        self.mox.ReplayAll()
+
+        results = ResultSet(self.context, Subscriber, self.rows)
+        self.assertTrue(results[0] is first)
+        self.assertTrue(results[0] is first)
+        self.assertTrue(results[-1] is last)
+        # Slices share records which have already been wrapped.
+        self.assertTrue(results[::2][1] is last)
+        self.mox.VerifyAll()
+
+    def test_slices_share_records(self):
+        self.mox.UnsetStubs()
+        results = ResultSet(self.context, Subscriber, self.rows)
+        middle = results[1:][0]
+        self.assertTrue(middle is results[1])
+        self.assertTrue(results[1:][::-1][-1] is middle)
+        self.assertTrue(results[0:2][0] is results[0])
+
+    def test_iterate(self):
+        self.mox.UnsetStubs()
+        results = ResultSet(self.context, Subscriber, self.rows)
+        self.assertEqual([1, 2, 3],
+            [record.backing["id"] for record in results])
+        self.assertTrue(all(isinstance(record, Subscriber)
+            for record in results))
+
+    def test_activity_revisions(self):
+        self.mox.UnsetStubs()
+        results = ResultSet(self.context, Activity,
+            [{"id": 1, "revisions": [{"content": "x"}]}])
+        self.assertEqual([], results[0].backing["revisions"])
+        self.assertEqual("x", results[0].latest_revision.content)
+
+if __name__ == "__main__":
+    unittest.main()
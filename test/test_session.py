@@ -0,0 +1,117 @@
+import sys
+import json
+import unittest
+import urlparse
+
+sys.path.append("..")
+from taguchi.context import Context
+from taguchi.activity import Activity
+from taguchi.subscriber import Subscriber, SubscriberList
+from taguchi.transport import LoopbackTransport
+from taguchi.session import Session
+
+class TestSession(unittest.TestCase):
+
+    def setUp(self):
+        self.requests = []
+        self.next_id = 100
+        self.context = Context("127.0.0.1", "test@taguchimail.com", "X", 1,
+            transport=LoopbackTransport(self.handle))
+
+    def handle(self, method, uri, body, headers):
+        path, query = uri.split("?")
+        resource = path.split("/")[4]
+        command = urlparse.parse_qs(query)["_method"][0]
+        self.requests.append((resource, command,
+            len(json.loads(body)) if body else None))
+        if command == "GET":
+            return json.dumps([{"id": 1, "email": "a@example.com"},
+                {"id": 2, "email": "b@example.com"},
+                {"id": 3, "email": "c@example.com"}])
+        results = []
+        for row in json.loads(body):
+            if row.get("id") is None:
+                self.next_id += 1
+                row["id"] = self.next_id
+            row["saved"] = True
+            results.append(row)
+        return json.dumps(results)
+
+    def test_flush_batches_writes(self):
+        with Session(self.context, batch_size=2) as session:
+            subscribers = Subscriber.find(self.context, "id", "asc", 0, 3,
+                None)
+            for subscriber in subscribers:
+                subscriber.set_custom_field("score", "1")
+            # Retrieving a record again gives the tracked object.
+            self.assertTrue(Subscriber.find(self.context, "id", "asc", 0, 3,
+                None)[0] is subscribers[0])
+            new_list = SubscriberList(self.context)
+            new_list.name = "new"
+            session.add(new_list)
+            upsert = Subscriber(self.context)
+            upsert.email = "d@example.com"
+            session.create_or_update(upsert)
+            self.assertEqual(3, len(session.dirty))
+        self.assertEqual([("subscriber", "GET", None),
+            ("subscriber", "GET", None), ("list", "POST", 1),
+            ("subscriber", "PUT", 2), ("subscriber", "PUT", 1),
+            ("subscriber", "CREATEORUPDATE", 1)], self.requests)
+        self.assertEqual("101", new_list.record_id)
+        self.assertTrue(all(subscriber.backing["saved"]
+            for subscriber in subscribers))
+        self.assertEqual("102", upsert.record_id)
+        self.assertEqual([], session.dirty)
+        self.assertEqual(None, self.context.identity_map)
+
+        # Nothing is sent if nothing has changed.
+        session.flush()
+        self.assertEqual(6, len(self.requests))
+
+    def test_partial_records_not_tracked(self):
+        with Session(self.context) as session:
+            subscriber = Subscriber.get(self.context, 1, None,
+                fields=["email"])
+            subscriber.email = "x@example.com"
+            self.assertEqual([], session.dirty)
+        self.assertEqual([("subscriber", "GET", None)], self.requests)
+
+    def test_add_existing_record(self):
+        session = Session(self.context)
+        activity = Activity(self.context)
+        activity.backing = {"id": 5, "revisions": [{"content": "x"}]}
+        session.add(activity)
+        session.flush()
+        self.assertEqual([("activity", "PUT", 1)], self.requests)
+        # Revisions are moved aside once saved.
+        self.assertEqual([], activity.backing["revisions"])
+        self.assertEqual("x", activity.latest_revision.content)
+
+    def test_failed_flush_keeps_pending(self):
+        session = Session(self.context)
+        record = SubscriberList(self.context)
+        record.backing = {"name": "x"}
+        session.add(record)
+        transport = self.context.transport
+        def fail(*args):
+            raise IOError("timeout")
+        transport.handler = fail
+        self.assertRaises(IOError, session.flush)
+        self.assertEqual([record], session.new)
+        transport.handler = self.handle
+        session.flush()
+        self.assertEqual([], session.new)
+        self.assertEqual("101", record.record_id)
+
+    def test_exception_skips_flush(self):
+        try:
+            with Session(self.context) as session:
+                session.add(SubscriberList(self.context))
+                raise ValueError()
+        except ValueError:
+            pass
+        self.assertEqual([], self.requests)
+        self.assertEqual(None, self.context.identity_map)
+
+if __name__ == "__main__":
+    unittest.main()
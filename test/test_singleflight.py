@@ -0,0 +1,72 @@
+import sys
+import time
+import unittest
+import threading
+
+sys.path.append("..")
+from taguchi.context import Context
+from taguchi.transport import LoopbackTransport
+from taguchi.singleflight import SingleFlight
+
+class TestSingleFlight(unittest.TestCase):
+
+    def run_concurrently(self, function, count=5):
+        results = []
+        errors = []
+        def call():
+            try:
+                results.append(function())
+            except Exception as e:
+                errors.append(e)
+        threads = [threading.Thread(target=call) for i in range(count)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        return results, errors
+
+    def test_merges_concurrent_calls(self):
+        flights = SingleFlight()
+        calls = []
+        def slow():
+            calls.append(1)
+            time.sleep(0.05)
+            return "result"
+        results, errors = self.run_concurrently(
+            lambda: flights.do("key", slow))
+        self.assertEqual(["result"] * 5, results)
+        self.assertEqual([1], calls)
+        # Later calls are made again.
+        self.assertEqual("result", flights.do("key", slow))
+        self.assertEqual([1, 1], calls)
+        self.assertEqual({}, flights.calls)
+
+    def test_shares_errors(self):
+        flights = SingleFlight()
+        def fail():
+            time.sleep(0.05)
+            raise IOError("timeout")
+        results, errors = self.run_concurrently(
+            lambda: flights.do("key", fail), count=3)
+        self.assertEqual([], results)
+        self.assertEqual(3, len(errors))
+        self.assertTrue(all(isinstance(e, IOError) for e in errors))
+
+    def test_context_merges_gets_only(self):
+        requests = []
+        def handler(method, uri, body, headers):
+            requests.append(method)
+            time.sleep(0.05)
+            return '[{"id": 1}]'
+        context = Context("127.0.0.1", "test@taguchimail.com", "X", 1,
+            transport=LoopbackTransport(handler))
+        results, errors = self.run_concurrently(lambda: context.make_request(
+            "list", "GET", record_id=1))
+        self.assertEqual(['[{"id": 1}]'] * 5, results)
+        self.assertEqual(["GET"], requests)
+        self.run_concurrently(lambda: context.make_request("list", "PUT",
+            record_id=1, data="[]"), count=2)
+        self.assertEqual(["GET", "POST", "POST"], requests)
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,75 @@
+import sys
+import math
+import json
+import unittest
+import urlparse
+
+sys.path.append("..")
+from taguchi.context import Context
+from taguchi.transport import LoopbackTransport
+from taguchi.stats import Stats, StatsTable
+
+class TestStats(unittest.TestCase):
+
+    def setUp(self):
+        self.pages = []
+        self.requests = []
+        self.context = Context("127.0.0.1", "test@taguchimail.com", "X", 1,
+            transport=LoopbackTransport(self.handle))
+
+    def handle(self, method, uri, body, headers):
+        self.assertEqual("/admin/api/1/stats/", uri.split("?")[0])
+        self.requests.append(urlparse.parse_qs(uri.split("?")[1]))
+        page = self.pages.pop(0)
+        return page if isinstance(page, str) else json.dumps(page)
+
+    def test_find(self):
+        self.pages = [
+            '[{"date": "2012-01-01", "sends": 100, "opens": 20, "clicks": 5},'
+            ' {"date": "2012-01-02", "sends": 0, "opens": 0, "clicks": 0}]',
+            '[{"date": "2012-01-03", "sends": 50, "opens": null, '
+            '"clicks": 1}]']
+        table = Stats.find(self.context, query=["date-gte-2012-01-01"],
+            page_size=2)
+        self.assertEqual(3, len(table))
+        self.assertEqual(["date", "sends", "opens", "clicks"], table.names)
+        self.assertEqual(["2012-01-01", "2012-01-02", "2012-01-03"],
+            list(table["date"]))
+        self.assertEqual([100, 0, 50], list(table["sends"]))
+        self.assertTrue(math.isnan(table["opens"][2]))
+        self.assertEqual([["0"], ["2"]], [request["offset"]
+            for request in self.requests])
+        self.assertEqual(["2"], self.requests[0]["limit"])
+        self.assertEqual(["date-gte-2012-01-01"], self.requests[1]["query"])
+
+        open_rate = list(table.open_rate())
+        self.assertEqual(0.2, open_rate[0])
+        self.assertTrue(math.isnan(open_rate[1]))
+        self.assertTrue(math.isnan(open_rate[2]))
+        self.assertEqual([0.05, 0.02], [rate for rate in table.click_rate()
+            if not math.isnan(rate)])
+        self.assertEqual(0.25, table.click_rate(sends="opens")[0])
+        self.assertEqual(dict(date="2012-01-01", sends=100, opens=20,
+            clicks=5), next(table.rows()))
+
+    def test_iter_pages_tabular(self):
+        self.pages = [
+            [["date", "sends"], ["2012-01-01", 10], ["2012-01-02", 20]],
+            [["date", "sends"], ["2012-01-03", "n/a"]]]
+        pages = list(Stats.iter_pages(self.context, page_size=2))
+        self.assertEqual([2, 1], [len(page) for page in pages])
+        self.assertTrue(isinstance(pages[0], StatsTable))
+        self.assertEqual([10, 20], list(pages[0]["sends"]))
+        self.assertEqual(["n/a"], pages[1]["sends"])
+
+    def test_for_activity(self):
+        self.pages = [[], []]
+        table = Stats.for_activity(self.context, 7, query=["date-gte-x"])
+        self.assertEqual(0, len(table))
+        self.assertEqual(["date-gte-x", "activity_id-eq-7"],
+            self.requests[0]["query"])
+        Stats.for_campaign(self.context, 3)
+        self.assertEqual(["campaign_id-eq-3"], self.requests[1]["query"])
+
+if __name__ == "__main__":
+    unittest.main()
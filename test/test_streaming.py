@@ -0,0 +1,46 @@
+import sys
+import json
+import unittest
+
+sys.path.append("..")
+from taguchi.streaming import is_stream, iter_json_array, iter_json
+from taguchi.streaming import StreamReader
+
+class TestStreaming(unittest.TestCase):
+
+    def test_is_stream(self):
+        self.assertFalse(is_stream(None))
+        self.assertFalse(is_stream("[]"))
+        self.assertFalse(is_stream(u"[]"))
+        self.assertTrue(is_stream(iter(["[]"])))
+
+    def test_iter_json_array(self):
+        items = [{"id": i, "email": u"caf\u00e9%d@example.com" % i}
+            for i in range(50)]
+        chunks = list(iter_json_array((item for item in items),
+            chunk_size=100))
+        self.assertTrue(len(chunks) > 10)
+        self.assertTrue(all(len(chunk) < 200 for chunk in chunks))
+        self.assertEqual(json.dumps(items), "".join(chunks))
+        self.assertEqual(["[]"], list(iter_json_array([])))
+
+    def test_iter_json(self):
+        value = dict(id="1", test=0)
+        encoded = "".join(iter_json(value, chunk_size=10,
+            conditions=(str(i) for i in range(20)), other=iter([])))
+        self.assertEqual(dict(id="1", test=0, other=[],
+            conditions=[str(i) for i in range(20)]), json.loads(encoded))
+        self.assertEqual({"ids": [1]}, json.loads("".join(iter_json({},
+            ids=iter([1])))))
+        self.assertEqual(json.dumps(value), "".join(iter_json(value)))
+
+    def test_stream_reader(self):
+        reader = StreamReader(iter(["abc", "de", "fghij"]))
+        self.assertEqual("ab", reader.read(2))
+        self.assertEqual("cdef", reader.read(4))
+        self.assertEqual(["ghij"], list(reader))
+        self.assertEqual("", reader.read(4))
+        self.assertEqual("abcde", StreamReader(["abc", "de"]).read())
+
+if __name__ == "__main__":
+    unittest.main()
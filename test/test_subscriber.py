@@ -204,6 +204,65 @@ class TestSubscriber(mox.MoxTestBase):
         self.assertEqual(2, len(records))
         self.mox.VerifyAll()
 
+    def test_static_get_fields(self):
+        context = self.mox.CreateMockAnything()
+        context.field_parameter = "fields"
+        context.make_request("subscriber", "GET", record_id=1,
+            parameters={"fields": "id,email"}).AndReturn(
+            json.dumps([{"id": 1, "email": "a@example.com", "lists": []}]))
+        self.mox.ReplayAll()
+
+        record = Subscriber.get(context, 1, None, fields=["email"])
+        self.assertEqual({"id": 1, "email": "a@example.com"}, record.backing)
+        self.mox.VerifyAll()
+
+    def test_static_find_fields(self):
+        context = self.mox.CreateMockAnything()
+        context.field_parameter = None
+        context.make_request("subscriber", "GET",
+            parameters={"sort": "id", "order": "asc", "offset": "0", "limit": "2"},
+            query=None).AndReturn(json.dumps([{"id": 1, "data": "x"},
+            {"id": 2, "email": "b@example.com", "data": "y"}]))
+        self.mox.ReplayAll()
+
+        records = Subscriber.find(context, "id", "asc", 0, 2, None,
+            fields=["email"])
+        self.assertEqual([None, "b@example.com"], records.pluck("email"))
+        self.assertEqual([None, None], records.pluck("data"))
+        self.mox.VerifyAll()
+
+    def test_static_iter_find(self):
+        context = self.mox.CreateMockAnything()
+        context.field_parameter = "fields"
+        for query, rows in ((["id-gt-0"], [{"id": 1, "data": "x"}, {"id": 2}]),
+                (["id-gt-0", "id-gt-2"], [{"id": 3, "data": "z"}])):
+            context.make_request("subscriber", "GET", parameters={
+                "sort": "id", "order": "asc", "offset": "0",
+                "limit": "2", "fields": "id,email"},
+                query=query).AndReturn(json.dumps(rows))
+        self.mox.ReplayAll()
+
+        records = list(Subscriber.iter_find(context, query=["id-gt-0"],
+            page_size=2, fields=["email"]))
+        self.assertEqual([{"id": 1}, {"id": 2}, {"id": 3}],
+            [record.backing for record in records])
+        self.assertTrue(all(isinstance(record, Subscriber)
+            for record in records))
+        self.mox.VerifyAll()
+
+    def test_static_iter_find_offset(self):
+        context = self.mox.CreateMockAnything()
+        for offset, rows in ((0, [{"id": 5}, {"id": 1}]), (2, [])):
+            context.make_request("subscriber", "GET", parameters={
+                "sort": "email", "order": "desc", "offset": str(offset),
+                "limit": "2"}, query=None).AndReturn(json.dumps(rows))
+        self.mox.ReplayAll()
+
+        records = list(Subscriber.iter_find(context, sort="email",
+            order="desc", page_size=2))
+        self.assertEqual(["5", "1"], [record.record_id for record in records])
+        self.mox.VerifyAll()
+
 class TestSubscriberList(mox.MoxTestBase):
 
     def setUp(self):
@@ -264,6 +323,15 @@ class TestSubscriberList(mox.MoxTestBase):
         self.record.get_subscribers(0, 100)
         self.mox.VerifyAll()
 
+    def test_iter_subscribers(self):
+        self.mox.StubOutWithMock(Subscriber, "iter_find", True)
+        Subscriber.iter_find(None, query=["list_id-eq-1"], page_size=50,
+            fields=None).AndReturn(iter([]))
+        self.mox.ReplayAll()
+
+        self.assertEqual([], list(self.record.iter_subscribers(page_size=50)))
+        self.mox.VerifyAll()
+
     def test_static_get(self):
         context = self.mox.CreateMockAnything()
         context.make_request("list", "GET", record_id=1,
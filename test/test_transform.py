@@ -0,0 +1,56 @@
+import sys
+import mox
+import json
+import unittest
+
+sys.path.append("..")
+from taguchi.transform import TransformPool
+from taguchi.importer import Importer
+from taguchi.subscriber import Subscriber
+
+def tag_subscriber(subscriber):
+    if subscriber.email.startswith("drop"):
+        return None
+    subscriber.set_custom_field("source", "import")
+    subscriber.subscribe_to_list("3", None)
+    return subscriber
+
+class TestTransformPool(mox.MoxTestBase):
+
+    def setUp(self):
+        mox.MoxTestBase.setUp(self)
+        self.pool = TransformPool(tag_subscriber, processes=2, batch_size=2)
+
+    def tearDown(self):
+        self.pool.close()
+        mox.MoxTestBase.tearDown(self)
+
+    def test_transform(self):
+        results = self.pool.transform([{"email": "a@x"}, {"email": "drop@x"}])
+        self.assertEqual([{"email": "a@x",
+            "custom_fields": [{"field": "source", "data": "import"}],
+            "lists": [{"list_id": 3, "option": None, "unsubscribed": None}]},
+            None], results)
+
+    def test_imap(self):
+        backings = ({"email": "%s@x" % name}
+            for name in ["a", "drop", "b", "c", "d", "e"])
+        self.assertEqual(["a@x", "b@x", "c@x", "d@x", "e@x"],
+            [backing["email"] for backing in self.pool.imap(backings)])
+
+    def test_importer_transform(self):
+        context = self.mox.CreateMockAnything()
+        context.make_request("subscriber", "CREATEORUPDATE",
+            data=mox.Func(lambda data: [s["email"] for s in
+            json.loads(data)] == ["a@x"])).AndReturn(json.dumps([{"id": 1}]))
+        self.mox.ReplayAll()
+
+        importer = Importer(context, batch_size=2, workers=1,
+            transform=self.pool)
+        stats = importer.run([{"email": "a@x"}, {"email": "drop@x"}])
+        self.assertEqual(1, stats.sent)
+        self.assertEqual(1, stats.dropped)
+        self.mox.VerifyAll()
+
+if __name__ == "__main__":
+    unittest.main()
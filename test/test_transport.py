@@ -0,0 +1,349 @@
+import sys
+import mox
+import errno
+import socket
+import httplib
+import unittest
+import threading
+
+sys.path.append("..")
+import taguchi.transport
+from taguchi.context import Context
+from taguchi.transport import HTTPSTransport, PooledHTTPSTransport
+from taguchi.transport import HTTP2Transport, LoopbackTransport
+from taguchi.streaming import iter_json_array
+
+try:
+    import h2.events
+    import h2.connection
+except ImportError:
+    h2 = None
+
+class H2Server(object):
+    """
+    A minimal local HTTP/2 (h2c) server which echoes each request's method,
+    path and body.
+    """
+
+    def __init__(self):
+        self.listener = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        self.listener.bind(("127.0.0.1", 0))
+        self.listener.listen(5)
+        self.port = self.listener.getsockname()[1]
+        self.connections = 0
+        thread = threading.Thread(target=self.accept)
+        thread.daemon = True
+        thread.start()
+
+    def accept(self):
+        while True:
+            try:
+                sock, address = self.listener.accept()
+            except socket.error:
+                return
+            self.connections += 1
+            thread = threading.Thread(target=self.serve, args=(sock,))
+            thread.daemon = True
+            thread.start()
+
+    def serve(self, sock):
+        sock.settimeout(10)
+        conn = h2.connection.H2Connection(client_side=False)
+        conn.initiate_connection()
+        sock.sendall(conn.data_to_send())
+        requests = {}
+        while True:
+            try:
+                data = sock.recv(65535)
+            except socket.error:
+                return
+            if not data:
+                return
+            for event in conn.receive_data(data):
+                if isinstance(event, h2.events.RequestReceived):
+                    headers = dict(event.headers)
+                    requests[event.stream_id] = [
+                        str(headers[b":method"]), str(headers[b":path"]), b""]
+                elif isinstance(event, h2.events.DataReceived):
+                    requests[event.stream_id][2] += event.data
+                    conn.acknowledge_received_data(len(event.data),
+                        event.stream_id)
+                elif isinstance(event, h2.events.StreamEnded):
+                    body = " ".join(requests.pop(event.stream_id))
+                    conn.send_headers(event.stream_id, [(":status", "200"),
+                        ("content-length", str(len(body)))])
+                    conn.send_data(event.stream_id, body, end_stream=True)
+            sock.sendall(conn.data_to_send())
+
+    def close(self):
+        self.listener.close()
+
+class TestHTTPSTransport(mox.MoxTestBase):
+
+    def test_request(self):
+        conn = self.mox.CreateMockAnything()
+        self.mox.StubOutWithMock(httplib, "HTTPSConnection", True)
+        httplib.HTTPSConnection("127.0.0.1", timeout=5).AndReturn(conn)
+        conn.request("GET", "/x", None, {"Accept": "application/json"})
+        reply = self.mox.CreateMockAnything()
+        conn.getresponse().AndReturn(reply)
+        reply.read().AndReturn("200")
+        conn.close()
+        self.mox.ReplayAll()
+
+        transport = HTTPSTransport(timeout=5)
+        self.assertEqual("200", transport.request("127.0.0.1", "GET", "/x",
+            None, {"Accept": "application/json"}))
+        self.mox.VerifyAll()
+
+    def test_request_streamed_body(self):
+        conn = self.mox.CreateMockAnything()
+        self.mox.StubOutWithMock(httplib, "HTTPSConnection", True)
+        httplib.HTTPSConnection("127.0.0.1", timeout=60).AndReturn(conn)
+        conn.putrequest("POST", "/x", skip_accept_encoding=True)
+        conn.putheader("Transfer-Encoding", "chunked")
+        conn.endheaders()
+        conn.send("3\r\n[1,\r\n")
+        conn.send("2\r\n2]\r\n")
+        conn.send("0\r\n\r\n")
+        reply = self.mox.CreateMockAnything()
+        conn.getresponse().AndReturn(reply)
+        reply.read().AndReturn("200")
+        conn.close()
+        self.mox.ReplayAll()
+
+        transport = HTTPSTransport()
+        self.assertEqual("200", transport.request("127.0.0.1", "POST", "/x",
+            iter(["[1,", "", "2]"]), {"Transfer-Encoding": "chunked"}))
+        self.mox.VerifyAll()
+
+class TestPooledHTTPSTransport(mox.MoxTestBase):
+
+    def expect_request(self, conn, result, connection=""):
+        conn.request("GET", "/x", None, {})
+        reply = self.mox.CreateMockAnything()
+        conn.getresponse().AndReturn(reply)
+        reply.read().AndReturn(result)
+        reply.getheader("connection", "").AndReturn(connection)
+
+    def test_reuses_connections(self):
+        conn = self.mox.CreateMockAnything()
+        self.mox.StubOutWithMock(httplib, "HTTPSConnection", True)
+        httplib.HTTPSConnection("127.0.0.1", timeout=60).AndReturn(conn)
+        self.expect_request(conn, "1")
+        self.expect_request(conn, "2", connection="close")
+        conn.close()
+        self.mox.ReplayAll()
+
+        transport = PooledHTTPSTransport()
+        self.assertEqual("1", transport.request("127.0.0.1", "GET", "/x",
+            None, {}))
+        self.assertEqual("2", transport.request("127.0.0.1", "GET", "/x",
+            None, {}))
+        self.assertEqual({"127.0.0.1": []}, transport.idle)
+        self.mox.VerifyAll()
+
+    def test_retries_stale_connection(self):
+        stale = self.mox.CreateMockAnything()
+        fresh = self.mox.CreateMockAnything()
+        self.mox.StubOutWithMock(httplib, "HTTPSConnection", True)
+        httplib.HTTPSConnection("127.0.0.1", timeout=60).AndReturn(stale)
+        self.expect_request(stale, "1")
+        stale.request("GET", "/x", None, {})
+        stale.getresponse().AndRaise(httplib.BadStatusLine(""))
+        stale.close()
+        httplib.HTTPSConnection("127.0.0.1", timeout=60).AndReturn(fresh)
+        self.expect_request(fresh, "2")
+        self.mox.ReplayAll()
+
+        transport = PooledHTTPSTransport()
+        transport.request("127.0.0.1", "GET", "/x", None, {})
+        self.assertEqual("2", transport.request("127.0.0.1", "GET", "/x",
+            None, {}))
+        self.assertEqual({"127.0.0.1": [fresh]}, transport.idle)
+        self.mox.VerifyAll()
+
+    def test_does_not_retry_timeouts(self):
+        conn = self.mox.CreateMockAnything()
+        self.mox.StubOutWithMock(httplib, "HTTPSConnection", True)
+        httplib.HTTPSConnection("127.0.0.1", timeout=60).AndReturn(conn)
+        self.expect_request(conn, "1")
+        conn.request("POST", "/x", "[]", {})
+        conn.getresponse().AndRaise(socket.timeout("timed out"))
+        conn.close()
+        self.mox.ReplayAll()
+
+        transport = PooledHTTPSTransport()
+        transport.request("127.0.0.1", "GET", "/x", None, {})
+        self.assertRaises(socket.timeout, transport.request, "127.0.0.1",
+            "POST", "/x", "[]", {})
+        self.mox.VerifyAll()
+
+    def test_retries_post_only_before_response(self):
+        conn = self.mox.CreateMockAnything()
+        fresh = self.mox.CreateMockAnything()
+        self.mox.StubOutWithMock(httplib, "HTTPSConnection", True)
+        httplib.HTTPSConnection("127.0.0.1", timeout=60).AndReturn(conn)
+        self.expect_request(conn, "1")
+        conn.request("POST", "/x", "[]", {})
+        conn.getresponse().AndRaise(socket.error(errno.ECONNRESET, "reset"))
+        conn.close()
+        httplib.HTTPSConnection("127.0.0.1", timeout=60).AndReturn(fresh)
+        fresh.request("POST", "/x", "[]", {})
+        reply = self.mox.CreateMockAnything()
+        fresh.getresponse().AndReturn(reply)
+        reply.read().AndReturn("2")
+        reply.getheader("connection", "").AndReturn("")
+        fresh.request("POST", "/x", "[]", {})
+        reply = self.mox.CreateMockAnything()
+        fresh.getresponse().AndReturn(reply)
+        reply.read().AndRaise(httplib.IncompleteRead("2"))
+        fresh.close()
+        self.mox.ReplayAll()
+
+        transport = PooledHTTPSTransport()
+        transport.request("127.0.0.1", "GET", "/x", None, {})
+        self.assertEqual("2", transport.request("127.0.0.1", "POST", "/x",
+            "[]", {}))
+        self.assertRaises(httplib.IncompleteRead, transport.request,
+            "127.0.0.1", "POST", "/x", "[]", {})
+        self.mox.VerifyAll()
+
+class TestLoopbackTransport(unittest.TestCase):
+
+    def test_make_request(self):
+        def handler(method, uri, body, headers):
+            return "%s %s %s" % (method, uri, body)
+        transport = LoopbackTransport(handler)
+        context = Context("127.0.0.1", "test@taguchimail.com", "X", 1,
+            transport=transport)
+        self.assertEqual("GET /admin/api/1/subscriber/2?_method=GET&"
+            "auth=test%40taguchimail.com%7CX None",
+            context.make_request("subscriber", "GET", record_id=2))
+        self.assertEqual(1, len(transport.requests))
+        self.assertEqual(("127.0.0.1", "GET"), transport.requests[0][:2])
+
+    def test_propagates_errors(self):
+        def handler(method, uri, body, headers):
+            raise IOError("connection reset")
+        context = Context("127.0.0.1", "test@taguchimail.com", "X", 1,
+            transport=LoopbackTransport(handler))
+        self.assertRaises(IOError, context.make_request, "subscriber", "GET",
+            record_id=2)
+
+class TestHTTP2Transport(mox.MoxTestBase):
+
+    def setUp(self):
+        mox.MoxTestBase.setUp(self)
+        if h2 is None:
+            self.skipTest("h2 is not installed")
+        self.server = H2Server()
+        self.transport = HTTP2Transport(port=self.server.port, secure=False)
+        self.context = Context("127.0.0.1", "test@taguchimail.com", "X", 1,
+            transport=self.transport)
+
+    def tearDown(self):
+        self.transport.close()
+        self.server.close()
+        mox.MoxTestBase.tearDown(self)
+
+    def test_make_request(self):
+        self.assertEqual('POST /admin/api/1/activity/1?_method=update&'
+            'auth=test%40taguchimail.com%7CX [{"id": 1}]',
+            self.context.make_request("activity", "update", record_id=1,
+            data='[{"id": 1}]'))
+
+    def test_make_request_streamed_body(self):
+        self.assertEqual('POST /admin/api/1/subscriber/?_method=POST&'
+            'auth=test%40taguchimail.com%7CX [{"id": 0}, {"id": 1}]',
+            self.context.make_request("subscriber", "POST",
+            data=iter_json_array(({"id": i} for i in range(2)),
+            chunk_size=4)))
+
+    def test_multiplexes_concurrent_requests(self):
+        results = {}
+        def fetch(record_id):
+            results[record_id] = self.context.make_request("subscriber",
+                "GET", record_id=record_id)
+        threads = [threading.Thread(target=fetch, args=(i,))
+            for i in range(10)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        for i in range(10):
+            self.assertTrue(results[i].startswith(
+                "GET /admin/api/1/subscriber/%d?" % i))
+        self.assertEqual(1, self.server.connections)
+
+class TestHTTP2Negotiation(mox.MoxTestBase):
+
+    def setUp(self):
+        mox.MoxTestBase.setUp(self)
+        hyper = taguchi.transport.hyper
+        if hyper is None:
+            self.skipTest("hyper is not installed")
+        self.opened = []
+        self.gate = threading.Event()
+        test = self
+
+        class Response(object):
+            def __init__(self, body):
+                self.body = body
+            def read(self):
+                return self.body
+
+        class H2Response(Response, hyper.HTTP20Response):
+            pass
+
+        class Connection(object):
+            # Speaks HTTP/2 to hosts named h2*, after waiting for the gate
+            # if the host is h2-slow.
+            def __init__(self, hostname, port, secure, ssl_context):
+                test.opened.append((hostname, port))
+                self.hostname = hostname
+            def request(self, method, uri, body, headers):
+                return 1
+            def get_response(self, stream_id=None):
+                if self.hostname == "h2-slow":
+                    test.gate.wait(10)
+                if self.hostname.startswith("h2"):
+                    return H2Response(self.hostname)
+                return Response(self.hostname)
+            def close(self):
+                pass
+
+        self.stubs.Set(hyper, "HTTPConnection", Connection)
+
+    def test_fallback_settings(self):
+        context = object()
+        transport = HTTP2Transport(port=8443, ssl_context=context)
+        self.assertEqual(8443, transport.fallback.port)
+        self.assertTrue(transport.fallback.ssl_context is context)
+        self.gate.set()
+        self.assertEqual("h1", transport.request("h1", "GET", "/", None, {}))
+        self.assertEqual(set(["h1"]), transport.http11_hosts)
+        self.assertEqual("h2-slow", transport.request("h2-slow", "GET", "/",
+            None, {}))
+        self.assertEqual(["h2-slow"], list(transport.connections))
+
+    def test_negotiates_outside_lock(self):
+        transport = HTTP2Transport()
+        results = []
+        def fetch():
+            results.append(transport.request("h2-slow", "GET", "/", None,
+                {}))
+        threads = [threading.Thread(target=fetch) for i in range(3)]
+        for thread in threads:
+            thread.start()
+        # Other hosts are not held up by the negotiation under way.
+        self.assertEqual("h2-fast", transport.request("h2-fast", "GET", "/",
+            None, {}))
+        self.gate.set()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(["h2-slow"] * 3, results)
+        self.assertEqual(1, self.opened.count(("h2-slow", 443)))
+
+if __name__ == "__main__":
+    unittest.main()